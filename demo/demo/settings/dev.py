@@ -52,9 +52,8 @@ INCIDENT_BOT_NAME = get_env_var("INCIDENT_BOT_NAME")
 
 SLACK_API_MOCK = os.getenv("SLACK_API_MOCK", None)
 
-INCIDENT_BOT_ID = os.getenv("INCIDENT_BOT_ID") or SLACK_CLIENT.get_user_id(
-    INCIDENT_BOT_NAME
-)
+# If this isn't set, the bot is looked up by INCIDENT_BOT_NAME when first needed
+INCIDENT_BOT_ID = os.getenv("INCIDENT_BOT_ID")
 INCIDENT_CHANNEL_ID = os.getenv("INCIDENT_CHANNEL_ID") or SLACK_CLIENT.get_channel_id(
     INCIDENT_CHANNEL_NAME
 )
@@ -1,8 +1,10 @@
 from django.contrib import admin
 
-from response.core.models import Action, Event, ExternalUser, Incident
+from response.core.models import Action, Event, ExternalUser, Incident, Job, OutboxEntry
 
 admin.site.register(Action)
 admin.site.register(Event)
 admin.site.register(Incident)
 admin.site.register(ExternalUser)
+admin.site.register(Job)
+admin.site.register(OutboxEntry)
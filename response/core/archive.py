@@ -0,0 +1,215 @@
+import glob
+import gzip
+import json
+import logging
+import os
+import tempfile
+import uuid
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.dateparse import parse_date, parse_datetime
+
+from response.core.jobs import background_job
+from response.core.models import Event
+
+logger = logging.getLogger(__name__)
+
+
+def archive_dir(directory=None):
+    directory = directory or getattr(settings, "RESPONSE_EVENT_ARCHIVE_DIR", None)
+    if not directory:
+        raise ImproperlyConfigured(
+            "Set RESPONSE_EVENT_ARCHIVE_DIR to the directory to archive events in"
+        )
+    return directory
+
+
+def new_archive_path(directory, day, events):
+    """
+    A new archive file for `events`, a batch of the events on `day`. The name
+    is unique, so archiving never overwrites an existing file: e.g. if
+    restored events are archived again, they're written alongside the
+    original archive, rather than replacing it.
+    """
+    return os.path.join(
+        directory,
+        f"events-{day.isoformat()}-{events[0].pk}-{events[-1].pk}-{uuid.uuid4().hex[:8]}.jsonl.gz",
+    )
+
+
+def archive_paths(directory, day):
+    "All the archive files for the events on `day`"
+    return sorted(
+        glob.glob(os.path.join(directory, f"events-{day.isoformat()}-*.jsonl.gz"))
+    )
+
+
+def _write_archive(path, events):
+    """
+    Writes `events` to `path` atomically: they're written to a temporary file
+    in the same directory, synced to disk, then moved into place, so `path`
+    either doesn't exist or holds every event.
+    """
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            with gzip.open(f, "wt") as archive:
+                archive.writelines(_to_json(event) + "\n" for event in events)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    # sync the directory too, so the rename survives a crash (not possible on
+    # some platforms, e.g. Windows)
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass
+
+
+def retention_horizon(days):
+    "Midnight `days` days ago: events from before then are archived"
+    return datetime.combine(date.today() - timedelta(days=days), datetime.min.time())
+
+
+def parse_timestamp(value):
+    "Parses an ISO 8601 date/time, or a date (as midnight), or raises ValueError"
+    timestamp = parse_datetime(value)
+    if timestamp is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date/time: {value}")
+        timestamp = datetime.combine(day, datetime.min.time())
+    return timestamp
+
+
+def _to_json(event):
+    return json.dumps(
+        {
+            "id": event.pk,
+            "timestamp": event.timestamp.isoformat(),
+            "event_type": event.event_type,
+            "incident_id": event.incident_id,
+            "payload": event.payload,
+        }
+    )
+
+
+def _from_json(line):
+    fields = json.loads(line)
+    fields["timestamp"] = parse_timestamp(fields["timestamp"])
+    return Event(**fields)
+
+
+def archive_events(before, directory=None, batch_size=None):
+    """
+    Moves the events from before `before` out of the database, into gzipped
+    JSON lines files in `directory` (by default RESPONSE_EVENT_ARCHIVE_DIR).
+    Returns how many events were archived.
+
+    Events are archived oldest first, RESPONSE_EVENT_ARCHIVE_BATCH_SIZE at a
+    time, so no lock is held for long. Each batch is written to a new file
+    per day (see new_archive_path), and only deleted from the database once
+    the files are safely on disk. If archiving is interrupted, a batch may have
+    been written but not deleted, and will be written again next time;
+    restore_events ignores the duplicates.
+    """
+    directory = archive_dir(directory)
+    batch_size = batch_size or getattr(
+        settings, "RESPONSE_EVENT_ARCHIVE_BATCH_SIZE", 1000
+    )
+    os.makedirs(directory, exist_ok=True)
+
+    old_events = Event.objects.filter(timestamp__lt=before).order_by("timestamp", "id")
+
+    archived = 0
+    while True:
+        batch = list(old_events[:batch_size])
+        if not batch:
+            break
+
+        by_day = {}
+        for event in batch:
+            by_day.setdefault(event.timestamp.date(), []).append(event)
+        for day, events in by_day.items():
+            _write_archive(new_archive_path(directory, day, events), events)
+
+        Event.objects.filter(pk__in=[event.pk for event in batch]).delete()
+        archived += len(batch)
+        logger.info(f"Archived {len(batch)} events from before {batch[-1].timestamp}")
+
+        if len(batch) < batch_size:
+            break
+
+    return archived
+
+
+def restore_events(start, end, directory=None, batch_size=None):
+    """
+    Copies the archived events from between `start` and `end` back into the
+    database, with their original IDs. Events that are already in the database
+    are skipped. The archive files are left as they are. Returns how many
+    events were restored.
+
+    Note that archive_events will archive restored events again if they're
+    older than the retention period.
+    """
+    directory = archive_dir(directory)
+    batch_size = batch_size or getattr(
+        settings, "RESPONSE_EVENT_ARCHIVE_BATCH_SIZE", 1000
+    )
+
+    def _restore(events):
+        existing = set(
+            Event.objects.filter(pk__in=[event.pk for event in events]).values_list(
+                "pk", flat=True
+            )
+        )
+        Event.objects.bulk_create(
+            [event for event in events if event.pk not in existing],
+            ignore_conflicts=True,
+        )
+        return len(events) - len(existing)
+
+    restored = 0
+    day = start.date()
+    while day <= end.date():
+        events = {}
+        for path in archive_paths(directory, day):
+            with gzip.open(path, "rt") as f:
+                for line in f:
+                    event = _from_json(line)
+                    if start <= event.timestamp <= end:
+                        events[event.pk] = event
+        day += timedelta(days=1)
+
+        events = list(events.values())
+        for i in range(0, len(events), batch_size):
+            batch = slice(i, i + batch_size)
+            restored += _restore(events[batch])
+
+    logger.info(f"Restored {restored} events from between {start} and {end}")
+    return restored
+
+
+@background_job
+def archive_old_events():
+    """
+    Archives the events older than RESPONSE_EVENT_RETENTION_DAYS, if it's set.
+    Queued daily by cron_daily when RESPONSE_USE_JOB_QUEUE is on.
+    """
+    retention_days = getattr(settings, "RESPONSE_EVENT_RETENTION_DAYS", None)
+    if retention_days is None:
+        return 0
+
+    return archive_events(retention_horizon(retention_days))
@@ -0,0 +1,231 @@
+import logging
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+
+from response.core.models import Action, Event, ExternalUser, Incident, OutboxEntry
+from response.core.serializers import ActionEventSerializer, IncidentEventSerializer
+from response.core.util import Debouncer, worker_id
+
+logger = logging.getLogger(__name__)
+
+
+def action_event(action, timestamp=None):
+    "Returns an (unsaved) Event recording the current state of `action`"
+    payload = dict(ActionEventSerializer(action).data)
+    payload["incident_id"] = action.incident_id
+    return Event(
+        event_type=Event.ACTION_EVENT_TYPE,
+        payload=payload,
+        incident_id=action.incident_id,
+        timestamp=timestamp or datetime.now(tz=None),
+    )
+
+
+def incident_event(incident, timestamp=None):
+    "Returns an (unsaved) Event recording the current state of `incident`"
+    return Event(
+        event_type=Event.INCIDENT_EVENT_TYPE,
+        payload=dict(IncidentEventSerializer(incident).data),
+        incident_id=incident.pk,
+        timestamp=timestamp or datetime.now(tz=None),
+    )
+
+
+class OutboxActionEventHandler:
+    """
+    Records saved actions in the outbox, for their events to be built later
+    by drain_event_outbox. Enable with:
+
+        ACTION_EVENT_HANDLER_CLASS = "response.core.events.OutboxActionEventHandler"
+    """
+
+    @staticmethod
+    def handle(sender, instance: Action, **kwargs):
+        OutboxEntry.objects.create(
+            model=OutboxEntry.ACTION,
+            object_id=instance.pk,
+            incident_id=instance.incident_id,
+            snapshot=_snapshot(instance),
+        )
+        outbox_drainer.request()
+
+
+class OutboxIncidentEventHandler:
+    """
+    Records saved incidents in the outbox, for their events to be built later
+    by drain_event_outbox. Saves that don't change anything aren't recorded.
+    Enable with:
+
+        INCIDENT_EVENT_HANDLER_CLASS = "response.core.events.OutboxIncidentEventHandler"
+    """
+
+    @staticmethod
+    def handle(sender, instance: Incident, created=False, **kwargs):
+        if instance.private:
+            logger.info(f"Skipping incident post_save for private incident: {instance}")
+            return
+
+        if not created and not instance.changed_fields():
+            return
+
+        OutboxEntry.objects.create(
+            model=OutboxEntry.INCIDENT,
+            object_id=instance.pk,
+            incident_id=instance.pk,
+            snapshot=_snapshot(instance),
+        )
+        outbox_drainer.request()
+
+
+def _snapshot(instance):
+    "The values of `instance`'s fields, stored so its Event records it as it was saved"
+    return {
+        field.attname: field.value_from_object(instance)
+        for field in instance._meta.concrete_fields
+    }
+
+
+def _restore(model, snapshot, related):
+    """
+    Rebuilds an (unsaved) `model` instance from `snapshot`, with its related
+    objects taken from `related` ({field name: {pk: object}}) rather than
+    queried one at a time
+    """
+    instance = model(
+        **{
+            field.attname: field.to_python(snapshot[field.attname])
+            for field in model._meta.concrete_fields
+            if field.attname in snapshot
+        }
+    )
+    for name, objects in related.items():
+        field = model._meta.get_field(name)
+        key = getattr(instance, field.attname) if field.concrete else instance.pk
+        field.set_cached_value(instance, objects.get(key))
+    return instance
+
+
+def _build_events(entries):
+    incidents = Incident.objects.select_related(
+        "reporter", "lead", "commschannel"
+    ).in_bulk({e.incident_id for e in entries})
+
+    action_ids = {e.object_id for e in entries if e.model == OutboxEntry.ACTION}
+    actions = Action.objects.select_related("incident", "user").in_bulk(action_ids)
+
+    snapshots = [e.snapshot for e in entries if e.snapshot]
+    users = ExternalUser.objects.in_bulk(
+        {
+            snapshot.get(attname)
+            for snapshot in snapshots
+            for attname in ("reporter_id", "lead_id", "user_id")
+        }
+        - {None}
+    )
+    comms_channels = {
+        pk: getattr(incident, "commschannel", None)
+        for pk, incident in incidents.items()
+    }
+
+    events = []
+    for entry in entries:
+        # Leave out deleted objects, and anything to do with incidents that
+        # are private now
+        incident = incidents.get(entry.incident_id)
+        if incident is None or incident.private:
+            continue
+
+        if entry.model == OutboxEntry.INCIDENT:
+            if entry.snapshot:
+                incident = _restore(
+                    Incident,
+                    entry.snapshot,
+                    {"reporter": users, "lead": users, "commschannel": comms_channels},
+                )
+            events.append(incident_event(incident, entry.created_at))
+        elif entry.model == OutboxEntry.ACTION:
+            action = actions.get(entry.object_id)
+            if action is None:
+                continue
+            if entry.snapshot:
+                action = _restore(
+                    Action, entry.snapshot, {"incident": incidents, "user": users}
+                )
+            events.append(action_event(action, entry.created_at))
+
+    return events
+
+
+def drain_event_outbox(batch_size=None, worker=None):
+    """
+    Builds and stores the Events for everything recorded in the outbox, a
+    batch at a time. Returns how many outbox entries were drained.
+
+    Each batch is claimed (see OutboxEntryManager.claim) before it's drained,
+    so with several drainers every entry is only drained once. Events are
+    timestamped with when their entry was recorded, so Events for an incident
+    (and its actions) are in the order they were saved, and Event.objects.feed
+    waits for the outbox before returning them. Each Event records the
+    incident or action as it was saved, from the entry's snapshot.
+    """
+    batch_size = batch_size or getattr(
+        settings, "RESPONSE_EVENT_OUTBOX_BATCH_SIZE", 500
+    )
+    worker = worker or worker_id()
+
+    drained = 0
+    while True:
+        entries = OutboxEntry.objects.claim(worker, batch_size)
+        if not entries:
+            break
+
+        events = _build_events(entries)
+        with transaction.atomic():
+            deleted, _ = OutboxEntry.objects.filter(
+                pk__in=[e.pk for e in entries], claimed_by=entries[0].claimed_by
+            ).delete()
+            if deleted != len(entries):
+                # Our claim expired, and another drainer has claimed some of
+                # these entries again: leave them to it
+                logger.warning(f"Lost the claim on {len(entries)} outbox entries")
+                transaction.set_rollback(True)
+                continue
+            Event.objects.bulk_create(events)
+
+        drained += len(entries)
+        logger.info(f"Drained {len(entries)} outbox entries into {len(events)} events")
+        if len(entries) < batch_size:
+            break
+
+    return drained
+
+
+class OutboxDrainer(Debouncer):
+    """
+    Drains the outbox in the background soon after something's recorded in
+    it, so that events don't wait for the next cron_minute.
+
+    Requests are coalesced: the first starts a timer of
+    RESPONSE_EVENT_OUTBOX_DRAIN_DELAY_SECONDS (after the transaction
+    commits), and the outbox is drained once when it fires. If the delay is
+    None, the outbox is only drained by cron_minute.
+    """
+
+    def __init__(self):
+        super().__init__(self.drain, self.delay)
+
+    def delay(self):
+        return getattr(settings, "RESPONSE_EVENT_OUTBOX_DRAIN_DELAY_SECONDS", 1)
+
+    def request(self):
+        if self.delay() is None:
+            return
+        super().request()
+
+    def drain(self, key=None):
+        drain_event_outbox()
+
+
+outbox_drainer = OutboxDrainer()
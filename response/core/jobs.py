@@ -0,0 +1,226 @@
+import logging
+import time
+import traceback
+from concurrent import futures
+from datetime import datetime, timedelta
+
+import after_response
+from django.conf import settings
+from django.db import close_old_connections
+
+from response.core.models import Job
+from response.core.util import closing_db_connection, worker_id
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {}
+
+
+def job_queue_enabled():
+    return getattr(settings, "RESPONSE_USE_JOB_QUEUE", False)
+
+
+def background_job(func=None, name=None, max_attempts=None, shard=None):
+    """
+    Registers a function that can be run in the background with
+    `func.enqueue(*args, **kwargs)`. Arguments must be JSON serializable.
+    `func.enqueue_once(key, *args, **kwargs)` does the same, but won't queue
+    the job again if one with the same key has already been queued.
+
+    If `shard` is given, it's called with each job's arguments to get its
+    shard key: jobs with the same key are run one at a time, in the order
+    they were enqueued, even with several workers.
+
+    If RESPONSE_USE_JOB_QUEUE is set, enqueued calls are stored as Jobs and
+    run by `manage.py response_worker`, which retries them if they fail.
+    Otherwise they're run in the web worker after the response has been sent,
+    using after_response.
+    """
+
+    def _wrapper(fn):
+        job_name = name or f"{fn.__module__}.{fn.__name__}"
+        JOB_HANDLERS[job_name] = fn
+        after_response.enable(fn)
+
+        def enqueue(*args, **kwargs):
+            return enqueue_once(None, *args, **kwargs)
+
+        def enqueue_once(dedupe_key, *args, **kwargs):
+            if not job_queue_enabled():
+                fn.after_response(*args, **kwargs)
+                return None
+
+            job = Job.objects.enqueue(
+                job_name,
+                args,
+                kwargs,
+                max_attempts,
+                dedupe_key=dedupe_key,
+                shard_key=shard(*args, **kwargs) if shard else None,
+            )
+            if job:
+                logger.info(f"Enqueued job {job.pk} ({job_name})")
+            return job
+
+        fn.job_name = job_name
+        fn.enqueue = enqueue
+        fn.enqueue_once = enqueue_once
+        return fn
+
+    if func:
+        return _wrapper(func)
+    return _wrapper
+
+
+def retry_delay(attempts):
+    "Exponential backoff between attempts at a failed job"
+    base = getattr(settings, "RESPONSE_JOB_RETRY_BASE_SECONDS", 2)
+    max_delay = getattr(settings, "RESPONSE_JOB_RETRY_MAX_SECONDS", 10 * 60)
+    return timedelta(seconds=min(max_delay, base * 2 ** (attempts - 1)))
+
+
+def run_job(job):
+    "Runs a claimed job, recording the outcome and how long it took"
+    start = time.monotonic()
+    try:
+        handler = JOB_HANDLERS.get(job.name)
+        if handler is None:
+            raise LookupError(f"No handler registered for job {job.name}")
+        handler(*job.args, **job.kwargs)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_at = datetime.now() + retry_delay(job.attempts)
+            logger.warning(
+                f"Job {job.pk} ({job.name}) failed on attempt {job.attempts} of {job.max_attempts}, retrying at {job.run_at}"
+            )
+        else:
+            job.status = Job.FAILED
+            logger.exception(
+                f"Job {job.pk} ({job.name}) failed after {job.attempts} attempts"
+            )
+    else:
+        job.status = Job.SUCCEEDED
+        job.last_error = None
+
+    job.finished_at = datetime.now()
+    job.duration_ms = int((time.monotonic() - start) * 1000)
+    logger.info(
+        f"Job {job.pk} ({job.name}) {job.status} in {job.duration_ms}ms (attempt {job.attempts})"
+    )
+
+    # only record the outcome if we still hold the claim: if it expired (e.g.
+    # the worker stopped renewing it) another worker may be running the job
+    updated = Job.objects.filter(pk=job.pk, claimed_by=job.claimed_by).update(
+        status=job.status,
+        last_error=job.last_error,
+        run_at=job.run_at,
+        finished_at=job.finished_at,
+        duration_ms=job.duration_ms,
+        claimed_by=None,
+        claimed_until=None,
+    )
+    if not updated:
+        logger.warning(
+            f"Job {job.pk} ({job.name}) was claimed by another worker while it ran, not recording its outcome"
+        )
+    return job
+
+
+class Worker:
+    """
+    Claims jobs from the queue and runs up to `concurrency` of them at once in
+    a thread pool, claiming more as threads free up.
+
+    While its jobs are running, the worker renews their claims (see
+    JobManager.heartbeat) a few times per RESPONSE_JOB_TIMEOUT_SECONDS, so
+    long-running jobs aren't taken over by other workers. It also deletes old
+    finished jobs (see JobManager.prune) every PRUNE_INTERVAL.
+    """
+
+    PRUNE_INTERVAL = timedelta(hours=1)
+
+    def __init__(self, concurrency=None, poll_interval=None, name=None):
+        self.concurrency = concurrency or getattr(
+            settings, "RESPONSE_JOB_WORKER_CONCURRENCY", 4
+        )
+        self.poll_interval = (
+            poll_interval
+            if poll_interval is not None
+            else getattr(settings, "RESPONSE_JOB_POLL_INTERVAL_SECONDS", 1)
+        )
+        self.name = name or worker_id()
+        self.stopping = False
+        self._running = {}  # future -> job
+        self._next_heartbeat = self._next_prune = 0
+
+    def _run_in_thread(self, job):
+        with closing_db_connection():
+            return run_job(job)
+
+    def run_once(self, pool):
+        "Claims jobs for any idle threads and starts them, returning how many were started"
+        close_old_connections()
+        self._housekeeping()
+
+        idle = self.concurrency - len(self._running)
+        if idle <= 0:
+            return 0
+        jobs = Job.objects.claim(self.name, limit=idle)
+        for job in jobs:
+            self._running[pool.submit(self._run_in_thread, job)] = job
+        return len(jobs)
+
+    def wait(self, timeout=None):
+        "Waits up to `timeout` seconds for one of the running jobs to finish"
+        if not self._running:
+            return
+        done, _ = futures.wait(
+            self._running, timeout=timeout, return_when=futures.FIRST_COMPLETED
+        )
+        for future in done:
+            del self._running[future]
+
+    def heartbeat(self):
+        "Renews the claims on the running jobs"
+        tokens = {job.claimed_by for job in self._running.values()}
+        if tokens:
+            Job.objects.heartbeat(tokens)
+
+    def _housekeeping(self):
+        now = time.monotonic()
+        if now >= self._next_heartbeat:
+            self.heartbeat()
+            self._next_heartbeat = now + Job.objects.lease().total_seconds() / 3
+        if now >= self._next_prune:
+            Job.objects.prune()
+            self._next_prune = now + self.PRUNE_INTERVAL.total_seconds()
+
+    def run(self, burst=False):
+        """
+        Runs jobs until stop() is called, or with `burst` until there are no
+        more jobs ready to run
+        """
+        logger.info(
+            f"Job worker {self.name} starting with concurrency {self.concurrency}"
+        )
+        with futures.ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while not self.stopping:
+                if self.run_once(pool):
+                    continue
+                if self._running:
+                    # until a thread is free, or it's time to look for new jobs
+                    self.wait(timeout=self.poll_interval)
+                elif burst:
+                    break
+                else:
+                    time.sleep(self.poll_interval)
+
+            while self._running:
+                self._housekeeping()
+                self.wait(timeout=self.poll_interval)
+        logger.info(f"Job worker {self.name} stopped")
+
+    def stop(self):
+        self.stopping = True
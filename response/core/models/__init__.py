@@ -1,6 +1,8 @@
 from .action import Action
 from .event import Event
 from .incident import Incident
+from .job import Job
+from .outbox import OutboxEntry
 from .timeline import TimelineEvent, add_incident_update_event
 from .user_external import ExternalUser
 
@@ -8,6 +10,8 @@ __all__ = (
     "Action",
     "Event",
     "Incident",
+    "Job",
+    "OutboxEntry",
     "TimelineEvent",
     "ExternalUser",
     "add_incident_update_event",
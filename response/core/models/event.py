@@ -1,16 +1,99 @@
-import json
+import base64
+from datetime import datetime, timedelta
 
+from django.conf import settings
 from django.db import models
+from django.utils.dateparse import parse_datetime
+from jsonfield import JSONField
+
+from response.core.models.outbox import OutboxEntry
+
+
+class EventManager(models.Manager):
+    def settle_time(self):
+        return timedelta(
+            seconds=getattr(settings, "RESPONSE_EVENT_FEED_SETTLE_SECONDS", 2)
+        )
+
+    def feed(self, since=None, now=None):
+        """
+        Events in the order they happened, (timestamp, id), after the
+        (timestamp, id) cursor `since`.
+
+        Events from the last RESPONSE_EVENT_FEED_SETTLE_SECONDS are left out.
+        Events are timestamped before they're committed, so a recent event
+        can still appear with an earlier timestamp than one that's already
+        been read. Waiting for them to settle means readers that follow the
+        cursor don't skip it.
+
+        For the same reason, while the event outbox has entries waiting to be
+        drained, events from after the oldest of them are left out too: they'll
+        be timestamped with when they were recorded.
+        """
+        now = now or datetime.now()
+        events = self.filter(timestamp__lte=now - self.settle_time())
+        pending = OutboxEntry.objects.order_by("pk")
+        oldest_pending = pending.values_list("created_at", flat=True).first()
+        if oldest_pending:
+            events = events.filter(timestamp__lt=oldest_pending)
+        if since is not None:
+            timestamp, pk = since
+            events = events.filter(timestamp__gte=timestamp).exclude(
+                timestamp=timestamp, pk__lte=pk
+            )
+        return events.order_by("timestamp", "id")
 
 
 class Event(models.Model):
     ACTION_EVENT_TYPE = "action_event"
     INCIDENT_EVENT_TYPE = "incident_event"
 
+    objects = EventManager()
+
     timestamp = models.DateTimeField()
-    event_type = models.CharField(max_length=50)
-    payload = models.TextField()
+    event_type = models.CharField(max_length=50, db_index=True)
+    payload = JSONField(default=dict)
+    # The incident the event is about, copied out of the payload so that
+    # events can be looked up by incident. This isn't a foreign key, so that
+    # events outlive the incidents they record.
+    incident_id = models.PositiveIntegerField(blank=True, null=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["timestamp", "id"], name="response_event_timestamp_id")
+        ]
+
+    @classmethod
+    def incident_id_from(cls, event_type, payload):
+        "Returns the ID of the incident that an event with `payload` is about"
+        if not isinstance(payload, dict):
+            return None
+        if event_type == cls.ACTION_EVENT_TYPE:
+            return payload.get("incident_id")
+        if event_type == cls.INCIDENT_EVENT_TYPE:
+            return payload.get("id")
+        return None
+
+    @property
+    def cursor(self):
+        "An opaque cursor for the position of this event in Event.objects.feed"
+        position = f"{self.timestamp.isoformat()}|{self.pk}"
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    @staticmethod
+    def parse_cursor(cursor):
+        "Returns the (timestamp, id) in `cursor`, or raises ValueError"
+        try:
+            position = base64.urlsafe_b64decode(cursor.encode()).decode()
+            timestamp, pk = position.split("|")
+            timestamp = parse_datetime(timestamp)
+            if timestamp is None:
+                raise ValueError(f"Invalid timestamp in cursor: {position}")
+            return timestamp, int(pk)
+        except ValueError as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
 
     def save(self, *args, **kwargs):
-        self.payload = json.dumps(self.payload)
+        if self.incident_id is None:
+            self.incident_id = self.incident_id_from(self.event_type, self.payload)
         super().save(*args, **kwargs)
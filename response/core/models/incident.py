@@ -151,8 +151,78 @@ class Incident(models.Model):
     def timeline_events(self):
         return core.models.TimelineEvent.objects.filter(incident=self)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Incident, cls).from_db(db, field_names, values)
+        # remember what was loaded, so changes can be found without fetching
+        # the row again (field_names are attnames, e.g. lead_id)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def _previous_values(self):
+        if hasattr(self, "_loaded_values"):
+            return self._loaded_values
+        if self.pk is None:
+            return None
+
+        # not loaded from the DB (e.g. constructed with a pk), so fetch what's
+        # there once, and share it with anything else that asks
+        self._loaded_values = (
+            Incident.objects.filter(pk=self.pk)
+            .values(*[f.attname for f in self._meta.concrete_fields])
+            .first()
+        )
+        return self._loaded_values
+
+    def changed_fields(self):
+        """
+        Returns {field name: (old value, new value)} for each field that's
+        changed since the incident was loaded from (or last saved to) the
+        database, or None if it's never been saved. Foreign keys are
+        compared (and returned) by ID, so e.g. a change of lead doesn't need
+        to load either user.
+        """
+        previous = self._previous_values()
+        if previous is None:
+            return None
+
+        changed = {}
+        for field in self._meta.concrete_fields:
+            if field.attname not in previous or field.attname not in self.__dict__:
+                # deferred, so it can't have been changed
+                continue
+            old, new = previous[field.attname], getattr(self, field.attname)
+            if old != new:
+                changed[field.name] = (old, new)
+        return changed
+
+    def previous_state(self):
+        """
+        Returns an unsaved copy of the incident as it was loaded from (or last
+        saved to) the database, or None if it's never been saved
+        """
+        previous = self._previous_values()
+        if previous is None:
+            return None
+        return Incident(**previous)
+
+    def _snapshot(self, fields=None):
+        "Records the current values of `fields` (by default all loaded fields) as saved"
+        previous = getattr(self, "_loaded_values", None) or {}
+        for field in self._meta.concrete_fields:
+            if fields is not None and not {field.name, field.attname} & set(fields):
+                continue
+            if field.attname in self.__dict__:
+                previous[field.attname] = getattr(self, field.attname)
+        self._loaded_values = previous
+
+    def refresh_from_db(self, using=None, fields=None):
+        super(Incident, self).refresh_from_db(using=using, fields=fields)
+        self._snapshot(fields)
+
     def save(self, *args, **kwargs):
         self.impact = sanitize(self.impact)
         self.report = sanitize(self.report)
         self.summary = sanitize(self.summary)
         super(Incident, self).save(*args, **kwargs)
+        self._snapshot(kwargs.get("update_fields"))
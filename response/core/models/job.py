@@ -0,0 +1,201 @@
+import logging
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Exists, F, OuterRef, Q
+from jsonfield import JSONField
+
+from response.core.util import claim_rows
+
+logger = logging.getLogger(__name__)
+
+
+class JobManager(models.Manager):
+    def enqueue(
+        self,
+        name,
+        args=None,
+        kwargs=None,
+        max_attempts=None,
+        dedupe_key=None,
+        shard_key=None,
+    ):
+        """
+        Adds a job to the queue. If `dedupe_key` is given and a job with the
+        same key has been enqueued before, nothing is added and None is returned.
+
+        Jobs with the same `shard_key` are run one at a time, in the order
+        they were enqueued.
+        """
+        try:
+            with transaction.atomic():
+                return self.create(
+                    name=name,
+                    args=list(args or []),
+                    kwargs=kwargs or {},
+                    max_attempts=max_attempts
+                    or getattr(settings, "RESPONSE_JOB_MAX_ATTEMPTS", 5),
+                    run_at=datetime.now(),
+                    dedupe_key=dedupe_key,
+                    shard_key=shard_key,
+                )
+        except IntegrityError:
+            if dedupe_key is None:
+                raise
+            logger.info(f"Not enqueuing {name}: already enqueued as {dedupe_key}")
+            return None
+
+    def lease(self):
+        """
+        How long a claim on a running job lasts. Workers renew the claims on
+        the jobs they're running (see heartbeat), so a job is only treated as
+        abandoned if its worker stops responding for this long.
+        """
+        return timedelta(
+            seconds=getattr(settings, "RESPONSE_JOB_TIMEOUT_SECONDS", 5 * 60)
+        )
+
+    def _abandoned(self, now):
+        "Running jobs whose worker seems to have died (e.g. the process was recycled)"
+        return Q(status=Job.RUNNING, claimed_until__lt=now)
+
+    def runnable(self, now=None):
+        """
+        Jobs that are due to run, including abandoned jobs that have attempts
+        left. Jobs waiting for an earlier job with the same shard key (which
+        is still pending, e.g. waiting to be retried, or running) aren't
+        runnable yet.
+        """
+        now = now or datetime.now()
+        earlier_in_shard = self.filter(
+            shard_key=OuterRef("shard_key"),
+            pk__lt=OuterRef("pk"),
+            status__in=(Job.PENDING, Job.RUNNING),
+        )
+        return self.annotate(waiting=Exists(earlier_in_shard)).filter(
+            Q(status=Job.PENDING, run_at__lte=now)
+            | self._abandoned(now) & Q(attempts__lt=F("max_attempts")),
+            waiting=False,
+        )
+
+    def fail_abandoned(self):
+        """
+        Marks abandoned jobs that have used all their attempts as failed, so
+        that a job that keeps killing its worker isn't retried forever.
+        """
+        now = datetime.now()
+        failed = self.filter(
+            self._abandoned(now), attempts__gte=F("max_attempts")
+        ).update(
+            status=Job.FAILED,
+            finished_at=now,
+            claimed_by=None,
+            claimed_until=None,
+            last_error="Timed out: the worker running it stopped responding",
+        )
+        if failed:
+            logger.error(f"Marked {failed} abandoned jobs as failed")
+        return failed
+
+    def claim(self, worker, limit=1):
+        """
+        Claims up to `limit` runnable jobs for `worker` (see
+        response.core.util.claim_rows), so that if several workers race for a
+        job only one of them gets it.
+        """
+        self.fail_abandoned()
+
+        now = datetime.now()
+        token = claim_rows(
+            self.runnable(now).order_by("run_at"),
+            worker,
+            self.lease(),
+            limit=limit,
+            now=now,
+            updates={
+                "status": Job.RUNNING,
+                "worker": worker,
+                "started_at": now,
+                "attempts": F("attempts") + 1,
+            },
+        )
+        if not token:
+            return []
+        return list(self.filter(claimed_by=token).order_by("run_at"))
+
+    def heartbeat(self, tokens):
+        """
+        Renews the claims with `tokens` on running jobs, so they aren't
+        treated as abandoned while they're still running
+        """
+        return self.filter(status=Job.RUNNING, claimed_by__in=tokens).update(
+            claimed_until=datetime.now() + self.lease()
+        )
+
+    def prune(self):
+        """
+        Deletes the jobs that finished more than RESPONSE_JOB_RETENTION_DAYS
+        ago (7 by default, or never if it's None). Their dedupe keys go with
+        them, which only matters if the same job is enqueued again after that
+        long.
+        """
+        retention_days = getattr(settings, "RESPONSE_JOB_RETENTION_DAYS", 7)
+        if retention_days is None:
+            return 0
+
+        deleted, _ = self.filter(
+            status__in=(Job.SUCCEEDED, Job.FAILED),
+            finished_at__lt=datetime.now() - timedelta(days=retention_days),
+        ).delete()
+        if deleted:
+            logger.info(f"Deleted {deleted} finished jobs")
+        return deleted
+
+
+class Job(models.Model):
+    """
+    A unit of background work, run by `manage.py response_worker`.
+
+    See response.core.jobs for how jobs are registered and enqueued.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    STATUSES = (
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    )
+
+    objects = JobManager()
+
+    name = models.CharField(max_length=200)
+    dedupe_key = models.CharField(max_length=200, unique=True, blank=True, null=True)
+    shard_key = models.CharField(max_length=200, blank=True, null=True, db_index=True)
+    args = JSONField(default=list)
+    kwargs = JSONField(default=dict)
+
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    last_error = models.TextField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    run_at = models.DateTimeField()
+    worker = models.CharField(max_length=100, blank=True, null=True)
+    claimed_by = models.CharField(max_length=100, blank=True, null=True)
+    claimed_until = models.DateTimeField(blank=True, null=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    duration_ms = models.PositiveIntegerField(blank=True, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_at"])]
+
+    def __str__(self):
+        return f"{self.name} ({self.status}, attempt {self.attempts})"
@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from jsonfield import JSONField
+
+from response.core.util import claim_rows
+
+
+class OutboxEntryManager(models.Manager):
+    def lease(self):
+        return timedelta(
+            seconds=getattr(settings, "RESPONSE_EVENT_OUTBOX_LEASE_SECONDS", 5 * 60)
+        )
+
+    def claim(self, worker, limit, now=None):
+        """
+        Claims up to `limit` of the oldest unclaimed entries for `worker` (see
+        response.core.util.claim_rows), so that if several processes drain
+        the outbox at once, each entry is only drained by one of them.
+
+        Entries are leased to `worker` for RESPONSE_EVENT_OUTBOX_LEASE_SECONDS,
+        after which they can be claimed again (e.g. if the worker died part way
+        through).
+        """
+        token = claim_rows(
+            self.order_by("pk"), worker, self.lease(), limit=limit, now=now
+        )
+        if not token:
+            return []
+        return list(self.filter(claimed_by=token).order_by("pk"))
+
+
+class OutboxEntry(models.Model):
+    """
+    Records that an incident or action was saved and needs an Event, so that
+    the Event can be built and stored later, in bulk, rather than on every
+    save.
+
+    See response.core.events for how entries are recorded and drained.
+    """
+
+    INCIDENT = "incident"
+    ACTION = "action"
+
+    MODELS = ((INCIDENT, "Incident"), (ACTION, "Action"))
+
+    objects = OutboxEntryManager()
+
+    model = models.CharField(max_length=20, choices=MODELS)
+    object_id = models.PositiveIntegerField()
+    incident_id = models.PositiveIntegerField()
+    # The values of the object's fields when it was saved, so that its Event
+    # records it as it was then rather than when the outbox is drained
+    snapshot = JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_by = models.CharField(max_length=100, null=True, blank=True)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "outbox entries"
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} ({self.created_at})"
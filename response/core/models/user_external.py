@@ -9,6 +9,52 @@ class ExternalUserManager(models.Manager):
     def update_or_create_slack(self, *args, **kwargs):
         return self.update_or_create(app_id="slack", *args, **kwargs)
 
+    def bulk_sync_slack(self, users):
+        """
+        Brings the cached Slack users in line with `users`, a dict of external
+        ID to field values, in a handful of queries: existing rows are loaded
+        in one go and diffed in memory, and only new or changed rows are
+        written.
+
+        Returns a dict of the number of rows inserted, updated and unchanged,
+        and the external IDs of the rows that were written.
+        """
+        existing = {}
+        for user in self.filter(app_id="slack", external_id__in=users.keys()):
+            existing.setdefault(user.external_id, []).append(user)
+
+        to_create = []
+        to_update = []
+        unchanged = 0
+        fields = set()
+        for external_id, defaults in users.items():
+            if external_id not in existing:
+                to_create.append(
+                    ExternalUser(app_id="slack", external_id=external_id, **defaults)
+                )
+                continue
+
+            for user in existing[external_id]:
+                changed = [k for k, v in defaults.items() if getattr(user, k) != v]
+                if not changed:
+                    unchanged += 1
+                    continue
+                for k in changed:
+                    setattr(user, k, defaults[k])
+                fields.update(changed)
+                to_update.append(user)
+
+        self.bulk_create(to_create)
+        if to_update:
+            self.bulk_update(to_update, sorted(fields))
+
+        stats = {
+            "inserted": len(to_create),
+            "updated": len(to_update),
+            "unchanged": unchanged,
+        }
+        return stats, [u.external_id for u in to_create + to_update]
+
 
 class ExternalUser(models.Model):
     class Meta:
@@ -17,7 +63,12 @@ class ExternalUser(models.Model):
     owner = models.ForeignKey(User, on_delete=models.PROTECT, null=True, blank=True)
     app_id = models.CharField(max_length=50, blank=False, null=False)
     external_id = models.CharField(max_length=50, blank=False, null=False)
-    display_name = models.CharField(max_length=50, blank=False, null=False)
+    display_name = models.CharField(
+        max_length=50, blank=False, null=False, db_index=True
+    )
+    # The Slack username (`name` in the users API), which can differ from
+    # the display name
+    username = models.CharField(max_length=50, blank=True, null=True, db_index=True)
     full_name = models.CharField(max_length=50, blank=True, null=True)
     email = models.CharField(max_length=100, blank=True, null=True)
     deleted = models.BooleanField(default=False)
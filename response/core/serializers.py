@@ -1,11 +1,11 @@
-import json
-
 import emoji_data_python
+from django.db import models
 from rest_framework import serializers
 
 from response.core.models import Action, Event, ExternalUser, Incident, TimelineEvent
+from response.slack.cache import get_user_profiles
 from response.slack.models import CommsChannel
-from response.slack.reference_utils import slack_to_human_readable
+from response.slack.reference_utils import slack_to_human_readable, user_ids_in
 
 
 class ExternalUserSerializer(serializers.ModelSerializer):
@@ -21,14 +21,37 @@ class ExternalUserSerializer(serializers.ModelSerializer):
         )
 
 
+class SlackTextListSerializer(serializers.ListSerializer):
+    """
+    Resolves the users referenced in the child serializer's
+    `slack_text_fields` for the whole list in one batch, so that rendering
+    each item is served from the user profile cache.
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.Manager) else data)
+        get_user_profiles(
+            user_ids_in(
+                *(
+                    getattr(item, field)
+                    for item in items
+                    for field in self.child.slack_text_fields
+                )
+            )
+        )
+        return super().to_representation(items)
+
+
 class TimelineEventSerializer(serializers.ModelSerializer):
     metadata = serializers.JSONField(allow_null=True, required=False)
     # Read-only field for displaying human-readable slack references. Updates
     # should be applied to the text field.
     text_ui = serializers.SerializerMethodField()
+    slack_text_fields = ("text",)
 
     class Meta:
         model = TimelineEvent
+        list_serializer_class = SlackTextListSerializer
         fields = ("id", "timestamp", "text", "event_type", "metadata", "text_ui")
         read_only_fields = ("id",)
 
@@ -50,9 +73,11 @@ class ActionSerializer(serializers.ModelSerializer):
     # deserialised (including creation), and so it remains unchanged (if None, it remains None).
     # `allow_null` is set to False by default so we still demand a value is given _if_ it's sent in the json.
     priority = serializers.CharField(required=False)
+    slack_text_fields = ("details",)
 
     class Meta:
         model = Action
+        list_serializer_class = SlackTextListSerializer
         fields = (
             "id",
             "details",
@@ -160,13 +185,35 @@ class IncidentSerializer(serializers.ModelSerializer):
         return instance
 
 
+class ActionEventSerializer(ActionSerializer):
+    "Actions as recorded in Events, without the UI-only fields"
+
+    details_ui = None
+
+    class Meta(ActionSerializer.Meta):
+        list_serializer_class = serializers.ListSerializer
+        fields = tuple(f for f in ActionSerializer.Meta.fields if f != "details_ui")
+
+
+class IncidentEventSerializer(IncidentSerializer):
+    """
+    Incidents as recorded in Events. Actions generate their own events, so
+    aren't included here.
+    """
+
+    action_items = None
+    comms_channel = CommsChannelSerializer(
+        source="commschannel", read_only=True, allow_null=True
+    )
+
+    class Meta(IncidentSerializer.Meta):
+        fields = tuple(f for f in IncidentSerializer.Meta.fields if f != "action_items")
+
+
 class EventSerializer(serializers.ModelSerializer):
-    payload = serializers.SerializerMethodField()
+    payload = serializers.JSONField(read_only=True)
 
     class Meta:
         model = Event
-        fields = ("id", "timestamp", "event_type", "payload")
-        read_only_fields = ("id", "timestamp", "event_type", "payload")
-
-    def get_payload(self, instance):
-        return json.loads(instance.payload)
+        fields = ("id", "timestamp", "event_type", "incident_id", "payload")
+        read_only_fields = ("id", "timestamp", "event_type", "incident_id", "payload")
@@ -1,12 +1,11 @@
 import logging
-from datetime import datetime
 
 from django.conf import settings
 from django.db.models.signals import post_save
 from django.utils.module_loading import import_string
 
-from response.core.models import Action, Event, Incident
-from response.core.serializers import ActionSerializer, IncidentSerializer
+from response.core.events import action_event, incident_event
+from response.core.models import Action, Incident
 
 logger = logging.getLogger(__name__)
 
@@ -19,17 +18,7 @@ class ActionEventHandler:
             return
         logger.info(f"Handling post_save for action: {instance}")
 
-        event = Event()
-        event.event_type = Event.ACTION_EVENT_TYPE
-
-        # Event payload should be a dict for serializing to JSON.
-        event.payload = ActionSerializer(instance).data
-        event.payload["incident_id"] = instance.incident.pk
-        if "details_ui" in event.payload:
-            del event.payload["details_ui"]
-
-        event.timestamp = datetime.now(tz=None)
-        event.save()
+        action_event(instance).save()
 
 
 class IncidentEventHandler:
@@ -40,17 +29,7 @@ class IncidentEventHandler:
             return
         logger.info(f"Handling post_save for incident: {instance}")
 
-        event = Event()
-        event.event_type = Event.INCIDENT_EVENT_TYPE
-
-        # Event payload should be a dict for serializing to JSON.
-        event.payload = IncidentSerializer(instance).data
-        # Actions generate their own events, no need to duplicate them here.
-        if "action_items" in event.payload:
-            del event.payload["action_items"]
-
-        event.timestamp = datetime.now(tz=None)
-        event.save()
+        incident_event(instance).save()
 
 
 if hasattr(settings, "ACTION_EVENT_HANDLER_CLASS"):
@@ -1,8 +1,23 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+
 import bleach
 import bleach_whitelist
 from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models import Q
 from rest_framework.pagination import PageNumberPagination
 
+logger = logging.getLogger(__name__)
+
 
 def sanitize(string):
     # bleach doesn't handle None so let's not pass it
@@ -21,3 +36,239 @@ class LargeResultsSetPagination(PageNumberPagination):
     page_size = 500
     max_page_size = 1000
     page_size_query_param = "page_size"
+
+
+class LRUCache:
+    """
+    A bounded, thread-safe, in-process LRU cache whose entries expire after
+    `ttl_seconds`.
+
+    If `cache_alias` names one of Django's CACHES, entries are also written to
+    that cache (under `key_prefix`), so that processes can share them: local
+    misses fall back to the shared cache before counting as a miss.
+    """
+
+    MISSING = object()
+
+    def __init__(self, maxsize=1000, ttl_seconds=300, cache_alias=None, key_prefix=""):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias] if self.cache_alias else None
+
+    def _shared_key(self, key):
+        return f"{self.key_prefix}{key}"
+
+    def get(self, key):
+        "Returns the cached value for `key`, or LRUCache.MISSING"
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+
+        if self.shared is not None:
+            value = self.shared.get(self._shared_key(key), self.MISSING)
+            if value is not self.MISSING:
+                self._set_local(key, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return self.MISSING
+
+    def set(self, key, value, ttl_seconds=None):
+        "Caches `value`, for `ttl_seconds` if given instead of the default TTL"
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._set_local(key, value, ttl_seconds)
+        if self.shared is not None:
+            self.shared.set(self._shared_key(key), value, ttl_seconds)
+
+    def add(self, key, value=True):
+        """
+        Caches `value` only if `key` isn't already cached, returning whether it
+        was added. Useful for de-duplication, as a check-and-set that is atomic
+        in this process (and across processes with a shared cache that
+        supports atomic adds, e.g. memcached or Redis).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return False
+            self._store(key, value)
+
+        if self.shared is not None:
+            return self.shared.add(self._shared_key(key), value, self.ttl_seconds)
+        return True
+
+    def _set_local(self, key, value, ttl_seconds=None):
+        with self._lock:
+            self._store(key, value, ttl_seconds)
+
+    def _store(self, key, value, ttl_seconds=None):
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (time.monotonic() + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        if self.shared is not None and keys:
+            self.shared.delete_many([self._shared_key(k) for k in keys])
+
+    def delete(self, key):
+        self.delete_many([key])
+
+    def clear(self):
+        "Empties the local cache and resets its counters"
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+def worker_id():
+    "Identifies this process, for recording which worker claimed something"
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+@contextmanager
+def closing_db_connection():
+    """
+    Closes this thread's DB connection when the block exits. Use it in
+    background threads: each thread gets its own DB connection, which Django
+    won't clean up for us outside of a request.
+    """
+    try:
+        yield
+    finally:
+        connection.close()
+
+
+def claim_rows(queryset, worker, lease, limit=None, now=None, updates=None):
+    """
+    Claims the rows in `queryset` that aren't claimed already (or whose claim
+    has expired) for `worker`, for `lease` (a timedelta), so that if several
+    workers process the same rows at once each row is only claimed by one of
+    them. The model needs `claimed_by` and `claimed_until` fields; the field
+    values in `updates` are applied to the claimed rows too.
+
+    Returns the token the claimed rows were given as `claimed_by`, or None if
+    nothing was claimed. Up to `limit` rows are claimed, in the queryset's
+    order.
+
+    On databases that support it (e.g. Postgres), rows are selected with FOR
+    UPDATE SKIP LOCKED, so workers don't wait for each other's rows.
+    Elsewhere (e.g. SQLite, which locks the whole database) the claim is a
+    single conditional UPDATE, so concurrent claims can't both get a row.
+    """
+    now = now or datetime.now()
+    token = f"{worker}:{uuid.uuid4().hex}"
+    unclaimed = Q(claimed_until__isnull=True) | Q(claimed_until__lt=now)
+    claimable = queryset.filter(unclaimed)
+    updates = dict(updates or {}, claimed_by=token, claimed_until=now + lease)
+    rows = queryset.model._default_manager
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            locked = claimable.select_for_update(skip_locked=True)[:limit]
+            claimed = rows.filter(
+                pk__in=list(locked.values_list("pk", flat=True))
+            ).update(**updates)
+    else:
+        claimed = rows.filter(unclaimed, pk__in=claimable.values("pk")[:limit]).update(
+            **updates
+        )
+
+    return token if claimed else None
+
+
+class Debouncer:
+    """
+    Coalesces calls to `func(key)`. The first request for a key starts a
+    timer of `delay()` seconds, once the current transaction (if any)
+    commits. Further requests for the key are dropped until the timer fires,
+    and then `func(key)` is called once, on the timer's thread.
+
+    `delay` is a function, so that settings are read when they're needed.
+    Pass `on_commit=False` to start timers straight away, if `func` doesn't
+    depend on what's being written to the database.
+    """
+
+    def __init__(self, func, delay, on_commit=True):
+        self.func = func
+        self.delay = delay
+        self.on_commit = on_commit
+        self._timers = {}
+        self._lock = threading.Lock()
+
+    def request(self, key=None):
+        if not self.on_commit:
+            self._schedule(key)
+            return
+        # don't start the timer until the change has been committed, or
+        # `func` might not see it
+        transaction.on_commit(lambda: self._schedule(key))
+
+    def _schedule(self, key):
+        with self._lock:
+            if key in self._timers:
+                return
+            timer = threading.Timer(self.delay(), self._fire, args=(key,))
+            timer.daemon = True
+            self._timers[key] = timer
+            timer.start()
+
+    def _fire(self, key):
+        with self._lock:
+            self._timers.pop(key, None)
+        with closing_db_connection():
+            try:
+                self.func(key)
+            except Exception:
+                logger.exception(f"Failed to run {self.func.__qualname__}({key})")
+
+    def cancel(self, key=None):
+        "Cancels the call waiting for `key`, returning whether there was one"
+        with self._lock:
+            timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        return timer is not None
+
+    def pending(self):
+        "Returns the keys with a call waiting"
+        with self._lock:
+            return set(self._timers)
+
+    def flush(self):
+        "Makes the waiting calls now, on this thread"
+        for key in self.pending():
+            if self.cancel(key):
+                self.func(key)
@@ -1,6 +1,12 @@
+import math
+import time
 from datetime import datetime, timedelta
 
+from django.conf import settings
 from rest_framework import pagination, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 
 from response.core import serializers
 from response.core.models.action import Action
@@ -86,6 +92,14 @@ class IncidentTimelineEventViewSet(viewsets.ModelViewSet):
 
 
 class EventsViewSet(viewsets.ModelViewSet):
+    """
+    Allows getting a list of Events between `from` and `to` (by default, the
+    last day). Pass `incident` to only get the events for an incident, and
+    `type` to only get events of one type (e.g. `incident_event`).
+
+    To follow new events as they happen, use `feed` instead.
+    """
+
     queryset = Event.objects.all()
     serializer_class = serializers.EventSerializer
 
@@ -94,4 +108,60 @@ class EventsViewSet(viewsets.ModelViewSet):
             "from", datetime.now(tz=None) - timedelta(days=1)
         )
         to_ts = self.request.query_params.get("to", datetime.now(tz=None))
-        return Event.objects.filter(timestamp__range=(from_ts, to_ts))
+        events = Event.objects.filter(timestamp__range=(from_ts, to_ts))
+
+        incident_id = self.request.query_params.get("incident")
+        if incident_id is not None:
+            if not incident_id.isdigit():
+                raise ValidationError({"incident": "Must be an incident ID"})
+            events = events.filter(incident_id=incident_id)
+
+        event_type = self.request.query_params.get("type")
+        if event_type is not None:
+            events = events.filter(event_type=event_type)
+
+        return events
+
+    @action(detail=False)
+    def feed(self, request):
+        """
+        Returns the events after the cursor `since` (or from the start, if
+        it's not given), oldest first, and the cursor to pass as `since` to
+        get the events after them. Following the cursor returns every event
+        exactly once.
+
+        Pass `limit` to get up to that many events (100 by default, at most
+        1000), and `wait` to wait up to that many seconds (at most
+        RESPONSE_EVENT_FEED_MAX_WAIT_SECONDS) for new events if there aren't
+        any yet.
+        """
+        try:
+            since = request.query_params.get("since")
+            position = Event.parse_cursor(since) if since else None
+            limit = min(int(request.query_params.get("limit", 100)), 1000)
+            wait = float(request.query_params.get("wait", 0))
+        except ValueError as e:
+            raise ValidationError(str(e))
+        if limit < 1:
+            raise ValidationError("limit must be at least 1")
+        if not math.isfinite(wait):
+            raise ValidationError("wait must be a number of seconds")
+        wait = max(
+            0, min(wait, getattr(settings, "RESPONSE_EVENT_FEED_MAX_WAIT_SECONDS", 30))
+        )
+
+        poll_interval = getattr(settings, "RESPONSE_EVENT_FEED_POLL_SECONDS", 0.5)
+        deadline = time.monotonic() + wait
+        while True:
+            events = list(Event.objects.feed(since=position)[:limit])
+            remaining = deadline - time.monotonic()
+            if events or remaining <= 0:
+                break
+            time.sleep(min(poll_interval, remaining))
+
+        return Response(
+            {
+                "cursor": events[-1].cursor if events else since,
+                "results": self.get_serializer(events, many=True).data,
+            }
+        )
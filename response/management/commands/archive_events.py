@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from response.core.archive import archive_events, parse_timestamp, retention_horizon
+
+
+class Command(BaseCommand):
+    help = "Moves old events out of the database into gzipped JSON lines files, by day"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Archive events older than this many days (default: RESPONSE_EVENT_RETENTION_DAYS)",
+        )
+        parser.add_argument(
+            "--before",
+            type=parse_timestamp,
+            help="Archive events from before this date/time (e.g. 2019-06-01), instead of --days",
+        )
+        parser.add_argument(
+            "--dir",
+            help="Where to write the archive (default: RESPONSE_EVENT_ARCHIVE_DIR)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="How many events to archive at a time (default: RESPONSE_EVENT_ARCHIVE_BATCH_SIZE)",
+        )
+
+    def handle(self, *args, **options):
+        before = options["before"]
+        if before is None:
+            days = options["days"]
+            if days is None:
+                days = getattr(settings, "RESPONSE_EVENT_RETENTION_DAYS", None)
+            if days is None:
+                raise CommandError(
+                    "Pass --days or --before, or set RESPONSE_EVENT_RETENTION_DAYS"
+                )
+            before = retention_horizon(days)
+
+        archived = archive_events(
+            before, directory=options["dir"], batch_size=options["batch_size"]
+        )
+        self.stdout.write(f"Archived {archived} events from before {before}")
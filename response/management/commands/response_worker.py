@@ -0,0 +1,40 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from response.core.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = "Runs background jobs (e.g. Slack actions and dialogs) from the job queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            help="How many jobs to run at once (default: RESPONSE_JOB_WORKER_CONCURRENCY)",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            help="Seconds to wait between polls of an empty queue (default: RESPONSE_JOB_POLL_INTERVAL_SECONDS)",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once there are no more jobs ready to run",
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrency=options["concurrency"], poll_interval=options["poll_interval"]
+        )
+
+        def _stop(signum, frame):
+            self.stdout.write("Stopping once running jobs have finished")
+            worker.stop()
+
+        signal.signal(signal.SIGTERM, _stop)
+        signal.signal(signal.SIGINT, _stop)
+
+        worker.run(burst=options["burst"])
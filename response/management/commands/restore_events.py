@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from response.core.archive import parse_timestamp, restore_events
+
+
+class Command(BaseCommand):
+    help = "Copies archived events from a date range back into the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from",
+            dest="start",
+            type=parse_timestamp,
+            required=True,
+            help="Restore events from this date/time (e.g. 2019-06-01)",
+        )
+        parser.add_argument(
+            "--to",
+            dest="end",
+            type=parse_timestamp,
+            required=True,
+            help="Restore events up to this date/time (e.g. 2019-06-30T23:59:59)",
+        )
+        parser.add_argument(
+            "--dir", help="Where the archive is (default: RESPONSE_EVENT_ARCHIVE_DIR)"
+        )
+
+    def handle(self, *args, **options):
+        restored = restore_events(
+            options["start"], options["end"], directory=options["dir"]
+        )
+        self.stdout.write(
+            f"Restored {restored} events from between {options['start']} and {options['end']}"
+        )
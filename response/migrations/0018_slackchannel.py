@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("response", "0017_externaluser_deleted")]
+
+    operations = [
+        migrations.CreateModel(
+            name="SlackChannel",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("channel_id", models.CharField(max_length=20, unique=True)),
+                ("name", models.CharField(db_index=True, max_length=80)),
+                ("is_archived", models.BooleanField(default=False)),
+                ("last_seen", models.DateTimeField()),
+            ],
+        )
+    ]
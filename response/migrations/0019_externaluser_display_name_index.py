@@ -0,0 +1,16 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("response", "0018_slackchannel")]
+
+    operations = [
+        migrations.AlterField(
+            model_name="externaluser",
+            name="display_name",
+            field=models.CharField(db_index=True, max_length=50),
+        )
+    ]
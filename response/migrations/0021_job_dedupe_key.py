@@ -0,0 +1,16 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("response", "0020_job")]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="dedupe_key",
+            field=models.CharField(blank=True, max_length=200, null=True, unique=True),
+        )
+    ]
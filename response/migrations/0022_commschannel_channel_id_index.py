@@ -0,0 +1,16 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("response", "0021_job_dedupe_key")]
+
+    operations = [
+        migrations.AlterField(
+            model_name="commschannel",
+            name="channel_id",
+            field=models.CharField(db_index=True, max_length=20),
+        )
+    ]
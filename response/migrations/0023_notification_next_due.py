@@ -0,0 +1,21 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("response", "0022_commschannel_channel_id_index")]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="next_due",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="notification",
+            name="time",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
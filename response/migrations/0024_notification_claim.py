@@ -0,0 +1,21 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("response", "0023_notification_next_due")]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="claimed_by",
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="claimed_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
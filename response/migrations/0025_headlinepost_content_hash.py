@@ -0,0 +1,16 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("response", "0024_notification_claim")]
+
+    operations = [
+        migrations.AddField(
+            model_name="headlinepost",
+            name="content_hash",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        )
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:46
+
+import jsonfield.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("response", "0025_headlinepost_content_hash")]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxEntry",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "model",
+                    models.CharField(
+                        choices=[("incident", "Incident"), ("action", "Action")],
+                        max_length=20,
+                    ),
+                ),
+                ("object_id", models.PositiveIntegerField()),
+                ("incident_id", models.PositiveIntegerField()),
+                ("changed_fields", jsonfield.fields.JSONField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={"verbose_name_plural": "outbox entries"},
+        )
+    ]
@@ -0,0 +1,56 @@
+"""
+Event payloads were JSON encoded by hand into a TextField. This switches them
+to a JSONField (which stores the same text, so existing rows don't need
+converting), and copies the incident ID out of each existing payload into a
+new, indexed incident_id column so that events can be looked up by incident.
+"""
+
+import jsonfield.fields
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def set_event_incident_ids(apps, schema_editor):
+    Event = apps.get_model("response", "Event")
+    events = Event.objects.filter(incident_id__isnull=True).order_by("pk")
+
+    last_pk = 0
+    while True:
+        batch = list(events.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+
+        for event in batch:
+            if not isinstance(event.payload, dict):
+                continue
+            if event.event_type == "action_event":
+                event.incident_id = event.payload.get("incident_id")
+            elif event.event_type == "incident_event":
+                event.incident_id = event.payload.get("id")
+        Event.objects.bulk_update(batch, ["incident_id"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("response", "0026_outboxentry")]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="incident_id",
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="event",
+            name="event_type",
+            field=models.CharField(db_index=True, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name="event",
+            name="payload",
+            field=jsonfield.fields.JSONField(default=dict),
+        ),
+        migrations.RunPython(set_event_incident_ids, migrations.RunPython.noop),
+    ]
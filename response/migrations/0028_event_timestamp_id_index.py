@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("response", "0027_event_payload_json")]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["timestamp", "id"], name="response_event_timestamp_id"
+            ),
+        )
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("response", "0028_event_timestamp_id_index")]
+
+    operations = [
+        migrations.AddField(
+            model_name="externaluser",
+            name="username",
+            field=models.CharField(blank=True, db_index=True, max_length=50, null=True),
+        )
+    ]
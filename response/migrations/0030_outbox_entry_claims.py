@@ -0,0 +1,22 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("response", "0029_externaluser_username")]
+
+    operations = [
+        migrations.RemoveField(model_name="outboxentry", name="changed_fields"),
+        migrations.AddField(
+            model_name="outboxentry",
+            name="claimed_by",
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name="outboxentry",
+            name="claimed_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
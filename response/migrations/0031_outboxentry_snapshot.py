@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:39
+
+import jsonfield.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("response", "0030_outbox_entry_claims")]
+
+    operations = [
+        migrations.AddField(
+            model_name="outboxentry",
+            name="snapshot",
+            field=jsonfield.fields.JSONField(blank=True, null=True),
+        )
+    ]
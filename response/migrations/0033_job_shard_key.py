@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("response", "0032_job_claims")]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="shard_key",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=200, null=True
+            ),
+        )
+    ]
@@ -1,9 +1,18 @@
-from .core.models import Action, Event, ExternalUser, Incident, TimelineEvent
+from .core.models import (
+    Action,
+    Event,
+    ExternalUser,
+    Incident,
+    Job,
+    OutboxEntry,
+    TimelineEvent,
+)
 from .slack.models import (
     CommsChannel,
     HeadlinePost,
     Notification,
     PinnedMessage,
+    SlackChannel,
     UserStats,
 )
 
@@ -11,11 +20,14 @@ __all__ = (
     "Action",
     "Event",
     "Incident",
+    "Job",
+    "OutboxEntry",
     "TimelineEvent",
     "ExternalUser",
     "CommsChannel",
     "HeadlinePost",
     "Notification",
     "PinnedMessage",
+    "SlackChannel",
     "UserStats",
 )
@@ -5,6 +5,7 @@ from response.slack.models import (
     HeadlinePost,
     Notification,
     PinnedMessage,
+    SlackChannel,
     UserStats,
 )
 
@@ -14,3 +15,4 @@ admin.site.register(CommsChannel)
 admin.site.register(Notification)
 admin.site.register(UserStats)
 admin.site.register(PinnedMessage)
+admin.site.register(SlackChannel)
@@ -0,0 +1,381 @@
+import asyncio
+import json
+import logging
+
+from slugify import slugify
+
+from response.slack.client import SlackError
+from response.slack.ratelimit import backoff_with_jitter, retry_after_seconds
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+
+async def gather_with_concurrency(aws, concurrency=10, return_exceptions=False):
+    """
+    Like asyncio.gather, but with at most `concurrency` of the awaitables
+    running at once. Results are returned in the same order as `aws`.
+
+    Example usage, inviting many users to a channel from synchronous code:
+
+    async def invite_all(user_ids, channel_id):
+        async with AsyncSlackClient(settings.SLACK_TOKEN) as client:
+            return await gather_with_concurrency(
+                [client.invite_user_to_channel(u, channel_id) for u in user_ids],
+                concurrency=5,
+                return_exceptions=True,
+            )
+
+    asyncio.run(invite_all(user_ids, channel_id))
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _run(aw):
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(
+        *(_run(aw) for aw in aws), return_exceptions=return_exceptions
+    )
+
+
+def encode_post_data(post_data):
+    """
+    Encode API arguments the same way slackclient does: plural fields become
+    comma-separated strings, other lists/dicts are sent as JSON, and unset
+    (None) arguments are left out.
+    """
+    encoded = {}
+    for k, v in post_data.items():
+        if v is None:
+            continue
+        if k in ("channels", "users", "types") and isinstance(v, list):
+            v = ",".join(v)
+        elif isinstance(v, (list, dict)):
+            v = json.dumps(v)
+        elif isinstance(v, bool):
+            v = str(v).lower()
+        encoded[k] = v if isinstance(v, str) else str(v)
+    return encoded
+
+
+class AsyncSlackClient(object):
+    """
+    An asyncio-native counterpart to SlackClient, with the same methods as
+    coroutines, so that fan-out work (inviting many users, posting to many
+    channels) can run concurrently rather than one call at a time.
+
+    Calls share a single aiohttp connection pool of `connection_pool_size`
+    keep-alive connections. Use the client as an async context manager (or
+    call close()) so that the pool is shut down cleanly.
+
+    Requires the `async` extra: pip install django-incident-response[async]
+    """
+
+    def __init__(
+        self,
+        api_token,
+        max_retry_attempts=10,
+        retry_base_backoff_seconds=0.2,
+        retryable_errors=None,
+        max_backoff_seconds=30,
+        rate_limiter=None,
+        connection_pool_size=10,
+        timeout_seconds=10,
+        base_url="https://slack.com/api/",
+    ):
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncSlackClient requires aiohttp. Install it with `pip install django-incident-response[async]`"
+            )
+
+        self.api_token = api_token
+        self.max_retry_attempts = max_retry_attempts
+        self.retry_base_backoff_seconds = retry_base_backoff_seconds
+        self.retryable_errors = retryable_errors or ["ratelimited"]
+        self.max_backoff_seconds = max_backoff_seconds
+        self.rate_limiter = rate_limiter
+        self.connection_pool_size = connection_pool_size
+        self.timeout_seconds = timeout_seconds
+        self.base_url = base_url
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    @property
+    def session(self):
+        # The session has to be created from within a running event loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.connection_pool_size),
+                timeout=aiohttp.ClientTimeout(total=self.timeout_seconds),
+                headers={"Authorization": f"Bearer {self.api_token}"},
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+    async def api_call(self, api_endpoint, **kwargs):
+        channel = kwargs.get("channel")
+        data = encode_post_data(kwargs)
+
+        attempt = 0
+        while True:
+            if self.rate_limiter:
+                await self.rate_limiter.acquire_async(api_endpoint, channel)
+
+            logger.info(f"Calling Slack API {api_endpoint}")
+            async with self.session.post(
+                f"{self.base_url}{api_endpoint}", data=data
+            ) as resp:
+                response = await resp.json(content_type=None)
+                headers = dict(resp.headers)
+
+            if response.get("ok", False):
+                return response
+
+            error = response.get("error", "<no error given>")
+            if error not in self.retryable_errors or attempt >= self.max_retry_attempts:
+                raise SlackError(
+                    f"Error calling Slack API endpoint '{api_endpoint}': {error}",
+                    slack_error=error,
+                )
+
+            attempt += 1
+            backoff_seconds = backoff_with_jitter(
+                attempt, self.retry_base_backoff_seconds, self.max_backoff_seconds
+            )
+            retry_after = retry_after_seconds(headers)
+            if retry_after is not None:
+                backoff_seconds = max(backoff_seconds, retry_after)
+                if self.rate_limiter:
+                    self.rate_limiter.retry_after(api_endpoint, retry_after, channel)
+
+            logger.warning(
+                f"Retrying request to {api_endpoint} after error {error}. Backing off {backoff_seconds:.2f}s (attempt {attempt} of {self.max_retry_attempts})"
+            )
+            await asyncio.sleep(backoff_seconds)
+
+    async def users_list(self):
+        logger.info("Listing Slack users")
+        return await self.api_call("users.list")
+
+    async def get_paginated_users(self, limit=0, cursor=None):
+        return await self.api_call("users.list", limit=limit, cursor=cursor)
+
+    async def find_user(self, name, page_size=200):
+        """
+        Pages through users.list looking for a user by name, stopping as soon
+        as it's found rather than downloading the whole workspace.
+        """
+        cursor = None
+        while cursor != "":
+            response = await self.get_paginated_users(limit=page_size, cursor=cursor)
+            for user in response["members"]:
+                if user["name"] == name:
+                    return user
+            cursor = response.get("response_metadata", {}).get("next_cursor", "")
+        raise SlackError(f"User '{name}' not found")
+
+    async def get_user_id(self, name):
+        logger.info(f"Getting user ID for {name}")
+        return (await self.find_user(name))["id"]
+
+    async def get_channel_name(self, id_):
+        try:
+            response = await self.api_call("conversations.info", channel=id_)
+            return response["channel"]["name"]
+        except SlackError as e:
+            if e.slack_error == "channel_not_found":
+                return None
+            raise
+
+    async def iter_channels(self, exclude_archived=True, page_size=800):
+        """
+        Yields each page of channels in the workspace from conversations.list,
+        so callers can stop paging as soon as they've found what they need.
+        """
+        next_cursor = None
+
+        while next_cursor != "":
+            response = await self.api_call(
+                "conversations.list",
+                exclude_archived=exclude_archived,
+                exclude_members=True,
+                limit=page_size,
+                cursor=next_cursor,
+            )
+            next_cursor = response.get("response_metadata", {}).get("next_cursor", "")
+
+            yield response["channels"]
+
+    async def get_channel_id(self, name, auto_unarchive=False):
+        logger.info(f"Getting channel ID for {name}")
+
+        async for channels in self.iter_channels(exclude_archived=not auto_unarchive):
+            for channel in channels:
+                if channel["name"] == name:
+                    if channel["is_archived"] and auto_unarchive:
+                        await self.unarchive_channel(channel["id"])
+                    return channel["id"]
+
+        raise SlackError(f"Channel '{name}' not found")
+
+    async def get_usergroup_id(self, group_handle):
+        response = await self.api_call("usergroups.list")
+        for group in response["usergroups"]:
+            if group["handle"] == group_handle:
+                return group["id"]
+        return None
+
+    async def get_usergroup_users(self, group_id):
+        response = await self.api_call("usergroups.list", include_users=True)
+        for group in response["usergroups"]:
+            if group["id"] == group_id:
+                return group["users"]
+        return None
+
+    async def create_channel(self, name):
+        response = await self.api_call("conversations.create", name=name)
+        try:
+            return response["channel"]["id"]
+        except KeyError:
+            raise SlackError(
+                "Got unexpected response from Slack API for conversations.create - couldn't find channel.id key"
+            )
+
+    async def get_or_create_channel(self, channel_name, auto_unarchive=False):
+        try:
+            return await self.create_channel(channel_name)
+        except SlackError as e:
+            if e.slack_error != "name_taken":
+                raise
+
+            return await self.get_channel_id(channel_name, auto_unarchive)
+
+    async def set_channel_topic(self, channel_id, channel_topic):
+        return await self.api_call(
+            "conversations.setTopic", channel=channel_id, topic=channel_topic
+        )
+
+    async def unarchive_channel(self, channel_id):
+        return await self.api_call("conversations.unarchive", channel=channel_id)
+
+    async def send_message(self, channel_id, text, attachments=None, thread_ts=None):
+        return await self.api_call(
+            "chat.postMessage",
+            channel=channel_id,
+            text=text,
+            attachments=attachments,
+            thread_ts=thread_ts,
+        )
+
+    async def send_ephemeral_message(self, channel_id, user_id, text, attachments=None):
+        return await self.api_call(
+            "chat.postEphemeral",
+            channel=channel_id,
+            text=text,
+            user=user_id,
+            attachments=attachments,
+        )
+
+    async def send_or_update_message_block(
+        self, channel_id, blocks, fallback_text, ts=None
+    ):
+        api_call = "chat.postMessage" if not ts else "chat.update"
+
+        return await self.api_call(
+            api_call, text=fallback_text, channel=channel_id, ts=ts, blocks=blocks
+        )
+
+    async def add_reaction(self, reaction, channel_id, thread_ts):
+        try:
+            return await self.api_call(
+                "reactions.add", name=reaction, channel=channel_id, timestamp=thread_ts
+            )
+        except SlackError as e:
+            if e.slack_error != "already_reacted":
+                raise
+
+    async def remove_reaction(self, reaction, channel_id, thread_ts):
+        try:
+            return await self.api_call(
+                "reactions.remove",
+                name=reaction,
+                channel=channel_id,
+                timestamp=thread_ts,
+            )
+        except SlackError as e:
+            if e.slack_error != "no_reaction":
+                raise
+
+    async def get_slack_token_owner(self):
+        try:
+            return (await self.api_call("auth.test"))["user_id"]
+        except KeyError:
+            raise SlackError(
+                "Got unexpected response from Slack API for auth.test - couldn't find user_id key"
+            )
+
+    async def invite_user_to_channel(self, user_id, channel_id):
+        return await self.api_call(
+            "conversations.invite", users=[user_id], channel=channel_id
+        )
+
+    async def join_channel(self, channel_id):
+        return await self.api_call("conversations.join", channel=channel_id)
+
+    async def leave_channel(self, channel_id):
+        return await self.api_call("conversations.leave", channel=channel_id)
+
+    async def get_user_profile(self, user_id):
+        if not user_id:
+            return None
+
+        response = await self.api_call("users.info", user=user_id)
+
+        return {
+            "id": user_id,
+            "name": response["user"]["name"],
+            "fullname": response["user"]["profile"]["real_name"],
+            "email": response["user"]["profile"].get("email", None),
+            "deleted": response["user"]["deleted"],
+        }
+
+    async def get_user_profile_by_email(self, email):
+        if not email:
+            return None
+
+        response = await self.api_call("users.lookupByEmail", email=email)
+
+        return {
+            "id": response["user"]["id"],
+            "name": response["user"]["name"],
+            "fullname": response["user"]["profile"]["real_name"],
+            "email": email,
+            "deleted": response["user"]["deleted"],
+        }
+
+    async def rename_channel(self, channel_id, new_name):
+        prefix = ""
+        if not (new_name.startswith("inc-") or new_name.startswith("#inc-")):
+            prefix = "inc-"
+
+        new_name = slugify(f"{prefix}{new_name}", max_length=80)
+
+        return await self.api_call(
+            "conversations.rename", channel=channel_id, name=new_name
+        )
+
+    async def dialog_open(self, dialog, trigger_id):
+        return await self.api_call("dialog.open", trigger_id=trigger_id, dialog=dialog)
@@ -1,3 +1,6 @@
+import hashlib
+import json
+
 from django.conf import settings
 
 
@@ -18,6 +21,19 @@ class Message:
             serialized.append(block.serialize())
         return serialized
 
+    def fingerprint(self):
+        """
+        Returns a hash of the message's content, which is the same whenever
+        the message would look the same in Slack
+        """
+        content = json.dumps(
+            {"fallback_text": self.fallback_text, "blocks": self.serialize()},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
     def send(self, channel, ts=None):
         """
         Build and send the message to the required channel
@@ -1,59 +1,111 @@
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from django.conf import settings
 from django.db import transaction
 
 from response.core.models import ExternalUser
+from response.core.util import LRUCache
 from response.slack.client import SlackError
 
 logger = logging.getLogger(__name__)
 
+# In-process cache of user profiles, in front of the ExternalUser table
+user_profile_cache = LRUCache(
+    maxsize=getattr(settings, "RESPONSE_USER_CACHE_SIZE", 10000),
+    ttl_seconds=getattr(settings, "RESPONSE_USER_CACHE_TTL_SECONDS", 300),
+    cache_alias=getattr(settings, "RESPONSE_USER_CACHE_ALIAS", None),
+    key_prefix="response:user_profile:",
+)
+
+# In-process cache of Slack channel ID to incident ID (or None for channels
+# that aren't incident comms channels), in front of the CommsChannel table
+channel_incident_cache = LRUCache(
+    maxsize=getattr(settings, "RESPONSE_CHANNEL_CACHE_SIZE", 10000),
+    ttl_seconds=getattr(settings, "RESPONSE_CHANNEL_CACHE_TTL_SECONDS", 60 * 60),
+)
+
+
+def user_cache_defaults(user):
+    "Maps a member from the Slack users API to ExternalUser fields"
+    return {
+        "display_name": user["profile"]["display_name_normalized"] or user["name"],
+        "username": user["name"],
+        "full_name": user["profile"]["real_name"] or user["name"],
+        "email": user["profile"].get("email", None),
+        "deleted": user["deleted"],
+    }
+
+
+def external_user_to_profile(external_user):
+    "Maps an ExternalUser to the profile dict returned by SlackClient"
+    return {
+        "id": external_user.external_id,
+        "name": external_user.display_name,
+        "fullname": external_user.full_name,
+        "email": external_user.email,
+        "deleted": external_user.deleted,
+    }
+
 
 def update_user_cache(exclude_bots=False):
+    """
+    Syncs the ExternalUser cache with the users in the Slack workspace, a page
+    at a time, writing only the users that are new or have changed.
+
+    Returns the number of users inserted, updated and unchanged, and how long
+    the sync took.
+    """
+    start = time.monotonic()
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0}
+
     cursor = None
     while cursor != "":
         response = settings.SLACK_CLIENT.get_paginated_users(limit=200, cursor=cursor)
 
-        users = response["members"]
+        users = {
+            user["id"]: user_cache_defaults(user)
+            for user in response["members"]
+            if not (exclude_bots and user["is_bot"])
+        }
 
         logger.info(f"Updating {len(users)} users in the cache")
         with transaction.atomic():
-            for user in users:
-                if exclude_bots and user["is_bot"]:
-                    continue
-                ExternalUser.objects.update_or_create_slack(
-                    external_id=user["id"],
-                    defaults={
-                        "display_name": user["profile"]["display_name_normalized"]
-                        or user["name"],
-                        "full_name": user["profile"]["real_name"] or user["name"],
-                        "email": user["profile"].get("email", None),
-                        "deleted": user["deleted"],
-                    },
-                )
+            page_stats, changed = ExternalUser.objects.bulk_sync_slack(users)
+        user_profile_cache.delete_many(changed)
+        for k, v in page_stats.items():
+            stats[k] += v
         cursor = response["response_metadata"].get("next_cursor")
 
+    stats["seconds"] = round(time.monotonic() - start, 3)
+    logger.info(
+        f"Updated user cache in {stats['seconds']}s: {stats['inserted']} inserted, {stats['updated']} updated, {stats['unchanged']} unchanged"
+    )
+    return stats
+
 
 def get_user_profile(external_id):
     """
     Gets a slack user profile:
-        - from the DB cache if available
+        - from the in-process cache if available
+        - or else from the DB cache
         - or else from the Slack API
     """
     if not external_id:
         return None
 
+    user_profile = user_profile_cache.get(external_id)
+    if user_profile is not LRUCache.MISSING:
+        return user_profile
+
     try:
         external_user = ExternalUser.objects.get(external_id=external_id)
         logger.info(f"Got user {external_id} from DB cache")
 
-        return {
-            "id": external_user.external_id,
-            "name": external_user.display_name,
-            "fullname": external_user.full_name,
-            "email": external_user.email,
-            "deleted": external_user.deleted,
-        }
+        user_profile = external_user_to_profile(external_user)
+        user_profile_cache.set(external_id, user_profile)
+        return user_profile
     except ExternalUser.DoesNotExist:
         # profile from slack
         try:
@@ -74,9 +126,74 @@ def get_user_profile(external_id):
         )
 
         logger.info(f"Got user {external_id} from Slack and cached in DB")
+        user_profile_cache.set(external_id, user_profile)
         return user_profile
 
 
+def get_user_profiles(external_ids):
+    """
+    Gets slack user profiles for many users at once, as a dict of ID to
+    profile:
+        - from the in-process cache if available
+        - or else from the DB cache, in a single query
+        - or else from the Slack API, fetching the remaining users
+          concurrently (paced by the client's rate limiter, if it has one)
+
+    Users that can't be found in the cache or Slack are left out.
+    """
+    external_ids = {i for i in external_ids if i}
+    profiles = {}
+
+    for external_id in external_ids:
+        user_profile = user_profile_cache.get(external_id)
+        if user_profile is not LRUCache.MISSING:
+            profiles[external_id] = user_profile
+
+    missing = external_ids - profiles.keys()
+    if missing:
+        for external_user in ExternalUser.objects.filter(external_id__in=missing):
+            user_profile = external_user_to_profile(external_user)
+            user_profile_cache.set(external_user.external_id, user_profile)
+            profiles[external_user.external_id] = user_profile
+        logger.info(f"Got {len(missing & profiles.keys())} users from DB cache")
+
+    missing = external_ids - profiles.keys()
+    if missing:
+        fetched = fetch_user_profiles_from_slack(missing)
+        ExternalUser.objects.bulk_sync_slack(
+            {
+                p["id"]: {
+                    "display_name": p["name"],
+                    "full_name": p["fullname"],
+                    "email": p["email"],
+                    "deleted": p["deleted"],
+                }
+                for p in fetched
+            }
+        )
+        for user_profile in fetched:
+            user_profile_cache.set(user_profile["id"], user_profile)
+            profiles[user_profile["id"]] = user_profile
+        logger.info(f"Got {len(fetched)} users from Slack and cached in DB")
+
+    return profiles
+
+
+def fetch_user_profiles_from_slack(external_ids):
+    "Fetches user profiles from the Slack API concurrently, skipping failures"
+
+    def _fetch(external_id):
+        try:
+            return settings.SLACK_CLIENT.get_user_profile(external_id)
+        except SlackError:
+            logger.error(f"Failed to get user {external_id} from Slack")
+            return None
+
+    max_workers = getattr(settings, "RESPONSE_USER_FETCH_CONCURRENCY", 5)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(external_ids))) as pool:
+        return [p for p in pool.map(_fetch, sorted(external_ids)) if p]
+
+
 def get_user_profile_by_email(email):
     """
     Gets a slack user profile:
@@ -90,13 +207,7 @@ def get_user_profile_by_email(email):
         external_user = ExternalUser.objects.get(email=email)
         logger.info(f"Got user with email {email} from DB cache")
 
-        return {
-            "id": external_user.external_id,
-            "name": external_user.display_name,
-            "fullname": external_user.full_name,
-            "email": external_user.email,
-            "deleted": external_user.deleted,
-        }
+        return external_user_to_profile(external_user)
     except ExternalUser.DoesNotExist:
         # profile from slack
         try:
@@ -120,3 +231,53 @@ def get_user_profile_by_email(email):
 
         logger.info(f"Got user with email {email} from Slack and cached in DB")
         return user_profile
+
+
+def get_user_id(name):
+    """
+    Gets a slack user ID from their username:
+        - from the DB cache if available
+        - or else by searching the Slack API
+    """
+    external_user = (
+        ExternalUser.objects.filter(app_id="slack", username=name)
+        .only("external_id")
+        .first()
+    )
+
+    if external_user:
+        logger.info(f"Got user ID for {name} from DB cache")
+        return external_user.external_id
+
+    try:
+        user = settings.SLACK_CLIENT.find_user(name)
+    except SlackError:
+        logger.error(f"Failed to get user {name} from DB cache or Slack")
+        raise
+
+    # store it in the DB
+    ExternalUser.objects.update_or_create_slack(
+        external_id=user["id"], defaults=user_cache_defaults(user)
+    )
+
+    logger.info(f"Got user ID for {name} from Slack and cached in DB")
+    return user["id"]
+
+
+def get_bot_id():
+    """
+    Gets the incident bot's slack user ID:
+        - from INCIDENT_BOT_ID if it's set
+        - or else by looking up INCIDENT_BOT_NAME with get_user_id the first
+          time it's needed, and remembering the result
+    """
+    bot_id = getattr(settings, "INCIDENT_BOT_ID", None)
+    if bot_id:
+        return bot_id
+
+    bot_name = getattr(settings, "INCIDENT_BOT_NAME", None)
+    if not bot_name:
+        return None
+
+    settings.INCIDENT_BOT_ID = get_user_id(bot_name)
+    return settings.INCIDENT_BOT_ID
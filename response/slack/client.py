@@ -1,9 +1,14 @@
 import logging
 import time
 
+import requests
 import slackclient
+from requests.adapters import HTTPAdapter
+from slackclient.slackrequest import SlackRequest
 from slugify import slugify
 
+from response.slack.ratelimit import backoff_with_jitter, retry_after_seconds
+
 logger = logging.getLogger(__name__)
 
 
@@ -13,6 +18,61 @@ class SlackError(Exception):
         self.slack_error = slack_error
 
 
+class PooledSlackRequest(SlackRequest):
+    """
+    A drop-in replacement for slackclient's SlackRequest that sends every
+    Web API call through a single shared requests.Session, so connections to
+    Slack are kept alive and reused rather than re-established (TCP + TLS
+    handshake) on every call.
+
+    The underlying urllib3 pool is thread-safe and bounded: at most
+    `pool_size` connections are kept open, and when `pool_block` is set,
+    callers wait for a free connection rather than opening extra ones.
+    """
+
+    def __init__(
+        self,
+        pool_size=10,
+        pool_block=True,
+        connect_timeout=3.05,
+        read_timeout=10,
+        proxies=None,
+    ):
+        super().__init__(proxies=proxies)
+        self.timeout = (connect_timeout, read_timeout)
+
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, pool_block=pool_block
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def post_http_request(
+        self, token, api_method, post_data, files=None, timeout=None, domain="slack.com"
+    ):
+        # Override token header if `token` is passed in post_data
+        if post_data is not None and "token" in post_data:
+            token = post_data["token"]
+
+        headers = {
+            "user-agent": self.get_user_agent(),
+            "Authorization": f"Bearer {token}",
+        }
+
+        return self.session.post(
+            f"https://{domain}/api/{api_method}",
+            headers=headers,
+            data=post_data,
+            files=files,
+            timeout=timeout or self.timeout,
+            proxies=self.proxies,
+        )
+
+    def close(self):
+        self.session.close()
+
+
 class SlackClient(object):
     def __init__(
         self,
@@ -20,47 +80,77 @@ class SlackClient(object):
         max_retry_attempts=10,
         retry_base_backoff_seconds=0.2,
         retryable_errors=None,
+        max_backoff_seconds=30,
+        rate_limiter=None,
+        connection_pool_size=None,
+        connection_pool_block=True,
+        connect_timeout=3.05,
+        read_timeout=10,
     ):
+        """
+        Setting connection_pool_size switches the client over to a persistent,
+        keep-alive connection pool of that size shared by all threads using
+        this client (see PooledSlackRequest). Left unset, every call opens a
+        new connection, as slackclient does by default.
+
+        Passing a RateLimiter paces calls client-side to stay within Slack's
+        rate limit tiers (see response.slack.ratelimit).
+        """
         self.api_token = api_token
         self.client = slackclient.SlackClient(self.api_token)
         self.max_retry_attempts = max_retry_attempts
         self.retry_base_backoff_seconds = retry_base_backoff_seconds
         self.retryable_errors = retryable_errors or ["ratelimited"]
+        self.max_backoff_seconds = max_backoff_seconds
+        self.rate_limiter = rate_limiter
+
+        if connection_pool_size:
+            self.client.server.api_requester = PooledSlackRequest(
+                pool_size=connection_pool_size,
+                pool_block=connection_pool_block,
+                connect_timeout=connect_timeout,
+                read_timeout=read_timeout,
+            )
 
     def api_call(self, api_endpoint, *args, **kwargs):
-        logger.info(f"Calling Slack API {api_endpoint}")
-        response = self.client.api_call(api_endpoint, *args, **kwargs)
-        if not response.get("ok", False):
+        channel = kwargs.get("channel")
+
+        # Iterate over retry attempts. We could implement this recursively,
+        # but there's a danger of overflowing the stack
+        attempt = 0
+        while True:
+            if self.rate_limiter:
+                self.rate_limiter.acquire(api_endpoint, channel)
+
+            logger.info(f"Calling Slack API {api_endpoint}")
+            response = self.client.api_call(api_endpoint, *args, **kwargs)
+            if response.get("ok", False):
+                return response
+
             error = response.get("error", "<no error given>")
+            if error not in self.retryable_errors or attempt >= self.max_retry_attempts:
+                raise SlackError(
+                    f"Error calling Slack API endpoint '{api_endpoint}': {error}",
+                    slack_error=error,
+                )
 
-            # Check if we want to back off and retry (but only if this isn't a
-            # retry attempt itself)
-            if error in self.retryable_errors and not kwargs.get("is_retrying", False):
-                # Iterate over retry attempts. We could implement this
-                # recursively, but there's a danger of overflowing the stack
-
-                # Start index at 1 so we have a multiplier for backoff
-                for i in range(1, self.max_retry_attempts + 1):
-                    try:
-                        # Increase backoff with every attempt
-                        backoff_seconds = self.retry_base_backoff_seconds * i
-                        logging.warning(
-                            f"Retrying request to {api_endpoint} after error {error}. Backing off {backoff_seconds:.2f}s (attempt {i} of {self.max_retry_attempts})"
-                        )
-
-                        time.sleep(backoff_seconds)
-                        return self.api_call(
-                            api_endpoint, is_retrying=True, *args, **kwargs
-                        )
-                    except SlackError as exc:
-                        if exc.slack_error not in self.retryable_errors:
-                            raise exc
+            attempt += 1
+            backoff_seconds = backoff_with_jitter(
+                attempt, self.retry_base_backoff_seconds, self.max_backoff_seconds
+            )
 
-            raise SlackError(
-                f"Error calling Slack API endpoint '{api_endpoint}': {error}",
-                slack_error=error,
+            # If Slack told us how long to wait, wait (at least) that long, and
+            # make everyone else calling this method wait too
+            retry_after = retry_after_seconds(response.get("headers"))
+            if retry_after is not None:
+                backoff_seconds = max(backoff_seconds, retry_after)
+                if self.rate_limiter:
+                    self.rate_limiter.retry_after(api_endpoint, retry_after, channel)
+
+            logger.warning(
+                f"Retrying request to {api_endpoint} after error {error}. Backing off {backoff_seconds:.2f}s (attempt {attempt} of {self.max_retry_attempts})"
             )
-        return response
+            time.sleep(backoff_seconds)
 
     def users_list(self):
         logger.info("Listing Slack users")
@@ -70,13 +160,23 @@ class SlackClient(object):
         response = self.api_call("users.list", limit=limit, cursor=cursor)
         return response
 
+    def find_user(self, name, page_size=200):
+        """
+        Pages through users.list looking for a user by name, stopping as soon
+        as it's found rather than downloading the whole workspace.
+        """
+        cursor = None
+        while cursor != "":
+            response = self.get_paginated_users(limit=page_size, cursor=cursor)
+            for user in response["members"]:
+                if user["name"] == name:
+                    return user
+            cursor = response.get("response_metadata", {}).get("next_cursor", "")
+        raise SlackError(f"User '{name}' not found")
+
     def get_user_id(self, name):
         logger.info(f"Getting user ID for {name}")
-        response = self.users_list()
-        for user in response["members"]:
-            if user["name"] == name:
-                return user["id"]
-        raise SlackError(f"User '{name}' not found")
+        return self.find_user(name)["id"]
 
     def get_channel_name(self, id_):
         try:
@@ -87,29 +187,39 @@ class SlackClient(object):
                 return None
             raise
 
-    def get_channel_id(self, name, auto_unarchive=False):
-        logger.info(f"Getting channel ID for {name}")
+    def iter_channels(self, exclude_archived=True, page_size=800):
+        """
+        Yields each page of channels in the workspace from conversations.list,
+        so callers can stop paging as soon as they've found what they need.
+        """
         next_cursor = None
 
         while next_cursor != "":
             response = self.api_call(
                 "conversations.list",
-                exclude_archived=not auto_unarchive,
+                exclude_archived=exclude_archived,
                 exclude_members=True,
-                limit=800,
+                limit=page_size,
                 cursor=next_cursor,
             )
 
             # see if there's a next_cursor
             try:
                 next_cursor = response["response_metadata"]["next_cursor"]
-                logger.info(f"get_channel_id - next_cursor == [{next_cursor}]")
+                logger.info(f"iter_channels - next_cursor == [{next_cursor}]")
             except LookupError:
                 logger.error(
-                    "get_channel_id - I guess checking next_cursor in response object didn't work."
+                    "iter_channels - I guess checking next_cursor in response object didn't work."
                 )
+                next_cursor = ""
+
+            yield response["channels"]
+
+    def get_channel_id(self, name, auto_unarchive=False):
+        logger.info(f"Getting channel ID for {name}")
 
-            for channel in response["channels"]:
+        for channels in self.iter_channels(exclude_archived=not auto_unarchive):
+            for channel in channels:
                 if channel["name"] == name:
                     if channel["is_archived"] and auto_unarchive:
                         self.unarchive_channel(channel["id"])
@@ -1,11 +1,17 @@
 from .action_handler import ActionContext, action_handler, handle_action
 from .dialog_handler import dialog_handler, handle_dialog
-from .event_handler import handle_event, slack_event
+from .event_handler import (
+    EventDispatcher,
+    get_event_dispatcher,
+    handle_event,
+    slack_event,
+)
 from .headline_post_action import headline_post_action
 from .incident_command import handle_incident_command, incident_command
 from .incident_notification import (
     handle_notifications,
     recurring_notification,
+    schedule_notifications,
     single_notification,
 )
 from .keyword_handler import handle_keywords, keyword_handler
@@ -15,6 +21,8 @@ __all__ = (
     "action_handler",
     "dialog_handler",
     "handle_event",
+    "EventDispatcher",
+    "get_event_dispatcher",
     "slack_event",
     "headline_post_action",
     "handle_incident_command",
@@ -26,4 +34,5 @@ __all__ = (
     "handle_action",
     "handle_dialog",
     "handle_notifications",
+    "schedule_notifications",
 )
@@ -1,7 +1,6 @@
 import logging
 
-import after_response
-
+from response.core.jobs import background_job
 from response.core.models.incident import Incident
 from response.slack.models.comms_channel import CommsChannel
 
@@ -34,7 +33,7 @@ def remove_action_handler(callback_id):
     SLACK_ACTION_MAPPINGS.pop(callback_id, None)
 
 
-@after_response.enable
+@background_job
 def handle_action(payload):
     actions = payload["actions"]
 
@@ -66,17 +65,15 @@ def handle_action(payload):
         # we want to tie all actions to an incident, and have two ways to do this:
         # - if action comes from a comms channel, lookup the incident by comms channel id
         # - if not in comms channel, we rely on the button value containing the incident id
-        try:
-            comms_channel = CommsChannel.objects.get(channel_id=channel_id)
-            incident = comms_channel.incident
-        except CommsChannel.DoesNotExist:
-            incident_id = value
-            incident = Incident.objects.get(pk=incident_id)
-        except Incident.DoesNotExist:
-            logger.error(
-                f"Can't find incident associated with channel {channel_id} or with id {incident_id}"
-            )
-            return
+        incident = CommsChannel.objects.incident_for_channel(channel_id)
+        if incident is None:
+            try:
+                incident = Incident.objects.get(pk=value)
+            except (Incident.DoesNotExist, ValueError):
+                logger.error(
+                    f"Can't find incident associated with channel {channel_id} or with id {value}"
+                )
+                return
 
         action_context = ActionContext(
             incident=incident,
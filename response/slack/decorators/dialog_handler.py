@@ -1,6 +1,6 @@
 import logging
 
-import after_response
+from response.core.jobs import background_job
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +20,7 @@ def remove_dialog_handler(callback_id):
     DIALOG_HANDLERS.pop(callback_id, None)
 
 
-@after_response.enable
+@background_job
 def handle_dialog(payload):
     callback_id = payload["callback_id"]
     if callback_id not in DIALOG_HANDLERS:
@@ -1,6 +1,13 @@
 import logging
+import queue
+import threading
+import zlib
 from collections import defaultdict
 
+from django.conf import settings
+from django.db import close_old_connections
+
+from response.core.jobs import background_job
 from response.slack.models.comms_channel import CommsChannel
 
 logger = logging.getLogger(__name__)
@@ -8,24 +15,39 @@ logger = logging.getLogger(__name__)
 # Stores a map from slack event name to a list of callback functions
 EVENT_MAPPINGS = defaultdict(list)
 
+# As above, but for handlers that run for events in any channel, not just
+# incident comms channels
+WORKSPACE_EVENT_MAPPINGS = defaultdict(list)
+
 
-def slack_event(event, func=None):
+def slack_event(event, func=None, incident_required=True):
     """
     @slack_event is a decorator which registers a function as a handler
     for a particular slack_event (e.g. app_mention, pin_added, etc.)
 
     Arguments:
         event: Command to invoke this on
+        incident_required: If True (the default), the handler is only called
+            for events in incident comms channels, and is passed the incident
+            and the event. If False, it's called for events in any channel,
+            and is only passed the event.
 
     Example usage:
 
     @slack_event('pin_added')
-    def handle_pin_added(event_payload):
+    def handle_pin_added(incident, event_payload):
+        do_some_stuff()
+
+    @slack_event('channel_created', incident_required=False)
+    def handle_channel_created(event_payload):
         do_some_stuff()
     """
 
     def _wrapper(fn):
-        EVENT_MAPPINGS[event].append(fn)
+        if incident_required:
+            EVENT_MAPPINGS[event].append(fn)
+        else:
+            WORKSPACE_EVENT_MAPPINGS[event].append(fn)
         return fn
 
     if func:
@@ -33,6 +55,26 @@ def slack_event(event, func=None):
     return _wrapper
 
 
+def event_channel_id(event):
+    # events use either channel_id _or_ channel as the key (thanks Slack)
+    if "channel_id" in event:
+        return event["channel_id"]
+    elif "channel" in event:
+        # even better, on channel_rename events "channel" is actually a dict
+        # with an "id" key 😠
+        if isinstance(event["channel"], dict) and "id" in event["channel"]:
+            return event["channel"]["id"]
+        return event["channel"]
+    return None
+
+
+def event_shard(payload):
+    "Events for the same channel are handled one at a time, in order"
+    channel_id = event_channel_id(payload.get("event", {}))
+    return f"slack_channel:{channel_id}" if channel_id else None
+
+
+@background_job(shard=event_shard)
 def handle_event(payload):
     """
     Handles slack event callbacks and routes the action to the correct event handler
@@ -51,35 +93,159 @@ def handle_event(payload):
         logger.info("Ignoring bot message")
         return
 
+    for handler in WORKSPACE_EVENT_MAPPINGS.get(event_type, []):
+        logger.info(f"Calling workspace handler for event type {event_type}")
+        handler(event)
+
     # if it doesn't exist, error and return
     if event_type not in EVENT_MAPPINGS:
-        logger.error(f"No handler found for event <{event_type}>")
+        if event_type not in WORKSPACE_EVENT_MAPPINGS:
+            logger.error(f"No handler found for event <{event_type}>")
         return
 
-    # events use either channel_id _or_ channel as the key (thanks Slack)
-    if "channel_id" in event:
-        channel_id = event["channel_id"]
-    elif "channel" in event:
-        # even better, on channel_rename events "channel" is actually a dict
-        # with an "id" key 😠
-        if isinstance(event["channel"], dict) and "id" in event["channel"]:
-            channel_id = event["channel"]["id"]
-        else:
-            channel_id = event["channel"]
-    else:
-        channel_id = None
+    channel_id = event_channel_id(event)
 
     # get the incident by the comms_channel_id
-    try:
-        comms_channel = CommsChannel.objects.get(channel_id=channel_id)
-        incident = comms_channel.incident
-    except CommsChannel.DoesNotExist:
+    incident = CommsChannel.objects.incident_for_channel(channel_id)
+    if incident is None:
         logger.error(f"Can't find incident associated with channel_id {channel_id}")
         return
 
     # call the registered handler
     for handler in EVENT_MAPPINGS[event_type]:
         logger.info(
-            f"Calling handler for event type {event_type} for incident {incident.pk}"
+            f"Calling handler for event type {event_type} for incident in channel {channel_id}"
         )
         handler(incident, payload["event"])
+
+
+class EventDispatcher:
+    """
+    Handles events on a pool of worker threads, so that a busy incident
+    doesn't hold up events for every other incident.
+
+    Events are sharded by channel: all the events for a channel go to the
+    same worker and are handled in the order they arrived (e.g. pin_added
+    before pin_removed), while events for different channels are handled in
+    parallel.
+
+    Each worker has a queue of at most `queue_size` events. When a worker's
+    queue is full, dispatch() blocks for up to `put_timeout` seconds (or
+    indefinitely if None) for space, before raising queue.Full.
+
+    Events are only ordered within this process, and queued events are lost
+    if the process exits before they're handled. With the job queue
+    (RESPONSE_USE_JOB_QUEUE), events aren't dispatched here but enqueued,
+    sharded by channel, so they're ordered across every worker.
+    """
+
+    def __init__(self, workers=4, queue_size=1000, put_timeout=None, handler=None):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.put_timeout = put_timeout
+        self.handler = handler or handle_event
+        self.processed = [0] * workers
+        self._queues = []
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                q = queue.Queue(maxsize=self.queue_size)
+                t = threading.Thread(
+                    target=self._work,
+                    args=(i, q),
+                    name=f"slack-event-worker-{i}",
+                    daemon=True,
+                )
+                self._queues.append(q)
+                self._threads.append(t)
+                t.start()
+
+    def shard_for(self, channel_id):
+        return zlib.crc32(str(channel_id).encode()) % self.workers
+
+    def dispatch(self, payload):
+        self.start()
+        channel_id = event_channel_id(payload.get("event", {}))
+        shard = self.shard_for(channel_id)
+        try:
+            self._queues[shard].put(payload, timeout=self.put_timeout)
+        except queue.Full:
+            logger.error(
+                f"Event worker {shard} queue is full ({self.queue_size} events), rejecting event for channel {channel_id}"
+            )
+            raise
+
+    def _work(self, shard, q):
+        while True:
+            payload = q.get()
+            try:
+                if payload is None:
+                    return
+                self.handler(payload)
+            except Exception:
+                logger.exception(f"Event worker {shard} failed to handle event")
+            finally:
+                self.processed[shard] += 1
+                q.task_done()
+                close_old_connections()
+
+    def queue_depths(self):
+        "Returns the number of events waiting, by worker"
+        return [q.qsize() for q in self._queues]
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queue_depths": self.queue_depths(),
+            "processed": list(self.processed),
+        }
+
+    def join(self):
+        "Blocks until every event dispatched so far has been handled"
+        for q in self._queues:
+            q.join()
+
+    def stop(self):
+        "Handles the events already queued, then stops the workers"
+        with self._lock:
+            for q in self._queues:
+                q.put(None)
+            for t in self._threads:
+                t.join()
+            self._queues = []
+            self._threads = []
+
+
+_event_dispatcher = None
+_event_dispatcher_lock = threading.Lock()
+
+
+def get_event_dispatcher():
+    """
+    Returns the process-wide EventDispatcher, configured by
+    RESPONSE_EVENT_WORKERS, RESPONSE_EVENT_QUEUE_SIZE and
+    RESPONSE_EVENT_QUEUE_TIMEOUT_SECONDS, or None if RESPONSE_EVENT_WORKERS
+    is 0 (meaning events are handled inline)
+    """
+    global _event_dispatcher
+
+    workers = getattr(settings, "RESPONSE_EVENT_WORKERS", 4)
+    if not workers:
+        return None
+
+    with _event_dispatcher_lock:
+        if _event_dispatcher is None:
+            _event_dispatcher = EventDispatcher(
+                workers=workers,
+                queue_size=getattr(settings, "RESPONSE_EVENT_QUEUE_SIZE", 1000),
+                put_timeout=getattr(
+                    settings, "RESPONSE_EVENT_QUEUE_TIMEOUT_SECONDS", 2
+                ),
+            )
+        return _event_dispatcher
@@ -1,7 +1,13 @@
 import logging
+import threading
+import time
+from collections import defaultdict, deque
 from datetime import datetime
 
+from django.conf import settings
+
 from response.core.models import Incident
+from response.core.util import closing_db_connection, worker_id
 from response.slack.models.notification import Notification
 
 logger = logging.getLogger(__name__)
@@ -11,19 +17,31 @@ NOTIFICATION_HANDLERS = []
 
 
 class NotificationHandler(object):
-    def __init__(self, key, callback, interval_mins, max_notifications):
+    def __init__(
+        self, key, callback, interval_mins, max_notifications, timeout_secs=None
+    ):
         self.key = key
         self.callback = callback
         self.interval_mins = interval_mins
         self.max_notifications = max_notifications
+        self.timeout_secs = timeout_secs
+
+    def timeout(self):
+        if self.timeout_secs is not None:
+            return self.timeout_secs
+        return getattr(settings, "RESPONSE_NOTIFICATION_TIMEOUT_SECONDS", 30)
 
     def __str__(self):
         return self.key
 
 
-def single_notification(initial_delay_mins=0, func=None):
+def single_notification(initial_delay_mins=0, func=None, timeout_secs=None):
     """
     Register a handler that'll be called once in each open incident
+
+    If the handler takes longer than `timeout_secs` (by default
+    RESPONSE_NOTIFICATION_TIMEOUT_SECONDS), it's left to finish in the
+    background and counted as timed out.
     """
 
     def _wrapper(fn):
@@ -33,6 +51,7 @@ def single_notification(initial_delay_mins=0, func=None):
                 callback=fn,
                 interval_mins=initial_delay_mins,
                 max_notifications=0,
+                timeout_secs=timeout_secs,
             )
         )
         return fn
@@ -42,9 +61,11 @@ def single_notification(initial_delay_mins=0, func=None):
     return _wrapper
 
 
-def recurring_notification(interval_mins, max_notifications=1):
+def recurring_notification(interval_mins, max_notifications=1, timeout_secs=None):
     """
     Register a handler that'll be called periodically for all open incidents.
+
+    As with single_notification, the handler times out after `timeout_secs`.
     """
 
     def _wrapper(fn):
@@ -54,6 +75,7 @@ def recurring_notification(interval_mins, max_notifications=1):
                 callback=fn,
                 interval_mins=interval_mins,
                 max_notifications=max_notifications - 1,
+                timeout_secs=timeout_secs,
             )
         )
         return fn
@@ -61,63 +83,233 @@ def recurring_notification(interval_mins, max_notifications=1):
     return _wrapper
 
 
-def handle_notifications():
+def schedule_notifications(incidents=None):
+    """
+    Makes sure every notification handler has a Notification, with the time
+    it's next due, for each of `incidents` (by default, every open incident
+    with a comms channel).
+    """
+    if incidents is None:
+        incidents = Incident.objects.filter(
+            end_time__isnull=True, commschannel__incident__isnull=False
+        )
+    incidents = list(incidents)
+    handlers = {handler.key: handler for handler in NOTIFICATION_HANDLERS}
+
+    Notification.objects.bulk_create(
+        [Notification(incident=i, key=key) for i in incidents for key in handlers],
+        ignore_conflicts=True,
+    )
 
-    # Only notify open incidents with a comms channel
-    open_incidents = Incident.objects.filter(
-        end_time__isnull=True, commschannel__incident__isnull=False
+    unscheduled = list(
+        Notification.objects.filter(
+            incident__in=incidents,
+            key__in=handlers,
+            next_due__isnull=True,
+            completed=False,
+        ).select_related("incident")
     )
+    for notification in unscheduled:
+        handler = handlers[notification.key]
+        notification.schedule(handler.interval_mins, handler.max_notifications)
+        # another node may have scheduled (and sent) it since we looked
+        Notification.objects.filter(
+            pk=notification.pk, next_due__isnull=True, completed=False
+        ).update(next_due=notification.next_due, completed=notification.completed)
+
+
+SENT = "sent"
+FAILED = "failed"
+TIMED_OUT = "timed_out"
+SKIPPED = "skipped"
+
+_stats = defaultdict(
+    lambda: {
+        SENT: 0,
+        FAILED: 0,
+        TIMED_OUT: 0,
+        SKIPPED: 0,
+        "total_ms": 0,
+        "max_ms": 0,
+    }
+)
+_stats_lock = threading.Lock()
+
+# The (handler key, incident) calls still running, including ones that timed out
+_running = set()
+_running_lock = threading.Lock()
+
+
+def _record(handler, outcome, duration_ms):
+    with _stats_lock:
+        stats = _stats[handler.key]
+        stats[outcome] += 1
+        stats["total_ms"] += duration_ms
+        stats["max_ms"] = max(stats["max_ms"], duration_ms)
+
+
+def notification_stats():
+    "Returns how many times each handler was sent, failed, timed out or skipped, and how long they took"
+    with _stats_lock:
+        return {key: dict(stats) for key, stats in _stats.items()}
+
+
+def reset_notification_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def run_callbacks(calls):
+    """
+    Calls each (handler, incident) in `calls` in parallel, at most
+    RESPONSE_NOTIFICATION_CONCURRENCY at a time, so that a slow handler
+    doesn't hold up the rest.
+
+    Each call is given its handler's timeout from when it starts. Calls still
+    running after that are counted as timed out and left to finish in the
+    background, and the next call is started in their place. Until a timed
+    out call finishes, the same handler isn't called again for the same
+    incident (those calls are SKIPPED), so a hung handler doesn't leave
+    another thread behind every time it's due.
+
+    Returns the outcome of each call (SENT, FAILED, TIMED_OUT or SKIPPED).
+    """
+    concurrency = getattr(settings, "RESPONSE_NOTIFICATION_CONCURRENCY", 8)
+    outcomes = [None] * len(calls)
+    waiting = deque(range(len(calls)))
+    running = {}  # index into calls -> deadline
+    finished = threading.Condition()
+
+    def _running_key(i):
+        handler, incident = calls[i]
+        return handler.key, getattr(incident, "pk", incident)
+
+    def _call(i):
+        handler, incident = calls[i]
+        start = time.monotonic()
+        try:
+            with closing_db_connection():
+                handler.callback(incident)
+            outcome = SENT
+        except Exception as e:
+            logger.error(f"Error calling notification handler {handler}: {e}")
+            outcome = FAILED
+        finally:
+            with _running_lock:
+                _running.discard(_running_key(i))
 
-    for incident in open_incidents:
-        for handler in NOTIFICATION_HANDLERS:
-            try:
-                # get the last sent notification for this incident/handler pair
-                notification = Notification.objects.get(
-                    incident=incident, key=handler.key
+        duration_ms = int((time.monotonic() - start) * 1000)
+        with finished:
+            if outcomes[i] is None:
+                outcomes[i] = outcome
+                _record(handler, outcome, duration_ms)
+                finished.notify()
+            else:
+                logger.warning(
+                    f"Notification handler {handler} finished in {duration_ms}ms, after timing out"
                 )
 
-                # if we can find a previous notification for this incident/handler pair and
-                # it's been set to not repeat, exit here
-                if (
-                    notification.repeat_count >= handler.max_notifications
-                    or notification.completed
-                ):
+    with finished:
+        while waiting or running:
+            while waiting and len(running) < concurrency:
+                i = waiting.popleft()
+                handler = calls[i][0]
+                with _running_lock:
+                    still_running = _running_key(i) in _running
+                    if not still_running:
+                        _running.add(_running_key(i))
+                if still_running:
+                    logger.warning(
+                        f"Skipping notification handler {handler} for {calls[i][1]}: its last call is still running"
+                    )
+                    outcomes[i] = SKIPPED
+                    _record(handler, SKIPPED, 0)
                     continue
 
-                # it's not exhausted its max_notifications, so wait 'interval_mins' before sending again
-                mins_since_last_notify = int(
-                    (datetime.now() - notification.time).total_seconds() / 60
-                )
-                if mins_since_last_notify >= handler.interval_mins:
-                    try:
-                        handler.callback(incident)
-                    except Exception as e:
-                        logger.error(
-                            f"Error calling notification handler {handler}: {e}"
-                        )
-
-                    notification.time = datetime.now()
-                    notification.repeat_count = notification.repeat_count + 1
-                    notification.save()
-
-            except Notification.DoesNotExist:
-                # we've never sent a notification to this incident/handler pair,
-                # so wait until 'interval_mins' mins have elapsed from start
-                mins_since_started = int(
-                    (datetime.now() - incident.start_time).total_seconds() / 60
-                )
-                if mins_since_started >= handler.interval_mins:
-                    try:
-                        handler.callback(incident)
-                    except Exception as e:
-                        logger.error(
-                            f"Error calling notification handler {handler}: {e}"
-                        )
-
-                    notification = Notification(
-                        incident=incident,
-                        key=handler.key,
-                        time=datetime.now(),
-                        repeat_count=0,
+                running[i] = time.monotonic() + handler.timeout()
+                threading.Thread(
+                    target=_call,
+                    args=(i,),
+                    name=f"notification-{handler.key}",
+                    daemon=True,
+                ).start()
+
+            if not running:
+                continue
+            finished.wait(timeout=max(0, min(running.values()) - time.monotonic()))
+
+            now = time.monotonic()
+            for i, deadline in list(running.items()):
+                if outcomes[i] is not None:
+                    del running[i]
+                elif now >= deadline:
+                    handler = calls[i][0]
+                    outcomes[i] = TIMED_OUT
+                    _record(handler, TIMED_OUT, int(handler.timeout() * 1000))
+                    logger.error(
+                        f"Notification handler {handler} timed out after {handler.timeout()}s"
                     )
-                    notification.save()
+                    del running[i]
+
+    return outcomes
+
+
+# The handler keys that open incidents have been scheduled for by this process
+_scheduled_keys = None
+
+
+def handle_notifications(worker=None):
+    """
+    Sends the notifications that are due, and schedules their next run.
+
+    This is safe to run on several nodes at once: each claims the due
+    notifications it sends (see NotificationManager.claim), so none are sent
+    twice.
+
+    New incidents are scheduled when their comms channel is created, and
+    closed incidents again when they're reopened. Open incidents are
+    (re)scheduled the first time this runs in a process, and whenever the
+    registered handlers change, which picks up new handlers.
+    """
+    global _scheduled_keys
+
+    handlers = {handler.key: handler for handler in NOTIFICATION_HANDLERS}
+    if _scheduled_keys != set(handlers):
+        schedule_notifications()
+        _scheduled_keys = set(handlers)
+
+    due = Notification.objects.claim(worker or worker_id(), keys=list(handlers))
+
+    to_send = []
+    for notification in due:
+        notification.claimed_by = None
+        notification.claimed_until = None
+        if notification.incident.end_time is not None:
+            # Only notify open incidents
+            notification.next_due = None
+        else:
+            to_send.append(notification)
+
+    outcomes = run_callbacks([(handlers[n.key], n.incident) for n in to_send])
+
+    for notification, outcome in zip(to_send, outcomes):
+        if outcome == SKIPPED:
+            # leave it due, to try again next time
+            continue
+        handler = handlers[notification.key]
+        if notification.time is not None:
+            notification.repeat_count = notification.repeat_count + 1
+        notification.time = datetime.now()
+        notification.schedule(handler.interval_mins, handler.max_notifications)
+
+    Notification.objects.bulk_update(
+        due,
+        [
+            "time",
+            "repeat_count",
+            "next_due",
+            "completed",
+            "claimed_by",
+            "claimed_until",
+        ],
+    )
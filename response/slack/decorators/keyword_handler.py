@@ -1,4 +1,5 @@
 import logging
+import re
 
 from response.core.models.incident import Incident
 from response.slack.models.comms_channel import CommsChannel
@@ -7,11 +8,26 @@ logger = logging.getLogger(__name__)
 
 KEYWORD_HANDLERS = {}
 
+# Matching options for each keyword: (case_sensitive, word_boundary)
+KEYWORD_OPTIONS = {}
+
+
+def keyword_handler(keywords, func=None, case_sensitive=False, word_boundary=False):
+    """
+    Registers a function to be called when any of `keywords` appears in a
+    message in a comms channel.
+
+    Arguments:
+        keywords: the words or phrases to look for
+        case_sensitive: if False (the default), keywords match in any case
+        word_boundary: if True, keywords only match as whole words, e.g.
+            'deploy' would match 'deploy failed' but not 'deployment'
+    """
 
-def keyword_handler(keywords, func=None):
     def _wrapper(fn):
         for keyword in keywords:
             KEYWORD_HANDLERS[keyword] = fn
+            KEYWORD_OPTIONS[keyword] = (case_sensitive, word_boundary)
         return fn
 
     if func:
@@ -19,13 +35,134 @@ def keyword_handler(keywords, func=None):
     return _wrapper
 
 
+def _trie_pattern(words):
+    """
+    Builds a regex matching any of `words`, factored into a trie so that the
+    regex engine doesn't have to try every word in turn at each position,
+    e.g. ['deploy', 'deployment', 'down'] -> 'd(?:eploy(?:ment)?|own)'
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def _pattern(node):
+        alternatives = [
+            re.escape(char) + _pattern(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not alternatives:
+            return ""
+        pattern = (
+            alternatives[0]
+            if len(alternatives) == 1
+            else "(?:" + "|".join(alternatives) + ")"
+        )
+        if "" in node:
+            pattern = f"(?:{pattern})?"
+        return pattern
+
+    return _pattern(trie)
+
+
+class KeywordMatcher:
+    """
+    Finds all of a set of keywords in a text in a single pass.
+
+    All the keywords are lowercased and compiled into one regex, factored
+    into a trie and wrapped in a lookahead, so that one scan of the lowercased
+    text finds the longest keyword starting at every position (overlapping
+    matches included). Shorter keywords that are prefixes of that match also
+    start there, and each keyword found is then checked against its own case
+    and word boundary options.
+    """
+
+    def __init__(self, keyword_options):
+        self.keyword_options = dict(keyword_options)
+        self.keywords_by_folded = {}
+        for keyword in self.keyword_options:
+            self.keywords_by_folded.setdefault(keyword.lower(), []).append(keyword)
+
+        # the keywords that match wherever each (folded) keyword matches
+        self.prefixes = {
+            folded: [
+                keyword
+                for length in range(len(folded), 0, -1)
+                for keyword in self.keywords_by_folded.get(folded[:length], [])
+            ]
+            for folded in self.keywords_by_folded
+        }
+
+        words = [k for k in self.keywords_by_folded if k]
+        pattern = f"(?=({_trie_pattern(words)}))" if words else None
+        self.regex = re.compile(pattern) if pattern else None
+        # lowercasing a few characters changes the length of the text, which
+        # would throw out match positions, so texts containing them are
+        # matched case-insensitively instead (which is a lot slower)
+        self.ignorecase_regex = re.compile(pattern, re.IGNORECASE) if pattern else None
+
+    def _is_match(self, keyword, text, start):
+        case_sensitive, word_boundary = self.keyword_options[keyword]
+        end = start + len(keyword)
+        if case_sensitive and text[start:end] != keyword:
+            return False
+        if word_boundary and (
+            (start > 0 and (text[start - 1].isalnum() or text[start - 1] == "_"))
+            or (end < len(text) and (text[end].isalnum() or text[end] == "_"))
+        ):
+            return False
+        return True
+
+    def find(self, text):
+        "Returns the keywords found in `text`, in the order they were registered"
+        if not text or self.regex is None:
+            return []
+
+        folded = text.lower()
+        if len(folded) == len(text):
+            regex, subject = self.regex, folded
+        else:
+            regex, subject = self.ignorecase_regex, text
+
+        found = set()
+        for m in regex.finditer(subject):
+            for keyword in self.prefixes[m.group(1).lower()]:
+                if keyword not in found and self._is_match(keyword, text, m.start()):
+                    found.add(keyword)
+            if len(found) == len(self.keyword_options):
+                break
+
+        return [k for k in self.keyword_options if k in found]
+
+
+_matcher = None
+
+
+def keyword_matcher():
+    "Returns a KeywordMatcher for the registered keywords, rebuilding it if they've changed"
+    global _matcher
+
+    keyword_options = {
+        k: KEYWORD_OPTIONS.get(k, (False, False)) for k in KEYWORD_HANDLERS
+    }
+    if _matcher is None or _matcher.keyword_options != keyword_options:
+        _matcher = KeywordMatcher(keyword_options)
+    return _matcher
+
+
 def handle_keywords(incident: Incident, payload):
     text = payload.get("text", "")
     user = payload.get("user", "")
     ts = payload.get("ts", "")
 
+    keywords = keyword_matcher().find(text)
+    if not keywords:
+        return
+
     comms_channel = CommsChannel.objects.get(incident=incident)
 
-    for keyword, handler in KEYWORD_HANDLERS.items():
-        if keyword.lower() in text.lower():
-            handler(comms_channel, user, keyword, text, ts)
+    for keyword in keywords:
+        KEYWORD_HANDLERS[keyword](comms_channel, user, keyword, text, ts)
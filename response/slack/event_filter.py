@@ -0,0 +1,85 @@
+"""
+A cheap first pass over the raw body of each event from Slack, so that we can
+drop the bulk of the `message` events we receive (from every channel the bot
+is in) without decoding them or touching the DB.
+
+This only ever drops `message` events. Anything it isn't sure about is passed
+on to be decoded and handled as normal.
+"""
+
+import re
+import threading
+from collections import Counter
+
+from response.slack.decorators.event_handler import (
+    EVENT_MAPPINGS,
+    WORKSPACE_EVENT_MAPPINGS,
+)
+from response.slack.models.comms_channel import comms_channel_ids
+
+TYPE_FIELD = re.compile(rb'"type"\s*:\s*"([a-z_]+)"')
+SUBTYPE_FIELD = re.compile(rb'"subtype"\s*:\s*"([a-z_]+)"')
+BOT_ID_FIELD = re.compile(rb'"bot_id"\s*:\s*"')
+CHANNEL_FIELD = re.compile(rb'"channel"\s*:\s*"([A-Z0-9]+)"')
+
+IGNORED_MESSAGE_SUBTYPES = {b"bot_message", b"message_changed", b"message_deleted"}
+
+DROPPED_BOT_MESSAGE = "dropped_bot_message"
+DROPPED_MESSAGE_EDIT = "dropped_message_edit"
+DROPPED_UNKNOWN_CHANNEL = "dropped_unknown_channel"
+PROCESSED = "processed"
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def is_message_event(body):
+    """
+    Whether `body` is for a `message` event. Other events can embed messages
+    (e.g. pin_added), so a body that mentions any other event type we handle
+    doesn't count.
+    """
+    types = {t.decode() for t in TYPE_FIELD.findall(body)}
+    if "message" not in types:
+        return False
+
+    handled_types = set(EVENT_MAPPINGS) | set(WORKSPACE_EVENT_MAPPINGS)
+    return not (types & (handled_types - {"message"}))
+
+
+def drop_reason(body):
+    "Returns why the event with raw JSON `body` can be dropped, or None"
+    if not is_message_event(body):
+        return None
+
+    if BOT_ID_FIELD.search(body) or b"bot_message" in SUBTYPE_FIELD.findall(body):
+        return DROPPED_BOT_MESSAGE
+
+    if set(SUBTYPE_FIELD.findall(body)) & IGNORED_MESSAGE_SUBTYPES:
+        return DROPPED_MESSAGE_EDIT
+
+    if "message" not in WORKSPACE_EVENT_MAPPINGS:
+        channel = CHANNEL_FIELD.search(body)
+        if channel and channel.group(1).decode() not in comms_channel_ids:
+            return DROPPED_UNKNOWN_CHANNEL
+
+    return None
+
+
+def filter_event(body):
+    "Returns True if the event should be handled, counting what's dropped"
+    reason = drop_reason(body)
+    with _stats_lock:
+        _stats[reason or PROCESSED] += 1
+    return reason is None
+
+
+def event_filter_stats():
+    "Returns the number of events processed and dropped (by reason)"
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_event_filter_stats():
+    with _stats_lock:
+        _stats.clear()
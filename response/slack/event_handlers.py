@@ -8,7 +8,7 @@ from response.slack.decorators import (
     handle_keywords,
     slack_event,
 )
-from response.slack.models import CommsChannel, PinnedMessage, UserStats
+from response.slack.models import CommsChannel, PinnedMessage, SlackChannel, UserStats
 
 logger = logging.getLogger(__name__)
 
@@ -105,3 +105,25 @@ def handle_channel_rename(incident, payload):
     comms_channel = CommsChannel.objects.get(incident=incident)
     comms_channel.channel_name = new_name
     comms_channel.save()
+
+
+@slack_event("channel_created", incident_required=False)
+@slack_event("channel_rename", incident_required=False)
+def index_channel(payload):
+    channel = payload["channel"]
+    SlackChannel.objects.index_channel(channel["id"], channel["name"])
+
+
+@slack_event("channel_archive", incident_required=False)
+def index_channel_archived(payload):
+    SlackChannel.objects.set_archived(payload["channel"], True)
+
+
+@slack_event("channel_unarchive", incident_required=False)
+def index_channel_unarchived(payload):
+    SlackChannel.objects.set_archived(payload["channel"], False)
+
+
+@slack_event("channel_deleted", incident_required=False)
+def remove_channel_from_index(payload):
+    SlackChannel.objects.remove_channel(payload["channel"])
@@ -2,6 +2,14 @@ from .comms_channel import CommsChannel
 from .headline_post import HeadlinePost
 from .notification import Notification
 from .pinned_message import PinnedMessage
+from .slack_channel import SlackChannel
 from .user_stats import UserStats
 
-__all__ = ("CommsChannel", "HeadlinePost", "Notification", "PinnedMessage", "UserStats")
+__all__ = (
+    "CommsChannel",
+    "HeadlinePost",
+    "Notification",
+    "PinnedMessage",
+    "SlackChannel",
+    "UserStats",
+)
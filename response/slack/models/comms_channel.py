@@ -1,18 +1,111 @@
 import logging
+import threading
+import time
 from datetime import datetime
 from urllib.parse import urljoin
 
 from django.conf import settings
 from django.db import models
 from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
 
 from response.core.models.incident import Incident
+from response.core.util import LRUCache
+from response.slack.cache import channel_incident_cache
 from response.slack.client import SlackError
+from response.slack.models.slack_channel import SlackChannel
 
 logger = logging.getLogger(__name__)
 
 
+class LazyIncident(SimpleLazyObject):
+    """
+    An incident that's only loaded from the DB when something other than its
+    ID is used
+    """
+
+    def __init__(self, incident_id):
+        super().__init__(lambda: Incident.objects.get(pk=incident_id))
+        self.__dict__["pk"] = incident_id
+        self.__dict__["id"] = incident_id
+
+
+class CommsChannelIds:
+    """
+    The set of comms channel IDs, held in memory so that we can cheaply tell
+    whether an event is from a comms channel. It's reloaded when a comms
+    channel is saved or deleted in this process, and otherwise every
+    RESPONSE_COMMS_CHANNEL_IDS_TTL_SECONDS to pick up changes made by other
+    processes.
+    """
+
+    def __init__(self):
+        self._ids = frozenset()
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def ttl(self):
+        return getattr(settings, "RESPONSE_COMMS_CHANNEL_IDS_TTL_SECONDS", 10)
+
+    def __contains__(self, channel_id):
+        with self._lock:
+            if (
+                self._loaded_at is None
+                or time.monotonic() > self._loaded_at + self.ttl()
+            ):
+                self._ids = frozenset(
+                    CommsChannel.objects.values_list("channel_id", flat=True)
+                )
+                self._loaded_at = time.monotonic()
+            return channel_id in self._ids
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+
+comms_channel_ids = CommsChannelIds()
+
+
 class CommsChannelManager(models.Manager):
+    def incident_id_for_channel(self, channel_id):
+        """
+        Gets the ID of the incident for a comms channel, or None if the channel
+        isn't a comms channel. Lookups (including misses) are cached, and the
+        cache is invalidated when a comms channel is saved or deleted.
+
+        Misses are only cached for RESPONSE_CHANNEL_CACHE_NEGATIVE_TTL_SECONDS,
+        as a channel might become a comms channel in another process.
+        """
+        incident_id = channel_incident_cache.get(channel_id)
+        if incident_id is not LRUCache.MISSING:
+            return incident_id
+
+        incident_id = (
+            self.filter(channel_id=channel_id)
+            .values_list("incident_id", flat=True)
+            .first()
+        )
+        if incident_id is None:
+            channel_incident_cache.set(
+                channel_id,
+                None,
+                getattr(settings, "RESPONSE_CHANNEL_CACHE_NEGATIVE_TTL_SECONDS", 10),
+            )
+        else:
+            channel_incident_cache.set(channel_id, incident_id)
+        return incident_id
+
+    def incident_for_channel(self, channel_id):
+        """
+        Gets the incident for a comms channel, or None if the channel isn't a
+        comms channel. The incident is only loaded from the DB when it's used.
+        """
+        incident_id = self.incident_id_for_channel(channel_id)
+        if incident_id is None:
+            return None
+        return LazyIncident(incident_id)
+
     def create_comms_channel(self, incident):
         """
         Creates a comms channel in slack, and saves a reference to it in the DB
@@ -21,7 +114,7 @@ class CommsChannelManager(models.Manager):
         name = f"inc-{time_string}".lower()
 
         try:
-            channel_id = settings.SLACK_CLIENT.get_or_create_channel(
+            channel_id = SlackChannel.objects.get_or_create_channel(
                 name, auto_unarchive=True
             )
         except SlackError as e:
@@ -60,7 +153,7 @@ class CommsChannel(models.Model):
 
     objects = CommsChannelManager()
     incident = models.OneToOneField(Incident, on_delete=models.CASCADE)
-    channel_id = models.CharField(max_length=20, null=False)
+    channel_id = models.CharField(max_length=20, null=False, db_index=True)
     channel_name = models.CharField(max_length=80, null=False)
 
     def post_in_channel(self, message: str):
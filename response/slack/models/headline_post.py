@@ -1,4 +1,7 @@
+import atexit
 import logging
+import threading
+from collections import Counter, defaultdict
 from urllib.parse import urljoin
 
 from django.conf import settings
@@ -6,6 +9,7 @@ from django.db import models
 from django.urls import reverse
 
 from response.core.models.incident import Incident
+from response.core.util import Debouncer
 from response.slack.block_kit import Actions, Button, Divider, Message, Section, Text
 from response.slack.client import SlackError
 from response.slack.decorators.headline_post_action import (
@@ -18,11 +22,79 @@ from response.slack.reference_utils import channel_reference, user_reference
 logger = logging.getLogger(__name__)
 
 
+class HeadlineUpdates(Debouncer):
+    """
+    Coalesces headline post updates, so that a burst of changes to an
+    incident (e.g. an edit dialog saving the incident and then its headline
+    post) results in a single Slack update.
+
+    The first update requested for an incident starts a timer of
+    RESPONSE_HEADLINE_DEBOUNCE_SECONDS. Further requests within that window
+    are dropped, and when it fires the headline post is reloaded and sent with
+    the incident's latest state, on the timer's thread rather than the
+    request's. Updates for the same incident never run at the same time, so
+    the first post (which sets the message ts) can't be sent twice.
+
+    If RESPONSE_HEADLINE_DEBOUNCE_SECONDS is 0, updates are sent immediately.
+    """
+
+    def __init__(self):
+        super().__init__(self.update, self.delay)
+        self._incident_locks = defaultdict(threading.Lock)
+
+    def delay(self):
+        return getattr(settings, "RESPONSE_HEADLINE_DEBOUNCE_SECONDS", 1)
+
+    def request(self, incident_id):
+        "Requests an update to the headline post for `incident_id`"
+        if self.delay() <= 0:
+            self.update(incident_id)
+            return
+        super().request(incident_id)
+
+    def update(self, incident_id):
+        "Sends the headline post for `incident_id` to Slack now"
+        with self._lock:
+            incident_lock = self._incident_locks[incident_id]
+
+        with incident_lock:
+            # anything requested from here on needs another update
+            self.cancel(incident_id)
+
+            headline_post = (
+                HeadlinePost.objects.filter(incident_id=incident_id)
+                .select_related("incident", "comms_channel")
+                .first()
+            )
+            if headline_post:
+                headline_post.update_in_slack()
+
+
+headline_updates = HeadlineUpdates()
+atexit.register(headline_updates.flush)
+
+SENT = "sent"
+SKIPPED = "skipped"
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def headline_update_stats():
+    "Returns how many headline updates were sent to Slack, and how many were skipped as unchanged"
+    with _stats_lock:
+        return {SENT: _stats[SENT], SKIPPED: _stats[SKIPPED]}
+
+
+def reset_headline_update_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
 class HeadlinePostManager(models.Manager):
     def create_headline_post(self, incident):
-        headline_post = self.create(incident=incident)
-        headline_post.update_in_slack()
-        return headline_post
+        # the post is sent to Slack by the post_save signal
+        return self.create(incident=incident)
 
 
 class HeadlinePost(models.Model):
@@ -35,10 +107,15 @@ class HeadlinePost(models.Model):
     objects = HeadlinePostManager()
     incident = models.ForeignKey(Incident, on_delete=models.CASCADE)
     message_ts = models.CharField(max_length=20, null=True)
+    content_hash = models.CharField(max_length=64, null=True, blank=True)
     comms_channel = models.OneToOneField(
         CommsChannel, on_delete=models.DO_NOTHING, null=True
     )
 
+    def request_update(self):
+        "Updates the slack headline post soon, coalescing it with other updates"
+        headline_updates.request(self.incident_id)
+
     def update_in_slack(self):
         "Creates/updates the slack headline post with the latest incident info"
         logging.info(f"Updating headline post in Slack for incident {self.incident.pk}")
@@ -145,16 +222,33 @@ class HeadlinePost(models.Model):
         else:
             channel_id = settings.INCIDENT_CHANNEL_ID
 
+        # Don't bother Slack if the post wouldn't change
+        fingerprint = msg.fingerprint()
+        if self.message_ts and fingerprint == self.content_hash:
+            logger.info(
+                f"Headline post for incident {self.incident.pk} hasn't changed, not updating it"
+            )
+            with _stats_lock:
+                _stats[SKIPPED] += 1
+            return
+
         try:
             response = msg.send(channel_id, self.message_ts)
             logger.info(
                 f"Got response back from Slack after updating headline post: {response}"
             )
+            with _stats_lock:
+                _stats[SENT] += 1
 
-            # Save the message ts identifier if not already set
+            # Save the message ts identifier if not already set, and what we
+            # sent (with an update rather than a save, which would trigger
+            # another headline update)
             if not self.message_ts:
                 self.message_ts = response["ts"]
-                self.save()
+            self.content_hash = fingerprint
+            HeadlinePost.objects.filter(pk=self.pk).update(
+                message_ts=self.message_ts, content_hash=self.content_hash
+            )
         except SlackError as e:
             logger.error(
                 f"Failed to update headline post in {channel_id} with ts {self.message_ts}. Error: {e}"
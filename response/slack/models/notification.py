@@ -1,18 +1,82 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
 from django.db import models
 
 from response.core.models import Incident
+from response.core.util import claim_rows
+
+
+class NotificationManager(models.Manager):
+    def due(self, now=None):
+        "Notifications that should be sent now"
+        return self.filter(next_due__lte=now or datetime.now(), completed=False)
+
+    def lease(self):
+        return timedelta(
+            seconds=getattr(settings, "RESPONSE_NOTIFICATION_LEASE_SECONDS", 5 * 60)
+        )
+
+    def claim(self, worker, keys, now=None):
+        """
+        Claims the due notifications for the handlers in `keys` (see
+        response.core.util.claim_rows), so that if several nodes run
+        notifications at once, each notification is only sent by one of them.
+
+        Claimed notifications are leased to `worker` for
+        RESPONSE_NOTIFICATION_LEASE_SECONDS, after which they can be claimed
+        again (e.g. if the worker died part way through sending them).
+        """
+        now = now or datetime.now()
+        token = claim_rows(
+            self.due(now).filter(key__in=keys), worker, self.lease(), now=now
+        )
+        if not token:
+            return []
+        return list(
+            self.filter(claimed_by=token)
+            .select_related("incident")
+            .order_by("next_due")
+        )
 
 
 class Notification(models.Model):
+    """
+    Tracks a notification handler for an incident: when it was last sent
+    (`time`, which is None until it's been sent), how many times it's been
+    repeated, when it's next due to be sent, and which worker is sending it.
+    """
+
+    objects = NotificationManager()
+
     incident = models.ForeignKey(Incident, on_delete=models.CASCADE)
     key = models.CharField(max_length=30)
-    time = models.DateTimeField()
+    time = models.DateTimeField(null=True, blank=True)
     repeat_count = models.IntegerField(default=0)
     completed = models.BooleanField(default=False)
+    next_due = models.DateTimeField(null=True, blank=True, db_index=True)
+    claimed_by = models.CharField(max_length=100, null=True, blank=True)
+    claimed_until = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         unique_together = ("incident", "key")
 
+    def schedule(self, interval_mins, max_notifications):
+        """
+        Sets when this notification is next due: `interval_mins` after the
+        incident started if it's not been sent yet, or after it was last sent
+        if it hasn't already been repeated `max_notifications` times.
+        """
+        if self.time is None:
+            self.next_due = self.incident.start_time + timedelta(minutes=interval_mins)
+        elif self.repeat_count >= max_notifications:
+            self.next_due = None
+            self.completed = True
+        else:
+            self.next_due = self.time + timedelta(minutes=interval_mins)
+
     def __str__(self):
+        if self.time is None:
+            return f"Not sent - {self.incident} - {self.key}"
         nice_date = self.time.strftime("%Y-%m-%d %H:%M:%S")
         return f"{nice_date} - {self.incident} - {self.key}"
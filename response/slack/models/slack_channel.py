@@ -0,0 +1,136 @@
+import logging
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+
+from response.slack.client import SlackError
+
+logger = logging.getLogger(__name__)
+
+
+class SlackChannelManager(models.Manager):
+    def ttl(self):
+        return timedelta(
+            seconds=getattr(
+                settings, "RESPONSE_CHANNEL_INDEX_TTL_SECONDS", 24 * 60 * 60
+            )
+        )
+
+    def get_channel_id(self, name, auto_unarchive=False):
+        """
+        Gets a Slack channel ID by name:
+            - from the channel index if we've seen the channel recently
+            - or else by paging through conversations.list, indexing every
+              channel we see on the way, until we find it
+        """
+        channel = (
+            self.filter(name=name, last_seen__gte=datetime.now() - self.ttl())
+            .order_by("-last_seen")
+            .first()
+        )
+        if channel and (auto_unarchive or not channel.is_archived):
+            logger.info(f"Got channel ID for {name} from channel index")
+            if channel.is_archived:
+                settings.SLACK_CLIENT.unarchive_channel(channel.channel_id)
+                channel.is_archived = False
+                channel.save()
+            return channel.channel_id
+
+        logger.info(f"Channel {name} not in channel index, searching Slack")
+        for channels in settings.SLACK_CLIENT.iter_channels(
+            exclude_archived=not auto_unarchive
+        ):
+            self.index_channels(channels)
+
+            for channel in channels:
+                if channel["name"] == name:
+                    if channel["is_archived"] and auto_unarchive:
+                        settings.SLACK_CLIENT.unarchive_channel(channel["id"])
+                        self.index_channel(channel["id"], name, is_archived=False)
+                    return channel["id"]
+
+        raise SlackError(f"Channel '{name}' not found")
+
+    def get_or_create_channel(self, name, auto_unarchive=False):
+        try:
+            channel_id = settings.SLACK_CLIENT.create_channel(name)
+        except SlackError as e:
+            if e.slack_error != "name_taken":
+                # some other error, let's propagate it upwards
+                raise
+
+            return self.get_channel_id(name, auto_unarchive)
+
+        self.index_channel(channel_id, name)
+        return channel_id
+
+    def index_channel(self, channel_id, name, is_archived=False):
+        "Records a single channel in the index, e.g. from a channel_created event"
+        with transaction.atomic():
+            # Channel names are unique, so any other channel we have with this
+            # name must since have been renamed
+            self.filter(name=name).exclude(channel_id=channel_id).delete()
+            self.update_or_create(
+                channel_id=channel_id,
+                defaults={
+                    "name": name,
+                    "is_archived": is_archived,
+                    "last_seen": datetime.now(),
+                },
+            )
+
+    def index_channels(self, channels):
+        "Records a page of channels from conversations.list in the index"
+        now = datetime.now()
+        by_id = {c["id"]: c for c in channels}
+
+        with transaction.atomic():
+            self.filter(name__in=[c["name"] for c in channels]).exclude(
+                channel_id__in=by_id.keys()
+            ).delete()
+
+            existing = list(self.filter(channel_id__in=by_id.keys()))
+            for channel in existing:
+                channel.name = by_id[channel.channel_id]["name"]
+                channel.is_archived = by_id[channel.channel_id]["is_archived"]
+                channel.last_seen = now
+            self.bulk_update(existing, ["name", "is_archived", "last_seen"])
+
+            seen = {channel.channel_id for channel in existing}
+            self.bulk_create(
+                SlackChannel(
+                    channel_id=c["id"],
+                    name=c["name"],
+                    is_archived=c["is_archived"],
+                    last_seen=now,
+                )
+                for c in channels
+                if c["id"] not in seen
+            )
+
+    def set_archived(self, channel_id, is_archived):
+        self.filter(channel_id=channel_id).update(is_archived=is_archived)
+
+    def remove_channel(self, channel_id):
+        self.filter(channel_id=channel_id).delete()
+
+
+class SlackChannel(models.Model):
+    """
+    An index of Slack channel names to IDs, so that we don't have to page
+    through every channel in the workspace to find one by name.
+
+    Entries are added as we see channels in conversations.list and kept up
+    to date by channel events (see event_handlers.py). Entries older than
+    RESPONSE_CHANNEL_INDEX_TTL_SECONDS are ignored and refreshed from Slack.
+    """
+
+    objects = SlackChannelManager()
+    channel_id = models.CharField(max_length=20, unique=True)
+    name = models.CharField(max_length=80, db_index=True)
+    is_archived = models.BooleanField(default=False)
+    last_seen = models.DateTimeField()
+
+    def __str__(self):
+        return f"#{self.name} ({self.channel_id})"
@@ -1,12 +1,158 @@
+import atexit
+import logging
+import threading
 from datetime import datetime
 
-from django.db import models
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 
 from response.core.models import ExternalUser, Incident
-from response.slack.cache import get_user_profile
+from response.core.util import Debouncer
+from response.slack.cache import get_user_profiles
+
+logger = logging.getLogger(__name__)
+
+
+class MessageCountBuffer:
+    """
+    Counts messages per (incident, user) in memory, so that they can be
+    written to UserStats a batch at a time rather than on every message.
+
+    Each process flushes its counts on a timer,
+    RESPONSE_USER_STATS_FLUSH_INTERVAL_SECONDS after the first count is
+    buffered, so they're written even if no more messages arrive. They're
+    also flushed by cron_minute, and when the process exits.
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = Debouncer(
+            self._flush_on_timer, self.flush_interval, on_commit=False
+        )
+
+    def flush_interval(self):
+        return getattr(settings, "RESPONSE_USER_STATS_FLUSH_INTERVAL_SECONDS", 30)
+
+    def add(self, incident_id, user_id, count=1):
+        with self._lock:
+            self._add(incident_id, user_id, count, datetime.now())
+        self._timer.request()
+
+    def _flush_on_timer(self, key=None):
+        self.flush()
+
+    def _add(self, incident_id, user_id, count, first_seen):
+        key = (incident_id, user_id)
+        existing = self._counts.get(key)
+        if existing:
+            self._counts[key] = (existing[0] + count, min(existing[1], first_seen))
+        else:
+            self._counts[key] = (count, first_seen)
+
+    def pending(self):
+        "Returns the counts waiting to be written, by (incident ID, user ID)"
+        with self._lock:
+            return {key: count for key, (count, _) in self._counts.items()}
+
+    def clear(self):
+        "Drops the buffered counts without writing them"
+        self._timer.cancel()
+        with self._lock:
+            self._counts = {}
+
+    def flush(self):
+        "Writes the buffered counts to UserStats"
+        with self._flush_lock:
+            with self._lock:
+                counts, self._counts = self._counts, {}
+
+            if not counts:
+                return
+
+            try:
+                UserStats.objects.add_message_counts(counts)
+            except Exception:
+                logger.exception(
+                    f"Failed to write message counts for {len(counts)} users, will retry"
+                )
+                with self._lock:
+                    for (incident_id, user_id), (count, first_seen) in counts.items():
+                        self._add(incident_id, user_id, count, first_seen)
+                self._timer.request()
+
+
+message_counts = MessageCountBuffer()
+atexit.register(message_counts.flush)
+
+
+class UserStatsManager(models.Manager):
+    def add_message_counts(self, counts):
+        """
+        Adds message counts, a dict of (incident ID, Slack user ID) to
+        (count, time of first message), to the stats for each incident/user.
+        Counts are added with an UPDATE ... SET message_count = message_count + n
+        so that concurrent writers don't lose each other's counts, and all in
+        one transaction so that a failed flush can safely be retried.
+        """
+        user_ids = {user_id for _, user_id in counts}
+
+        # make sure we have ExternalUsers for everyone
+        get_user_profiles(user_ids)
+        users = {}
+        for user in ExternalUser.objects.filter(
+            app_id="slack", external_id__in=user_ids
+        ):
+            users.setdefault(user.external_id, user)
+
+        with transaction.atomic():
+            existing = {
+                (s.incident_id, s.user.external_id): s.pk
+                for s in self.filter(
+                    incident_id__in={incident_id for incident_id, _ in counts},
+                    user__in=users.values(),
+                ).select_related("user")
+            }
+
+            to_create = []
+            for (incident_id, user_id), (count, first_seen) in counts.items():
+                if user_id not in users:
+                    logger.error(
+                        f"Can't record {count} messages from unknown user {user_id}"
+                    )
+                elif (incident_id, user_id) in existing:
+                    self.filter(pk=existing[(incident_id, user_id)]).update(
+                        message_count=F("message_count") + count
+                    )
+                else:
+                    to_create.append(
+                        UserStats(
+                            incident_id=incident_id,
+                            user=users[user_id],
+                            join_time=first_seen,
+                            message_count=count,
+                        )
+                    )
+
+            for user_stats in to_create:
+                self._create_or_add(user_stats)
+
+    def _create_or_add(self, user_stats):
+        try:
+            with transaction.atomic():
+                user_stats.save(force_insert=True)
+        except IntegrityError:
+            # someone else created them first
+            self.filter(
+                incident_id=user_stats.incident_id, user=user_stats.user
+            ).update(message_count=F("message_count") + user_stats.message_count)
 
 
 class UserStats(models.Model):
+    objects = UserStatsManager()
+
     user = models.ForeignKey(
         ExternalUser, on_delete=models.CASCADE, blank=False, null=False
     )
@@ -22,20 +168,7 @@ class UserStats(models.Model):
 
     @staticmethod
     def increment_message_count(incident, user_id):
-        name = get_user_profile(user_id)["name"]
-        user, _ = ExternalUser.objects.get_or_create_slack(
-            external_id=user_id, display_name=name
-        )
-
-        user_stats, created = UserStats.objects.get_or_create(
-            incident=incident, user=user
-        )
-
-        if created:
-            user_stats.join_time = datetime.now()
-
-        user_stats.message_count += 1
-        user_stats.save()
+        message_counts.add(incident.pk, user_id)
 
     def __str__(self):
         return f"{self.user.display_name} - {self.incident}"
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Requests per minute allowed by each of Slack's rate limit tiers
+# See https://api.slack.com/docs/rate-limits
+TIER_1 = 1
+TIER_2 = 20
+TIER_3 = 50
+TIER_4 = 100
+
+# Methods with per-channel limits (roughly one message per second per channel)
+PER_CHANNEL = "per_channel"
+PER_CHANNEL_RATE_PER_MINUTE = 60
+
+METHOD_TIERS = {
+    "auth.test": TIER_4,
+    "chat.postEphemeral": PER_CHANNEL,
+    "chat.postMessage": PER_CHANNEL,
+    "chat.update": TIER_3,
+    "conversations.create": TIER_2,
+    "conversations.info": TIER_3,
+    "conversations.invite": TIER_3,
+    "conversations.join": TIER_3,
+    "conversations.leave": TIER_3,
+    "conversations.list": TIER_2,
+    "conversations.rename": TIER_2,
+    "conversations.setTopic": TIER_2,
+    "conversations.unarchive": TIER_2,
+    "dialog.open": TIER_4,
+    "reactions.add": TIER_3,
+    "reactions.remove": TIER_2,
+    "usergroups.list": TIER_2,
+    "users.info": TIER_4,
+    "users.list": TIER_2,
+    "users.lookupByEmail": TIER_3,
+}
+
+# Used for methods not listed above, by method family
+FAMILY_TIERS = {"chat": TIER_3, "conversations": TIER_3, "users": TIER_3}
+DEFAULT_TIER = TIER_3
+
+
+def backoff_with_jitter(attempt, base_seconds, max_seconds):
+    """
+    Exponential backoff with 'full jitter': a random delay between zero and
+    base * 2^attempt, capped at max_seconds.
+    """
+    return random.uniform(0, min(max_seconds, base_seconds * 2 ** attempt))
+
+
+def retry_after_seconds(headers):
+    "Parse the Retry-After header Slack sends with `ratelimited` responses"
+    headers = {k.lower(): v for k, v in (headers or {}).items()}
+    try:
+        return float(headers["retry-after"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket. Reservations may take the bucket into debt,
+    which queues callers up behind each other at the bucket's rate rather
+    than having them all wake up and retry at once.
+    """
+
+    def __init__(self, rate_per_minute, burst):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.waiting = 0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        "Take a token, returning how many seconds the caller must wait to use it"
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+            self.tokens -= 1
+
+            delay = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            return max(delay, self.paused_until - now)
+
+    def pause(self, seconds):
+        "Stop handing out usable tokens for the next `seconds` (e.g. Retry-After)"
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class RateLimiter:
+    """
+    Paces Slack API calls client-side so that we stay within Slack's
+    per-method rate limit tiers, instead of finding out we've exceeded them
+    when Slack starts returning `ratelimited`.
+
+    Each API method gets its own token bucket sized by its tier, except for
+    methods in the PER_CHANNEL tier (e.g. chat.postMessage), which get a
+    bucket per channel.
+
+    Arguments:
+        method_tiers: overrides for METHOD_TIERS, e.g. {"users.list": TIER_1}
+        burst_seconds: how many seconds' worth of calls may be made in a burst
+    """
+
+    def __init__(self, method_tiers=None, burst_seconds=3):
+        self.method_tiers = {**METHOD_TIERS, **(method_tiers or {})}
+        self.burst_seconds = burst_seconds
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def tier_for(self, method):
+        if method in self.method_tiers:
+            return self.method_tiers[method]
+        return FAMILY_TIERS.get(method.split(".")[0], DEFAULT_TIER)
+
+    def bucket_key(self, method, channel=None):
+        if self.tier_for(method) == PER_CHANNEL:
+            return f"{method}:{channel}"
+        return method
+
+    def bucket(self, method, channel=None):
+        key = self.bucket_key(method, channel)
+        with self._lock:
+            if key not in self._buckets:
+                tier = self.tier_for(method)
+                rate = PER_CHANNEL_RATE_PER_MINUTE if tier == PER_CHANNEL else tier
+                burst = max(1, int(rate * self.burst_seconds / 60))
+                self._buckets[key] = TokenBucket(rate, burst)
+            return self._buckets[key]
+
+    def acquire(self, method, channel=None):
+        "Block until a call to `method` can be made without exceeding its tier"
+        bucket = self.bucket(method, channel)
+        delay = bucket.reserve()
+        if delay > 0:
+            logger.info(f"Pacing call to Slack API {method}: waiting {delay:.2f}s")
+            with self._waiting(bucket):
+                time.sleep(delay)
+
+    async def acquire_async(self, method, channel=None):
+        "As acquire, but waits without blocking the event loop"
+        bucket = self.bucket(method, channel)
+        delay = bucket.reserve()
+        if delay > 0:
+            logger.info(f"Pacing call to Slack API {method}: waiting {delay:.2f}s")
+            with self._waiting(bucket):
+                await asyncio.sleep(delay)
+
+    @contextmanager
+    def _waiting(self, bucket):
+        with self._lock:
+            bucket.waiting += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                bucket.waiting -= 1
+
+    def retry_after(self, method, seconds, channel=None):
+        "Hold back all callers of `method` after Slack has told us to slow down"
+        self.bucket(method, channel).pause(seconds)
+
+    def queue_depths(self):
+        "Returns the number of callers currently waiting, by bucket"
+        with self._lock:
+            return {key: b.waiting for key, b in self._buckets.items() if b.waiting}
@@ -13,12 +13,20 @@ def user_reference(user_id):
     return f"<@{user_id}>"
 
 
+USER_REFERENCE = re.compile(r"<@(U[A-Z0-9]+)>")
+
+
 def reference_to_id(value):
     """take a string containing <@U123ABCD> refs and extract first match"""
-    m = re.search(r"<@(U[A-Z0-9]+)>", value)
+    m = USER_REFERENCE.search(value)
     return m.group(1) if m else None
 
 
+def user_ids_in(*values):
+    """returns the IDs of all the users referenced in the given strings"""
+    return {user_id for v in values if v for user_id in USER_REFERENCE.findall(v)}
+
+
 def user_ref_to_username(value):
     """takes a <@U123ABCD> style ref and returns an @username"""
     # strip the '<@' and '>'
@@ -27,8 +35,26 @@ def user_ref_to_username(value):
     return "@" + user_profile["name"] or user_id
 
 
-def slack_to_human_readable(value):
+def slack_to_human_readable(value, profiles=None):
+    """
+    Replaces Slack references with human readable names. All the users
+    referenced are resolved in one batch, unless `profiles` (a dict of user ID
+    to profile, from cache.get_user_profiles) is given.
+    """
+    if profiles is None:
+        profiles = cache.get_user_profiles(user_ids_in(value))
+
+    def _username(m):
+        user_profile = profiles.get(m.group(1))
+        return "@" + (user_profile["name"] if user_profile else m.group(1))
+
     # replace user references (<@U3231FFD>) with usernames (@chrisevans)
-    value = re.sub(r"(<@U[A-Z0-9]+>)", user_ref_to_username, value)
+    value = USER_REFERENCE.sub(_username, value)
     value = re.sub(r"(<#C[A-Z0-9]+\|([\-a-zA-Z0-9]+)>)", r"#\2", value)
     return value
+
+
+def slack_to_human_readable_many(values):
+    """as slack_to_human_readable, resolving the users for all `values` at once"""
+    profiles = cache.get_user_profiles(user_ids_in(*values))
+    return [slack_to_human_readable(v, profiles) for v in values]
@@ -9,14 +9,18 @@ if SLACK_API_MOCK:
     from urllib.parse import urlparse
     from slackclient.slackrequest import requests
 
-    old_post = requests.post
+    # Patch at the Session level so that both one-off requests.post calls and
+    # the pooled transport (which keeps its own Session) hit the mock
+    old_request = requests.Session.request
 
     import logging
 
-    def fake_post(url, *args, **kwargs):
+    def fake_request(self, method, url, *args, **kwargs):
         parsed = urlparse(url)
         newurl = parsed._replace(netloc=SLACK_API_MOCK, scheme="http")
-        logging.info(f"Fake Slack client request: HTTP POST {SLACK_API_MOCK} {newurl}")
-        return old_post(newurl.geturl(), *args, **kwargs)
+        logging.info(
+            f"Fake Slack client request: HTTP {method} {SLACK_API_MOCK} {newurl}"
+        )
+        return old_request(self, method, newurl.geturl(), *args, **kwargs)
 
-    requests.post = fake_post
+    requests.Session.request = fake_request
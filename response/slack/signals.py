@@ -1,13 +1,17 @@
 from urllib.parse import urljoin
 
 from django.conf import settings
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.urls import reverse
 
-from response.core.models import Incident, add_incident_update_event
+from response.core.models import ExternalUser, Incident, add_incident_update_event
 from response.core.serializers import ExternalUserSerializer
-from response.slack.models import HeadlinePost
+from response.slack.cache import channel_incident_cache, user_profile_cache
+from response.slack.decorators import schedule_notifications
+from response.slack.models import CommsChannel, HeadlinePost
+from response.slack.models.comms_channel import comms_channel_ids
+from response.slack.models.headline_post import headline_updates
 
 
 @receiver(post_save, sender=Incident)
@@ -15,15 +19,14 @@ def update_headline_after_incident_save(sender, instance, **kwargs):
     """
     Reflect changes to incidents in the headline post
 
-    Important: this is called in the synchronous /incident flow so must remain fast (<2 secs)
+    Important: this is called in the synchronous /incident flow so must remain
+    fast (<2 secs), so the update is sent to Slack in the background
 
     """
-    try:
-        headline_post = HeadlinePost.objects.get(incident=instance)
-        headline_post.update_in_slack()
-
-    except HeadlinePost.DoesNotExist:
-        headline_post = HeadlinePost.objects.create_headline_post(incident=instance)
+    if HeadlinePost.objects.filter(incident=instance).exists():
+        headline_updates.request(instance.pk)
+    else:
+        HeadlinePost.objects.create_headline_post(incident=instance)
 
 
 @receiver(pre_save, sender=Incident)
@@ -32,13 +35,13 @@ def prompt_incident_report(sender, instance: Incident, **kwargs):
     Prompt incident lead to complete a report when an incident is closed.
     """
 
-    try:
-        prev_state = Incident.objects.get(pk=instance.pk)
-    except Incident.DoesNotExist:
-        # Incident hasn't been saved yet, nothing to do here.
+    changed = instance.changed_fields()
+    if not changed or "end_time" not in changed:
+        # Incident hasn't been saved yet, or hasn't been closed
         return
 
-    if instance.is_closed() and not prev_state.is_closed():
+    was_closed = changed["end_time"][0] is not None
+    if instance.is_closed() and not was_closed:
         user_to_notify = instance.lead or instance.reporter
         doc_url = urljoin(
             settings.SITE_URL,
@@ -56,30 +59,31 @@ def update_headline_after_save(sender, instance, **kwargs):
     Reflect changes to headline posts in slack
 
     """
-    instance.update_in_slack()
+    instance.request_update()
 
 
 @receiver(pre_save, sender=Incident)
 def add_timeline_events(sender, instance: Incident, **kwargs):
-    try:
-        prev_state = Incident.objects.get(pk=instance.pk)
-    except Incident.DoesNotExist:
-        # Incident hasn't been saved yet, nothing to do here.
+    changed = instance.changed_fields()
+    if not changed:
+        # Incident hasn't been saved yet, or nothing's changed
         return
 
-    if prev_state.lead != instance.lead:
+    prev_state = instance.previous_state()
+
+    if "lead" in changed:
         update_incident_lead_event(prev_state, instance)
 
-    if prev_state.report != instance.report:
+    if "report" in changed:
         update_incident_report_event(prev_state, instance)
 
-    if prev_state.summary != instance.summary:
+    if "summary" in changed:
         update_incident_summary_event(prev_state, instance)
 
-    if prev_state.impact != instance.impact:
+    if "impact" in changed:
         update_incident_impact_event(prev_state, instance)
 
-    if prev_state.severity != instance.severity:
+    if "severity" in changed:
         update_incident_severity_event(prev_state, instance)
 
 
@@ -168,3 +172,38 @@ def update_incident_severity_event(prev_state, instance):
         },
         new_value={"id": instance.severity, "text": instance.severity_text()},
     )
+
+
+@receiver(post_save, sender=ExternalUser)
+@receiver(post_delete, sender=ExternalUser)
+def invalidate_cached_user_profile(sender, instance, **kwargs):
+    user_profile_cache.delete(instance.external_id)
+
+
+@receiver(post_save, sender=CommsChannel)
+@receiver(post_delete, sender=CommsChannel)
+def invalidate_cached_channel_incident(sender, instance, **kwargs):
+    channel_incident_cache.delete(instance.channel_id)
+    comms_channel_ids.invalidate()
+
+
+@receiver(post_save, sender=CommsChannel)
+def schedule_incident_notifications(sender, instance, created, **kwargs):
+    if created:
+        schedule_notifications([instance.incident])
+
+
+@receiver(pre_save, sender=Incident)
+def reschedule_reopened_incident_notifications(sender, instance: Incident, **kwargs):
+    """
+    Closed incidents stop being notified, so start notifying them again if
+    they're reopened.
+    """
+    changed = instance.changed_fields()
+    if not changed or "end_time" not in changed:
+        return
+
+    was_closed = changed["end_time"][0] is not None
+    if was_closed and not instance.is_closed():
+        if CommsChannel.objects.filter(incident=instance).exists():
+            schedule_notifications([instance])
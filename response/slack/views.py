@@ -1,14 +1,21 @@
 import json
 import logging
+import queue
+from datetime import date
 
 from django.conf import settings
 from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 
+from response.core.archive import archive_old_events
+from response.core.events import drain_event_outbox
+from response.core.jobs import job_queue_enabled
 from response.core.models.incident import Incident
+from response.core.util import LRUCache
 from response.slack.authentication import slack_authenticate
 from response.slack.cache import update_user_cache
 from response.slack.decorators import (
+    get_event_dispatcher,
     handle_action,
     handle_dialog,
     handle_event,
@@ -21,10 +28,21 @@ from response.slack.dialog_builder import (
     Text,
     TextArea,
 )
+from response.slack.event_filter import filter_event
+from response.slack.models.user_stats import message_counts
 from response.slack.settings import INCIDENT_REPORT_DIALOG
 
 logger = logging.getLogger(__name__)
 
+# IDs of the events we've recently received, so that we can ignore Slack's
+# retries of events we're already handling
+seen_events = LRUCache(
+    maxsize=getattr(settings, "RESPONSE_EVENT_DEDUPE_SIZE", 10000),
+    ttl_seconds=getattr(settings, "RESPONSE_EVENT_DEDUPE_TTL_SECONDS", 60 * 60),
+    cache_alias=getattr(settings, "RESPONSE_EVENT_DEDUPE_CACHE_ALIAS", None),
+    key_prefix="response:slack_event:",
+)
+
 
 @csrf_exempt
 @slack_authenticate
@@ -122,9 +140,9 @@ def action(request):
     logger.info(f"Handling Slack action of type '{action_type}'")
 
     if action_type == "dialog_submission":
-        handle_dialog.after_response(payload)
+        handle_dialog.enqueue(payload)
     elif action_type == "block_actions":
-        handle_action.after_response(payload)
+        handle_action.enqueue(payload)
     else:
         logger.error(f"No handler for action type {action_type}")
 
@@ -145,13 +163,48 @@ def event(request):
     @param request the request from slack containing an event
     @return: return a HTTP response to indicate the request was handled
     """
+    # drop events we'd ignore anyway (e.g. bot messages, or messages in
+    # channels that aren't comms channels) before doing any real work
+    if not filter_event(request.body):
+        return HttpResponse()
+
     payload = json.loads(request.body)
     action_type = payload["type"]
 
     logger.info(f"Handling Slack event of type '{action_type}'")
 
     if action_type == "event_callback":
-        handle_event(payload)
+        # Slack expects a response within 3 seconds, and retries the event if it
+        # doesn't get one, so unless we're configured to handle events inline we
+        # queue the event to be handled after responding.
+        event_id = payload.get("event_id")
+        retry_num = request.META.get("HTTP_X_SLACK_RETRY_NUM")
+        if event_id and not seen_events.add(event_id):
+            logger.info(
+                f"Ignoring duplicate Slack event {event_id} (retry {retry_num})"
+            )
+            return HttpResponse()
+
+        if retry_num:
+            retry_reason = request.META.get("HTTP_X_SLACK_RETRY_REASON")
+            logger.warning(
+                f"Slack retried event {event_id} (retry {retry_num}, reason {retry_reason})"
+            )
+
+        dispatcher = get_event_dispatcher()
+        if job_queue_enabled():
+            handle_event.enqueue_once(
+                f"slack_event:{event_id}" if event_id else None, payload
+            )
+        elif dispatcher:
+            try:
+                dispatcher.dispatch(payload)
+            except queue.Full:
+                # We're too far behind to take this event, so let Slack retry it
+                seen_events.delete(event_id)
+                return HttpResponse(status=503)
+        else:
+            handle_event(payload)
     elif action_type == "url_verification":
         # the url_verification event is called when we change the registered event callback url
         # in the Sl ack app configuration.  It expects us to return the challenge token sent in
@@ -165,6 +218,8 @@ def event(request):
 def cron_minute(request):
     "Handles actions that need to take place every minute"
     handle_notifications()
+    message_counts.flush()
+    drain_event_outbox()
     return HttpResponse()
 
 
@@ -172,4 +227,9 @@ def cron_minute(request):
 def cron_daily(request):
     "Handles actions that need to take place every day"
     update_user_cache()
+    # Archiving can take a while, so leave it to the worker. Without the job
+    # queue, run `manage.py archive_events` from cron instead.
+    retention_days = getattr(settings, "RESPONSE_EVENT_RETENTION_DAYS", None)
+    if retention_days is not None and job_queue_enabled():
+        archive_old_events.enqueue_once(f"archive_old_events:{date.today()}")
     return HttpResponse()
@@ -3,7 +3,9 @@ from django.shortcuts import render
 
 from response.core.models import Action, Incident
 from response.decorators import response_login_required
+from response.slack.cache import get_user_profiles
 from response.slack.models import PinnedMessage, UserStats
+from response.slack.reference_utils import user_ids_in
 
 
 @response_login_required
@@ -24,6 +26,18 @@ def incident_doc(request: HttpRequest, incident_id: str):
     user_stats = UserStats.objects.filter(incident=incident).order_by("-message_count")[
         :5
     ]
+
+    # Resolve everyone referenced in the doc up front, rather than one at a
+    # time as the template renders
+    get_user_profiles(
+        user_ids_in(
+            incident.summary,
+            incident.impact,
+            *(e.text for e in events),
+            *(a.details for a in actions),
+        )
+    )
+
     return render(
         request,
         template_name="incident_doc.html",
@@ -21,6 +21,11 @@ INSTALL_REQUIRES = [
     "statuspageio>=0.0.1",
 ]
 
+EXTRAS_REQUIRE = {
+    # AsyncSlackClient
+    "async": ["aiohttp>=3.6"]
+}
+
 # allow setup.py to be run from any path
 os.chdir(os.path.normpath(os.path.join(os.path.abspath(__file__), os.pardir)))
 
@@ -37,6 +42,7 @@ setup(
     long_description_content_type="text/markdown",
     packages=find_packages(exclude="demo"),
     install_requires=INSTALL_REQUIRES,
+    extras_require=EXTRAS_REQUIRE,
     package_dir={"response": "response"},
     python_requires=">3.6",
     include_package_data=True,
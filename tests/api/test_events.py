@@ -1,9 +1,17 @@
+import base64
+import importlib
 import json
+import threading
+import time
 from datetime import datetime, timedelta
 
+import pytest
+from django.apps import apps
+from django.db import connection
 from django.urls import reverse
 from rest_framework.test import force_authenticate
 
+from response.core.models import Event
 from response.core.signals import ActionEventHandler, IncidentEventHandler
 from response.core.views import EventsViewSet
 from tests.factories.action import ActionFactory
@@ -114,3 +122,190 @@ def test_omit_private_action(arf, api_user):
     assert "results" in content, "Response didn't have results key"
     events = content["results"]
     assert len(events) == 0, "Expected zero events"
+
+
+def list_events(arf, api_user, **query_params):
+    req = arf.get(reverse("event-list"), data=query_params)
+    force_authenticate(req, user=api_user)
+    return EventsViewSet.as_view({"get": "list"})(req)
+
+
+def test_events_record_their_incident(arf, api_user):
+    incident = IncidentFactory(private=False)
+    action = ActionFactory.create(incident=incident)
+    IncidentEventHandler.handle(None, incident)
+    ActionEventHandler.handle(None, action)
+
+    assert [e.incident_id for e in Event.objects.order_by("pk")] == [
+        incident.pk,
+        incident.pk,
+    ]
+
+    content = json.loads(list_events(arf, api_user).rendered_content)
+    assert [e["incident_id"] for e in content["results"]] == [
+        incident.pk,
+        incident.pk,
+    ]
+    assert content["results"][0]["payload"]["id"] == incident.pk
+
+
+def test_filter_events_by_incident_and_type(arf, api_user):
+    incident, other = IncidentFactory.create_batch(2, private=False)
+    for i in (incident, other):
+        IncidentEventHandler.handle(None, i)
+        ActionEventHandler.handle(None, ActionFactory.create(incident=i))
+
+    response = list_events(arf, api_user, incident=incident.pk)
+    events = json.loads(response.rendered_content)["results"]
+    assert {e["incident_id"] for e in events} == {incident.pk}
+    assert len(events) == 2
+
+    response = list_events(
+        arf, api_user, incident=incident.pk, type=Event.ACTION_EVENT_TYPE
+    )
+    events = json.loads(response.rendered_content)["results"]
+    assert [(e["incident_id"], e["event_type"]) for e in events] == [
+        (incident.pk, Event.ACTION_EVENT_TYPE)
+    ]
+
+
+def test_filter_events_by_invalid_incident(arf, api_user):
+    response = list_events(arf, api_user, incident="not-an-id")
+    assert response.status_code == 400
+
+
+def query_plan(queryset):
+    "SQLite's plan for `queryset`, as one string"
+    if connection.vendor != "sqlite":
+        pytest.skip("Query plans are only checked on SQLite")
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return " ".join(str(row) for row in cursor.fetchall())
+
+
+@pytest.mark.django_db
+def test_incident_filter_uses_an_index():
+    events = Event.objects.filter(incident_id=1, event_type=Event.ACTION_EVENT_TYPE)
+    assert "USING INDEX" in query_plan(events)
+
+
+@pytest.mark.django_db
+def test_existing_events_are_given_incident_ids():
+    migration = importlib.import_module("response.migrations.0027_event_payload_json")
+    incident_event = EventFactory(
+        event_type=Event.INCIDENT_EVENT_TYPE, payload={"id": 12}
+    )
+    action_event = EventFactory(
+        event_type=Event.ACTION_EVENT_TYPE, payload={"id": 3, "incident_id": 34}
+    )
+    Event.objects.update(incident_id=None)
+
+    migration.set_event_incident_ids(apps, None)
+
+    incident_event.refresh_from_db()
+    action_event.refresh_from_db()
+    assert incident_event.incident_id == 12
+    assert action_event.incident_id == 34
+
+
+def get_feed(arf, api_user, **query_params):
+    req = arf.get(reverse("event-feed"), data=query_params)
+    force_authenticate(req, user=api_user)
+    response = EventsViewSet.as_view({"get": "feed"})(req)
+    return response.status_code, json.loads(response.rendered_content)
+
+
+def test_feed_returns_every_event_once(arf, api_user, settings):
+    settings.RESPONSE_EVENT_FEED_SETTLE_SECONDS = 0
+    ts = datetime.now() - timedelta(hours=1)
+    # several events with the same timestamp, to check the id tie break
+    expected = [
+        EventFactory(timestamp=ts + timedelta(seconds=i // 3)).pk for i in range(10)
+    ]
+
+    seen = []
+    cursor = None
+    for _ in range(5):
+        params = {"limit": 4}
+        if cursor:
+            params["since"] = cursor
+        status, content = get_feed(arf, api_user, **params)
+        assert status == 200
+        seen.extend(e["id"] for e in content["results"])
+        cursor = content["cursor"]
+
+    assert seen == expected
+
+    # new events carry on from the cursor
+    new = EventFactory(timestamp=datetime.now())
+    status, content = get_feed(arf, api_user, since=cursor)
+    assert [e["id"] for e in content["results"]] == [new.pk]
+
+
+def test_feed_waits_for_recent_events_to_settle(arf, api_user, settings):
+    settings.RESPONSE_EVENT_FEED_SETTLE_SECONDS = 60
+    old = EventFactory(timestamp=datetime.now() - timedelta(minutes=5))
+    EventFactory(timestamp=datetime.now())
+
+    status, content = get_feed(arf, api_user)
+    assert [e["id"] for e in content["results"]] == [old.pk]
+
+
+def test_feed_long_poll(arf, api_user, settings):
+    settings.RESPONSE_EVENT_FEED_SETTLE_SECONDS = 0
+    settings.RESPONSE_EVENT_FEED_POLL_SECONDS = 0.05
+    EventFactory(timestamp=datetime.now() - timedelta(minutes=5))
+    status, content = get_feed(arf, api_user)
+    cursor = content["cursor"]
+
+    start = time.monotonic()
+    status, content = get_feed(arf, api_user, since=cursor, wait=0.2)
+    assert content["results"] == []
+    assert content["cursor"] == cursor
+    assert time.monotonic() - start >= 0.2
+
+    def create_event():
+        time.sleep(0.2)
+        EventFactory(timestamp=datetime.now())
+        connection.close()
+
+    thread = threading.Thread(target=create_event)
+    thread.start()
+    start = time.monotonic()
+    status, content = get_feed(arf, api_user, since=cursor, wait=10)
+    thread.join()
+
+    assert len(content["results"]) == 1
+    assert time.monotonic() - start < 5
+
+
+def test_feed_rejects_invalid_cursors(arf, api_user):
+    for params in (
+        {"since": "not-a-cursor"},
+        {"since": base64.urlsafe_b64encode(b"yesterday|1").decode()},
+        {"limit": "0"},
+        {"wait": "soon"},
+        {"wait": "nan"},
+        {"wait": "inf"},
+    ):
+        status, _ = get_feed(arf, api_user, **params)
+        assert status == 400
+
+
+def test_feed_ignores_negative_waits(arf, api_user):
+    start = time.monotonic()
+    status, content = get_feed(arf, api_user, wait=-10)
+    assert status == 200
+    assert content["results"] == []
+    assert time.monotonic() - start < 1
+
+
+@pytest.mark.django_db
+def test_feed_uses_the_timestamp_index():
+    since = (datetime.now(), 100)
+    plan = query_plan(Event.objects.feed(since=since)[:100])
+
+    assert "response_event_timestamp_id" in plan
+    assert "TEMP B-TREE" not in plan
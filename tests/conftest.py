@@ -1,3 +1,4 @@
+import json
 import os
 from datetime import datetime
 from unittest.mock import MagicMock
@@ -8,7 +9,11 @@ from django.conf import settings
 from django.urls import reverse
 
 from response.slack.authentication import generate_signature
+from response.slack.cache import channel_incident_cache, user_profile_cache
 from response.slack.client import SlackClient
+from response.slack.models.comms_channel import comms_channel_ids
+from response.slack.models.user_stats import message_counts
+from response.slack.views import seen_events
 
 
 @pytest.fixture(autouse=True)
@@ -20,6 +25,31 @@ def mock_slack(monkeypatch):
     return mock_slack
 
 
+@pytest.fixture(autouse=True)
+def send_headline_updates_immediately(monkeypatch):
+    # tests check the headline post straight after changing the incident
+    monkeypatch.setattr(
+        settings, "RESPONSE_HEADLINE_DEBOUNCE_SECONDS", 0, raising=False
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # The test DB is rolled back between tests, so don't let cached state
+    # leak from one test to the next
+    user_profile_cache.clear()
+    channel_incident_cache.clear()
+    seen_events.clear()
+    comms_channel_ids.invalidate()
+    message_counts.clear()
+    yield
+    user_profile_cache.clear()
+    channel_incident_cache.clear()
+    seen_events.clear()
+    comms_channel_ids.invalidate()
+    message_counts.clear()
+
+
 @pytest.fixture(scope="session")
 def slack_signing_secret():
     return os.getenv("SLACK_SIGNING_SECRET", "signingsecretnotset")
@@ -41,3 +71,26 @@ def post_from_slack_api(client, slack_signing_secret):
         )
 
     return _post
+
+
+@pytest.fixture
+def post_event_from_slack_api(client, slack_signing_secret):
+    def _post(payload, retry_num=None):
+        body = json.dumps(payload).encode()
+        timestamp = str(int(datetime.now().timestamp()))
+        signature = generate_signature(timestamp, slack_signing_secret, body)
+        headers = {}
+        if retry_num:
+            headers["HTTP_X_SLACK_RETRY_NUM"] = str(retry_num)
+            headers["HTTP_X_SLACK_RETRY_REASON"] = "http_timeout"
+
+        return client.post(
+            reverse("event"),
+            data=body,
+            content_type="application/json",
+            HTTP_X_SLACK_REQUEST_TIMESTAMP=timestamp,
+            HTTP_X_SLACK_SIGNATURE=signature,
+            **headers,
+        )
+
+    return _post
@@ -0,0 +1,166 @@
+import gzip
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+from unittest import mock
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from response.core.archive import (
+    archive_events,
+    archive_old_events,
+    archive_paths,
+    restore_events,
+)
+from response.core.models import Event, Job
+from response.slack.views import cron_daily
+from tests.factories import EventFactory
+
+
+@pytest.fixture
+def events():
+    "Three events a day for the last five days"
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    return [
+        EventFactory(
+            timestamp=today - timedelta(days=day, hours=-hour),
+            payload={"id": day * 10 + hour, "summary": f"Day {day}"},
+        )
+        for day in range(4, -1, -1)
+        for hour in (1, 2, 3)
+    ]
+
+
+def archived_ids(paths):
+    ids = []
+    for path in paths:
+        with gzip.open(path, "rt") as f:
+            ids.extend(json.loads(line)["id"] for line in f)
+    return ids
+
+
+@pytest.mark.django_db
+def test_archive_events_by_day(events, tmp_path):
+    before = events[9].timestamp  # the first event 1 day ago
+
+    assert archive_events(before, directory=str(tmp_path), batch_size=4) == 9
+
+    assert set(Event.objects.values_list("pk", flat=True)) == {e.pk for e in events[9:]}
+    # a file per day in each batch of 4, named for its first and last events
+    assert sorted(name.rsplit("-", 1)[0] for name in os.listdir(tmp_path)) == sorted(
+        f"events-{events[first].timestamp.date().isoformat()}-{events[first].pk}-{events[last].pk}"
+        for first, last in ((0, 2), (3, 3), (4, 5), (6, 7), (8, 8))
+    )
+    for i in (0, 3, 6):
+        day = events[i].timestamp.date()
+        assert archived_ids(archive_paths(str(tmp_path), day)) == [
+            e.pk for e in events if e.timestamp.date() == day
+        ]
+
+
+@pytest.mark.django_db
+def test_restore_events(events, tmp_path):
+    archive_events(events[9].timestamp, directory=str(tmp_path))
+
+    # restore just the middle day, and the first event of the next
+    restored = restore_events(
+        events[3].timestamp, events[6].timestamp, directory=str(tmp_path)
+    )
+    assert restored == 4
+
+    for original in events[3:7]:
+        event = Event.objects.get(pk=original.pk)
+        assert event.timestamp == original.timestamp
+        assert event.event_type == original.event_type
+        assert event.payload == original.payload
+        assert event.incident_id == original.incident_id
+    assert not Event.objects.filter(pk__in=[e.pk for e in events[:3]]).exists()
+
+    # restoring again doesn't duplicate anything
+    assert restore_events(events[3].timestamp, events[6].timestamp, str(tmp_path)) == 0
+
+
+@pytest.mark.django_db
+def test_restore_ignores_events_archived_twice(events, tmp_path):
+    before = events[3].timestamp
+    archive_events(before, directory=str(tmp_path))
+    # as if archiving was interrupted after writing a batch, before deleting
+    # it, then archived again in differently sized batches
+    day = before.date() - timedelta(days=1)
+    [path] = archive_paths(str(tmp_path), day)
+    shutil.copy(path, path.replace(".jsonl.gz", "-again.jsonl.gz"))
+    assert len(archived_ids(archive_paths(str(tmp_path), day))) == 6
+
+    assert restore_events(events[0].timestamp, before, str(tmp_path)) == 3
+    assert Event.objects.count() == len(events)
+
+
+@pytest.mark.django_db
+def test_restored_events_can_be_archived_again(events, tmp_path):
+    before = events[3].timestamp
+    day = before.date() - timedelta(days=1)
+    archive_events(before, directory=str(tmp_path))
+
+    # restore the start of the batch, then archive it again
+    assert restore_events(events[0].timestamp, events[0].timestamp, str(tmp_path)) == 1
+    assert archive_events(before, directory=str(tmp_path)) == 1
+
+    assert sorted(archived_ids(archive_paths(str(tmp_path), day))) == sorted(
+        [e.pk for e in events[:3]] + [events[0].pk]
+    )
+    Event.objects.all().delete()
+    assert restore_events(events[0].timestamp, before, str(tmp_path)) == 3
+
+
+@pytest.mark.django_db
+def test_archive_old_events(events, settings, tmp_path):
+    settings.RESPONSE_EVENT_ARCHIVE_DIR = str(tmp_path)
+
+    settings.RESPONSE_EVENT_RETENTION_DAYS = None
+    assert archive_old_events() == 0
+
+    # everything from before midnight 3 days ago, i.e. 4 days ago
+    settings.RESPONSE_EVENT_RETENTION_DAYS = 3
+    assert archive_old_events() == 3
+    assert Event.objects.count() == len(events) - 3
+
+
+@pytest.mark.django_db
+def test_cron_daily_only_archives_with_the_job_queue(events, rf, settings, tmp_path):
+    settings.RESPONSE_EVENT_ARCHIVE_DIR = str(tmp_path)
+    settings.RESPONSE_EVENT_RETENTION_DAYS = 3
+
+    with mock.patch("response.slack.views.update_user_cache"):
+        settings.RESPONSE_USE_JOB_QUEUE = False
+        cron_daily(rf.post("/cron_daily"))
+        assert not Job.objects.exists()
+        assert Event.objects.count() == len(events)
+
+        settings.RESPONSE_USE_JOB_QUEUE = True
+        cron_daily(rf.post("/cron_daily"))
+        cron_daily(rf.post("/cron_daily"))
+        assert Job.objects.get().name == archive_old_events.job_name
+
+
+@pytest.mark.django_db
+def test_archive_and_restore_commands(events, tmp_path):
+    call_command("archive_events", "--days", "2", "--dir", str(tmp_path))
+    assert Event.objects.count() == 9
+
+    call_command(
+        "restore_events",
+        "--from",
+        events[0].timestamp.date().isoformat(),
+        "--to",
+        events[2].timestamp.isoformat(),
+        "--dir",
+        str(tmp_path),
+    )
+    assert Event.objects.count() == 12
+
+
+def test_commands_reject_invalid_dates(tmp_path):
+    with pytest.raises(CommandError):
+        call_command("archive_events", "--before", "last week", "--dir", str(tmp_path))
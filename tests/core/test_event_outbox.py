@@ -0,0 +1,270 @@
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from django.test.utils import CaptureQueriesContext
+
+from response.core.events import (
+    OutboxActionEventHandler,
+    OutboxIncidentEventHandler,
+    drain_event_outbox,
+)
+from response.core.models import Action, Event, Incident, OutboxEntry
+from response.core.signals import ActionEventHandler, IncidentEventHandler
+from tests.factories import (
+    ActionFactory,
+    EventFactory,
+    ExternalUserFactory,
+    IncidentFactory,
+)
+
+
+@contextmanager
+def outbox_handlers():
+    post_save.disconnect(ActionEventHandler.handle, sender=Action)
+    post_save.disconnect(IncidentEventHandler.handle, sender=Incident)
+    post_save.connect(OutboxActionEventHandler.handle, sender=Action)
+    post_save.connect(OutboxIncidentEventHandler.handle, sender=Incident)
+    try:
+        yield
+    finally:
+        post_save.disconnect(OutboxActionEventHandler.handle, sender=Action)
+        post_save.disconnect(OutboxIncidentEventHandler.handle, sender=Incident)
+        post_save.connect(ActionEventHandler.handle, sender=Action)
+        post_save.connect(IncidentEventHandler.handle, sender=Incident)
+
+
+@pytest.fixture
+def outbox(settings):
+    "Records events through the outbox instead of as they're saved"
+    settings.RESPONSE_EVENT_OUTBOX_DRAIN_DELAY_SECONDS = None
+    with outbox_handlers():
+        yield
+
+
+@pytest.fixture
+def incident():
+    incident = IncidentFactory.create(end_time=None, private=False)
+    return Incident.objects.get(pk=incident.pk)
+
+
+def events():
+    return [(e.event_type, e.payload) for e in Event.objects.order_by("pk")]
+
+
+@pytest.mark.django_db
+def test_outbox_events_match_synchronous_events(incident, settings):
+    settings.RESPONSE_EVENT_OUTBOX_DRAIN_DELAY_SECONDS = None
+    action = ActionFactory.create(incident=incident)
+    Event.objects.all().delete()
+
+    ActionEventHandler.handle(Action, action)
+    IncidentEventHandler.handle(Incident, incident)
+    synchronous = events()
+    Event.objects.all().delete()
+
+    OutboxActionEventHandler.handle(Action, action)
+    OutboxIncidentEventHandler.handle(Incident, incident, created=True)
+    assert drain_event_outbox() == 2
+
+    assert events() == synchronous
+    assert synchronous[0][1]["incident_id"] == incident.pk
+    assert synchronous[1][1]["comms_channel"] is not None
+    assert not OutboxEntry.objects.exists()
+
+
+@pytest.mark.django_db
+def test_events_are_drained_in_the_order_they_were_saved(outbox, incident):
+    other = IncidentFactory.create(end_time=None, private=False)
+    Event.objects.all().delete()
+
+    for i in range(3):
+        incident.summary = f"Summary {i}"
+        incident.save()
+        Action.objects.create(
+            incident=incident, user=incident.reporter, details=f"Action {i}"
+        )
+        other.summary = f"Other {i}"
+        other.save()
+    assert not Event.objects.exists()
+
+    # small batches, to check ordering across them
+    assert drain_event_outbox(batch_size=4) == 9
+
+    drained = [
+        (payload.get("incident_id", payload["id"]), event_type)
+        for event_type, payload in events()
+    ]
+    assert (
+        drained
+        == [
+            (incident.pk, Event.INCIDENT_EVENT_TYPE),
+            (incident.pk, Event.ACTION_EVENT_TYPE),
+            (other.pk, Event.INCIDENT_EVENT_TYPE),
+        ]
+        * 3
+    )
+
+
+@pytest.mark.django_db
+def test_unchanged_incidents_are_not_recorded(outbox, incident):
+    incident.save()
+    assert not OutboxEntry.objects.exists()
+
+    incident.impact = "Changed"
+    incident.save()
+    entry = OutboxEntry.objects.get()
+    assert (entry.model, entry.object_id) == (OutboxEntry.INCIDENT, incident.pk)
+
+
+@pytest.mark.django_db
+def test_events_are_timestamped_when_they_were_saved(outbox, incident):
+    for i in range(2):
+        incident.summary = f"Summary {i}"
+        incident.save()
+        Action.objects.create(
+            incident=incident, user=incident.reporter, details=f"Action {i}"
+        )
+    saved_at = list(OutboxEntry.objects.order_by("pk").values_list("created_at"))
+    Event.objects.all().delete()
+
+    drain_event_outbox()
+    assert list(Event.objects.order_by("pk").values_list("timestamp")) == saved_at
+
+
+@pytest.mark.django_db
+def test_events_record_each_save_as_it_was(outbox, incident):
+    incident.severity = "3"
+    incident.lead = None
+    incident.save()
+    action = Action.objects.create(
+        incident=incident, user=incident.reporter, details="Before"
+    )
+    incident.severity = "1"
+    incident.lead = ExternalUserFactory.create()
+    incident.save()
+    action.details = "After"
+    action.save()
+    Event.objects.all().delete()
+
+    # drained one at a time, after all the saves
+    assert drain_event_outbox(batch_size=1) == 4
+
+    first, before, second, after = [payload for _, payload in events()]
+    assert (first["severity"], first["lead"]) == ("3", None)
+    assert before["details"] == "Before"
+    assert second["severity"] == "1"
+    assert second["lead"]["external_id"] == incident.lead.external_id
+    assert second["comms_channel"] == first["comms_channel"]
+    assert after["details"] == "After"
+
+
+@pytest.mark.django_db
+def test_claimed_entries_are_only_drained_once(outbox, incident):
+    incident.summary = "Changed"
+    incident.save()
+    Event.objects.all().delete()
+
+    claimed = OutboxEntry.objects.claim("other-worker", 10)
+    assert len(claimed) == 1
+    assert drain_event_outbox() == 0
+    assert not Event.objects.exists()
+
+    # the other worker died, and its claim has expired
+    OutboxEntry.objects.update(claimed_until=datetime.now() - timedelta(seconds=1))
+    assert drain_event_outbox() == 1
+    assert Event.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_feed_waits_for_the_outbox(outbox, incident):
+    incident.summary = "Changed"
+    incident.save()
+    Event.objects.all().delete()
+    saved_later = EventFactory.create(timestamp=datetime.now())
+    later = datetime.now() + timedelta(minutes=1)
+    assert not Event.objects.feed(now=later).exists()
+
+    drain_event_outbox()
+    feed = Event.objects.feed(now=later)
+    assert [e.event_type for e in feed] == [
+        Event.INCIDENT_EVENT_TYPE,
+        saved_later.event_type,
+    ]
+    assert feed.last() == saved_later
+
+
+@pytest.mark.django_db
+def test_private_incidents_are_not_recorded(outbox, incident):
+    Action.objects.create(incident=incident, user=incident.reporter, details="Before")
+    incident.private = True
+    incident.save()
+    Action.objects.create(incident=incident, user=incident.reporter, details="After")
+    Event.objects.all().delete()
+
+    assert drain_event_outbox() == 2
+    assert not Event.objects.exists()
+
+
+@pytest.mark.django_db
+def test_deleted_objects_are_skipped(outbox, incident):
+    action = Action.objects.create(
+        incident=incident, user=incident.reporter, details="Deleted"
+    )
+    action.delete()
+
+    assert drain_event_outbox() == 1
+    assert not Event.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_outbox_is_drained_after_commit(outbox, settings):
+    settings.RESPONSE_EVENT_OUTBOX_DRAIN_DELAY_SECONDS = 0.05
+    with transaction.atomic():
+        incident = IncidentFactory.create(end_time=None, private=False)
+        incident.summary = "Changed"
+        incident.save()
+        Action.objects.create(
+            incident=incident, user=incident.reporter, details="Action"
+        )
+
+    deadline = time.monotonic() + 5
+    while OutboxEntry.objects.exists() and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    assert [event_type for event_type, _ in events()] == [
+        Event.INCIDENT_EVENT_TYPE,
+        Event.ACTION_EVENT_TYPE,
+    ]
+
+
+def save_queries(incident, saves):
+    with CaptureQueriesContext(connection) as queries:
+        for i in range(saves):
+            incident.summary = f"Summary {i}"
+            incident.save()
+    return len(queries)
+
+
+@pytest.mark.django_db
+def test_outbox_drains_in_a_fixed_number_of_queries(
+    incident, settings, django_assert_max_num_queries
+):
+    "Saves cost no extra queries, and draining doesn't query per entry"
+    settings.RESPONSE_EVENT_OUTBOX_DRAIN_DELAY_SECONDS = None
+    incident.lead = ExternalUserFactory.create()
+    incident.save()
+    saves = 50
+    recorded = Event.objects.count()
+
+    synchronous = save_queries(incident, saves)
+
+    with outbox_handlers():
+        assert save_queries(incident, saves) <= synchronous
+        with django_assert_max_num_queries(8):
+            assert drain_event_outbox() == saves
+
+    assert Event.objects.count() == recorded + saves * 2
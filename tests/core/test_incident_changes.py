@@ -0,0 +1,135 @@
+from datetime import datetime
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from response.core.models import Incident, TimelineEvent
+from tests.factories import ExternalUserFactory, IncidentFactory
+
+
+@pytest.fixture
+def incident():
+    incident = IncidentFactory.create(end_time=None, summary="Before")
+    return Incident.objects.get(pk=incident.pk)
+
+
+def incident_queries(queries):
+    return [q["sql"] for q in queries if 'FROM "response_incident"' in q["sql"]]
+
+
+@pytest.mark.django_db
+def test_new_incidents_have_no_changes():
+    assert Incident(report="new").changed_fields() is None
+    assert Incident(pk=1234, report="new").changed_fields() is None
+
+
+@pytest.mark.django_db
+def test_changed_fields(incident):
+    assert incident.changed_fields() == {}
+
+    incident.summary = "After"
+    assert incident.changed_fields() == {"summary": ("Before", "After")}
+
+    incident.summary = "Before"
+    assert incident.changed_fields() == {}
+
+
+@pytest.mark.django_db
+def test_foreign_keys_are_compared_by_id(incident, django_assert_num_queries):
+    new_lead = ExternalUserFactory.create()
+    same_lead = type(incident.lead).objects.get(pk=incident.lead_id)
+    old_lead_id = incident.lead_id
+
+    with django_assert_num_queries(0):
+        incident.lead = same_lead
+        assert incident.changed_fields() == {}
+
+        incident.lead = new_lead
+        assert incident.changed_fields() == {"lead": (old_lead_id, new_lead.pk)}
+
+
+@pytest.mark.django_db
+def test_saving_resets_changes(incident):
+    incident.summary = "After"
+    incident.save()
+
+    assert incident.changed_fields() == {}
+    assert incident.previous_state().summary == "After"
+
+
+@pytest.mark.django_db
+def test_saving_some_fields_only_resets_those(incident):
+    incident.summary = "After"
+    incident.impact = "Lots"
+    incident.save(update_fields=["summary"])
+
+    assert set(incident.changed_fields()) == {"impact"}
+
+
+@pytest.mark.django_db
+def test_refresh_from_db_resets_changes(incident):
+    Incident.objects.filter(pk=incident.pk).update(summary="Changed elsewhere")
+
+    incident.refresh_from_db()
+
+    assert incident.changed_fields() == {}
+
+
+@pytest.mark.django_db
+def test_incidents_not_loaded_from_the_db_are_fetched_once(incident):
+    unloaded = Incident(
+        **{
+            f.attname: getattr(incident, f.attname)
+            for f in Incident._meta.concrete_fields
+        }
+    )
+    unloaded.summary = "After"
+
+    with CaptureQueriesContext(connection) as queries:
+        assert unloaded.changed_fields() == {"summary": ("Before", "After")}
+        assert unloaded.changed_fields() == {"summary": ("Before", "After")}
+
+    assert len(incident_queries(queries.captured_queries)) == 1
+
+
+@pytest.mark.django_db
+def test_saving_doesnt_refetch_the_incident(incident):
+    incident.summary = "After"
+    incident.lead = ExternalUserFactory.create()
+
+    with CaptureQueriesContext(connection) as queries:
+        incident.save()
+
+    assert [
+        q for q in incident_queries(queries.captured_queries) if "SELECT" in q
+    ] == []
+
+
+@pytest.mark.django_db
+def test_timeline_events_are_added_for_changes(incident):
+    existing = list(TimelineEvent.objects.values_list("pk", flat=True))
+    old_lead = incident.lead
+    new_lead = ExternalUserFactory.create()
+    incident.lead = new_lead
+    incident.summary = "After"
+    incident.save()
+
+    texts = set(
+        TimelineEvent.objects.filter(incident=incident)
+        .exclude(pk__in=existing)
+        .values_list("text", flat=True)
+    )
+    assert texts == {
+        f"Incident lead changed from {old_lead.display_name} to {new_lead.display_name}",
+        'Incident summary updated from "Before" to "After"',
+    }
+
+
+@pytest.mark.django_db
+def test_closing_prompts_for_a_report_once(incident, mock_slack):
+    incident.end_time = datetime.now()
+    incident.save()
+    incident.save()
+
+    assert mock_slack.send_message.call_count == 1
@@ -0,0 +1,282 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+import pytest
+
+from response.core.jobs import Worker, background_job, run_job
+from response.core.models import Job
+
+calls = []
+
+
+@background_job
+def record_call(*args, **kwargs):
+    calls.append((args, kwargs))
+
+
+@background_job(name="tests.always_fails", max_attempts=2)
+def always_fails():
+    raise ValueError("nope")
+
+
+@background_job
+def blocks():
+    blocks.release.wait(timeout=5)
+
+
+blocks.release = threading.Event()
+
+
+@background_job(shard=lambda shard, n: shard)
+def sharded(shard, n):
+    calls.append((shard, n))
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    calls.clear()
+
+
+@pytest.fixture
+def job_queue(settings):
+    settings.RESPONSE_USE_JOB_QUEUE = True
+
+
+def test_enqueue_runs_after_response_without_job_queue(settings):
+    settings.RESPONSE_USE_JOB_QUEUE = False
+
+    with mock.patch.object(record_call, "after_response") as after_response:
+        assert record_call.enqueue("a", b=1) is None
+
+    after_response.assert_called_once_with("a", b=1)
+
+
+@pytest.mark.django_db
+def test_enqueue_stores_job(job_queue):
+    job = record_call.enqueue("a", b=1)
+
+    job.refresh_from_db()
+    assert job.name == "tests.core.test_jobs.record_call"
+    assert job.args == ["a"]
+    assert job.kwargs == {"b": 1}
+    assert job.status == Job.PENDING
+    assert calls == []
+
+
+@pytest.mark.django_db
+def test_run_job_records_success(job_queue):
+    record_call.enqueue("a")
+    (job,) = Job.objects.claim("test-worker")
+
+    run_job(job)
+
+    job.refresh_from_db()
+    assert calls == [(("a",), {})]
+    assert job.status == Job.SUCCEEDED
+    assert job.attempts == 1
+    assert job.worker == "test-worker"
+    assert job.duration_ms is not None
+
+
+@pytest.mark.django_db
+def test_failed_job_is_retried_with_backoff(job_queue, settings):
+    settings.RESPONSE_JOB_RETRY_BASE_SECONDS = 60
+    always_fails.enqueue()
+
+    (job,) = Job.objects.claim("test-worker")
+    run_job(job)
+    job.refresh_from_db()
+    assert job.status == Job.PENDING
+    assert "ValueError: nope" in job.last_error
+    assert job.run_at > datetime.now() + timedelta(seconds=50)
+
+    # not due yet
+    assert Job.objects.claim("test-worker") == []
+
+    Job.objects.filter(pk=job.pk).update(run_at=datetime.now())
+    (job,) = Job.objects.claim("test-worker")
+    run_job(job)
+    job.refresh_from_db()
+    assert job.status == Job.FAILED
+    assert job.attempts == 2
+
+
+@pytest.mark.django_db
+def test_job_is_only_claimed_once(job_queue):
+    record_call.enqueue()
+
+    assert len(Job.objects.claim("worker-1")) == 1
+    assert Job.objects.claim("worker-2") == []
+
+
+@pytest.mark.django_db
+def test_jobs_in_a_shard_run_in_order(job_queue, settings):
+    settings.RESPONSE_JOB_RETRY_BASE_SECONDS = 60
+    for shard, n in (("a", 1), ("a", 2), ("b", 1), (None, 1), ("a", 3)):
+        sharded.enqueue(shard, n)
+
+    def claim():
+        return [tuple(job.args) for job in Job.objects.claim("worker", limit=5)]
+
+    first = claim()
+    assert first == [("a", 1), ("b", 1), (None, 1)]
+    # nothing else can run while ("a", 1) is running
+    assert claim() == []
+
+    # or while it's waiting to be retried
+    a1 = Job.objects.get(args=["a", 1])
+    with mock.patch.dict("response.core.jobs.JOB_HANDLERS", {a1.name: always_fails}):
+        run_job(a1)
+    assert Job.objects.get(pk=a1.pk).status == Job.PENDING
+    assert claim() == []
+
+    Job.objects.filter(pk=a1.pk).update(run_at=datetime.now())
+    assert claim() == [("a", 1)]
+    run_job(Job.objects.get(pk=a1.pk))
+    assert claim() == [("a", 2)]
+
+
+@pytest.mark.django_db
+def test_stuck_job_is_reclaimed(job_queue, settings):
+    settings.RESPONSE_JOB_TIMEOUT_SECONDS = 60
+    record_call.enqueue()
+    Job.objects.claim("worker-1")
+
+    assert Job.objects.claim("worker-2") == []
+
+    # worker-1 stopped renewing its claim
+    Job.objects.update(claimed_until=datetime.now() - timedelta(seconds=1))
+    (job,) = Job.objects.claim("worker-2")
+    assert job.worker == "worker-2"
+    assert job.attempts == 2
+
+
+@pytest.mark.django_db
+def test_heartbeat_keeps_running_jobs_claimed(job_queue, settings):
+    settings.RESPONSE_JOB_TIMEOUT_SECONDS = 60
+    record_call.enqueue()
+    (job,) = Job.objects.claim("worker-1")
+
+    # running for longer than the timeout, but still renewing its claim
+    Job.objects.update(started_at=datetime.now() - timedelta(seconds=120))
+    assert Job.objects.heartbeat({job.claimed_by}) == 1
+    assert Job.objects.claim("worker-2") == []
+
+
+@pytest.mark.django_db
+def test_outcome_is_only_recorded_by_the_worker_holding_the_claim(job_queue):
+    record_call.enqueue()
+    (first,) = Job.objects.claim("worker-1")
+    Job.objects.update(claimed_until=datetime.now() - timedelta(seconds=1))
+    (second,) = Job.objects.claim("worker-2")
+
+    always_fails_instead = mock.patch.dict(
+        "response.core.jobs.JOB_HANDLERS", {first.name: always_fails}
+    )
+    run_job(second)
+    with always_fails_instead:
+        run_job(first)
+
+    job = Job.objects.get()
+    assert job.status == Job.SUCCEEDED
+    assert job.worker == "worker-2"
+    assert job.last_error is None
+
+
+@pytest.mark.django_db
+def test_stuck_job_fails_after_max_attempts(job_queue, settings):
+    settings.RESPONSE_JOB_TIMEOUT_SECONDS = 60
+    always_fails.enqueue()
+
+    expired = datetime.now() - timedelta(seconds=1)
+    for worker in ("worker-1", "worker-2"):
+        assert len(Job.objects.claim(worker)) == 1
+        Job.objects.update(claimed_until=expired)
+
+    # it's been claimed max_attempts times, and its worker died again
+    assert Job.objects.claim("worker-3") == []
+
+    job = Job.objects.get()
+    assert job.status == Job.FAILED
+    assert job.attempts == 2
+    assert "Timed out" in job.last_error
+
+
+@pytest.mark.django_db(transaction=True)
+def test_worker_runs_jobs_concurrently(job_queue):
+    for i in range(10):
+        record_call.enqueue(i)
+
+    Worker(concurrency=4, poll_interval=0).run(burst=True)
+
+    assert sorted(args[0] for args, _ in calls) == list(range(10))
+    assert Job.objects.filter(status=Job.SUCCEEDED).count() == 10
+
+
+@pytest.mark.django_db(transaction=True)
+def test_worker_keeps_idle_threads_busy(job_queue):
+    blocks.release.clear()
+    blocks.enqueue()
+    for i in range(5):
+        record_call.enqueue(i)
+
+    worker = Worker(concurrency=2, poll_interval=0)
+    thread = threading.Thread(target=worker.run, kwargs={"burst": True})
+    thread.start()
+    try:
+        # the other thread runs every quick job while the slow one is running
+        deadline = time.monotonic() + 5
+        while len(calls) < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(calls) == 5
+        assert Job.objects.get(name=blocks.job_name).status == Job.RUNNING
+    finally:
+        blocks.release.set()
+        thread.join(timeout=5)
+
+    assert Job.objects.filter(status=Job.SUCCEEDED).count() == 6
+
+
+@pytest.mark.django_db
+def test_old_finished_jobs_are_pruned(job_queue, settings):
+    settings.RESPONSE_JOB_RETENTION_DAYS = 7
+    old = datetime.now() - timedelta(days=8)
+
+    def job(status, finished_at):
+        job = record_call.enqueue()
+        Job.objects.filter(pk=job.pk).update(status=status, finished_at=finished_at)
+        return job.pk
+
+    job(Job.SUCCEEDED, old)
+    job(Job.FAILED, old)
+    kept = {job(Job.PENDING, old), job(Job.SUCCEEDED, datetime.now())}
+
+    assert Job.objects.prune() == 2
+    assert set(Job.objects.values_list("pk", flat=True)) == kept
+
+    settings.RESPONSE_JOB_RETENTION_DAYS = None
+    Job.objects.update(status=Job.SUCCEEDED, finished_at=old)
+    assert Job.objects.prune() == 0
+
+
+@pytest.mark.django_db
+def test_action_view_enqueues_job(job_queue, post_from_slack_api):
+    payload = {
+        "type": "dialog_submission",
+        "callback_id": "incident-report-dialog",
+        "user": {"id": "U123"},
+        "channel": {"id": "C123"},
+        "response_url": "https://fake-response-url",
+        "submission": {},
+        "state": "foo",
+    }
+
+    r = post_from_slack_api("action", {"payload": json.dumps(payload)})
+
+    assert r.status_code == 200
+    job = Job.objects.get()
+    assert job.name == "response.slack.decorators.dialog_handler.handle_dialog"
+    assert job.args == [payload]
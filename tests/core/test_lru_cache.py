@@ -0,0 +1,99 @@
+import time
+
+from django.core.cache import caches
+
+from response.core.util import LRUCache
+
+
+def test_lru_cache_get_and_set():
+    cache = LRUCache(maxsize=10, ttl_seconds=60)
+
+    assert cache.get("a") is LRUCache.MISSING
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1, "maxsize": 10}
+
+
+def test_lru_cache_caches_none():
+    cache = LRUCache(maxsize=10, ttl_seconds=60)
+
+    cache.set("a", None)
+    assert cache.get("a") is None
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2, ttl_seconds=60)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is LRUCache.MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["size"] == 2
+
+
+def test_lru_cache_expires_entries():
+    cache = LRUCache(maxsize=10, ttl_seconds=0.05)
+
+    cache.set("a", 1)
+    time.sleep(0.1)
+
+    assert cache.get("a") is LRUCache.MISSING
+    assert cache.stats()["size"] == 0
+
+
+def test_lru_cache_ttl_per_entry():
+    cache = LRUCache(maxsize=10, ttl_seconds=60)
+
+    cache.set("a", 1, ttl_seconds=0.05)
+    cache.set("b", 2)
+    time.sleep(0.1)
+
+    assert cache.get("a") is LRUCache.MISSING
+    assert cache.get("b") == 2
+
+
+def test_lru_cache_delete():
+    cache = LRUCache(maxsize=10, ttl_seconds=60)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.delete_many(["a", "b", "c"])
+
+    assert cache.get("a") is LRUCache.MISSING
+    assert cache.get("b") is LRUCache.MISSING
+
+
+def test_lru_cache_add():
+    cache = LRUCache(maxsize=10, ttl_seconds=60)
+
+    assert cache.add("a")
+    assert not cache.add("a")
+    assert cache.get("a") is True
+
+
+def test_lru_cache_add_shared_between_processes():
+    caches["default"].clear()
+    cache = LRUCache(ttl_seconds=60, cache_alias="default", key_prefix="test:")
+    other_process = LRUCache(ttl_seconds=60, cache_alias="default", key_prefix="test:")
+
+    assert cache.add("a")
+    assert not other_process.add("a")
+
+
+def test_lru_cache_shared_between_processes():
+    caches["default"].clear()
+    cache = LRUCache(ttl_seconds=60, cache_alias="default", key_prefix="test:")
+    other_process = LRUCache(ttl_seconds=60, cache_alias="default", key_prefix="test:")
+
+    cache.set("a", {"name": "spengler"})
+    assert other_process.get("a") == {"name": "spengler"}
+    assert other_process.stats()["hits"] == 1
+
+    other_process.delete("a")
+    cache.clear()
+    assert cache.get("a") is LRUCache.MISSING
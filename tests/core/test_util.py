@@ -0,0 +1,60 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from response.core.models import OutboxEntry
+from response.core.util import Debouncer, claim_rows
+
+
+@pytest.mark.django_db
+def test_claim_rows_only_claims_each_row_once():
+    entries = [
+        OutboxEntry.objects.create(model=OutboxEntry.ACTION, object_id=i, incident_id=1)
+        for i in range(3)
+    ]
+    rows = OutboxEntry.objects.order_by("pk")
+    lease = timedelta(minutes=5)
+
+    first = claim_rows(rows, "worker-1", lease, limit=2)
+    assert set(rows.filter(claimed_by=first)) == set(entries[:2])
+
+    second = claim_rows(rows, "worker-2", lease)
+    assert set(rows.filter(claimed_by=second)) == {entries[2]}
+    assert claim_rows(rows, "worker-3", lease) is None
+
+    # once the lease runs out, the rows can be claimed again
+    later = datetime.now() + lease * 2
+    third = claim_rows(rows, "worker-3", lease, now=later)
+    assert rows.filter(claimed_by=third).count() == 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_debouncer_coalesces_requests():
+    calls = []
+    called = threading.Event()
+
+    def func(key):
+        calls.append(key)
+        called.set()
+
+    debouncer = Debouncer(func, lambda: 0.05)
+    for _ in range(3):
+        debouncer.request("a")
+    debouncer.request("b")
+    assert debouncer.pending() == {"a", "b"}
+
+    assert debouncer.cancel("b")
+    assert called.wait(timeout=5)
+    assert calls == ["a"]
+    assert debouncer.pending() == set()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_debouncer_flush():
+    calls = []
+    debouncer = Debouncer(calls.append, lambda: 60)
+    debouncer.request("a")
+    debouncer.flush()
+    assert calls == ["a"]
+    assert debouncer.pending() == set()
@@ -0,0 +1,72 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class MockSlackServer:
+    """
+    A minimal local stand-in for the Slack Web API (in the spirit of
+    SLACK_API_MOCK), used to exercise the real HTTP transports in tests.
+
+    `responses` maps an API method (e.g. "chat.postMessage") to either a dict
+    to return as JSON, or a callable taking the parsed form data and returning
+    a dict, or a (dict, headers) tuple. Unknown methods return {"ok": True}.
+    """
+
+    def __init__(self, responses=None):
+        self.responses = responses or {}
+        self.calls = []
+        self.connections = 0
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_POST(self):
+                method = self.path.rsplit("/", 1)[-1]
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode()
+                data = {k: v[0] for k, v in parse_qs(body).items()}
+                with server._lock:
+                    server.calls.append((method, data))
+
+                response = server.responses.get(method, {"ok": True})
+                if callable(response):
+                    response = response(data)
+                headers = {}
+                if isinstance(response, tuple):
+                    response, headers = response
+
+                payload = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/api/"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,191 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from response.slack.client import SlackError
+from tests.slack.mock_slack_server import MockSlackServer
+
+pytest.importorskip("aiohttp")
+
+from response.slack.async_client import (  # noqa: E402 isort:skip
+    AsyncSlackClient,
+    encode_post_data,
+    gather_with_concurrency,
+)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_encode_post_data():
+    assert encode_post_data(
+        {
+            "users": ["U1", "U2"],
+            "blocks": [{"type": "divider"}],
+            "exclude_archived": True,
+            "limit": 200,
+            "ts": None,
+        }
+    ) == {
+        "users": "U1,U2",
+        "blocks": '[{"type": "divider"}]',
+        "exclude_archived": "true",
+        "limit": "200",
+    }
+
+
+def test_send_message():
+    with MockSlackServer({"chat.postMessage": {"ok": True, "ts": "123"}}) as server:
+
+        async def _test():
+            async with AsyncSlackClient("test-token", base_url=server.url) as c:
+                return await c.send_message("C123", "hello")
+
+        assert run(_test()) == {"ok": True, "ts": "123"}
+        assert server.calls == [
+            ("chat.postMessage", {"channel": "C123", "text": "hello"})
+        ]
+
+
+def test_slack_error():
+    not_found = {"ok": False, "error": "channel_not_found"}
+    with MockSlackServer(
+        {"conversations.info": not_found, "conversations.join": not_found}
+    ) as server:
+
+        async def _test():
+            async with AsyncSlackClient("test-token", base_url=server.url) as c:
+                assert await c.get_channel_name("C123") is None
+                with pytest.raises(SlackError) as e:
+                    await c.join_channel("C123")
+                return e.value
+
+        assert run(_test()).slack_error == "channel_not_found"
+
+
+def paged(key, pages):
+    "Serves each page of a paginated list method in turn, by cursor"
+
+    def respond(data):
+        page = int(data.get("cursor") or 0)
+        next_cursor = str(page + 1) if page + 1 < len(pages) else ""
+        return {
+            "ok": True,
+            key: pages[page],
+            "response_metadata": {"next_cursor": next_cursor},
+        }
+
+    return respond
+
+
+def test_get_user_id_stops_paging_once_found():
+    pages = [
+        [{"id": "U1", "name": "alice"}],
+        [{"id": "U2", "name": "bob"}],
+        [{"id": "U3", "name": "carol"}],
+    ]
+    with MockSlackServer({"users.list": paged("members", pages)}) as server:
+
+        async def _test():
+            async with AsyncSlackClient("test-token", base_url=server.url) as c:
+                assert await c.get_user_id("bob") == "U2"
+                with pytest.raises(SlackError):
+                    await c.find_user("dave")
+
+        run(_test())
+        assert [data.get("cursor") for _, data in server.calls] == [
+            None,
+            "1",
+            None,
+            "1",
+            "2",
+        ]
+
+
+def test_get_channel_id_stops_paging_once_found():
+    pages = [
+        [{"id": "C1", "name": "general", "is_archived": False}],
+        [{"id": "C2", "name": "incidents", "is_archived": False}],
+        [{"id": "C3", "name": "random", "is_archived": False}],
+    ]
+    with MockSlackServer({"conversations.list": paged("channels", pages)}) as server:
+
+        async def _test():
+            async with AsyncSlackClient("test-token", base_url=server.url) as c:
+                return await c.get_channel_id("incidents")
+
+        assert run(_test()) == "C2"
+        assert len(server.calls) == 2
+
+
+def test_retries_after_rate_limit():
+    responses = iter(
+        [({"ok": False, "error": "ratelimited"}, {"Retry-After": "0"}), {"ok": True}]
+    )
+    with MockSlackServer({"reactions.add": lambda data: next(responses)}) as server:
+
+        async def _test():
+            async with AsyncSlackClient(
+                "test-token", base_url=server.url, retry_base_backoff_seconds=0.001
+            ) as c:
+                return await c.add_reaction("fire", "C123", "1234.5")
+
+        assert run(_test()) == {"ok": True}
+        assert len(server.calls) == 2
+
+
+def test_concurrent_calls_share_bounded_pool():
+    in_flight = []
+    max_in_flight = []
+    lock = threading.Lock()
+
+    def slow_invite(data):
+        with lock:
+            in_flight.append(data["users"])
+            max_in_flight.append(len(in_flight))
+        time.sleep(0.1)
+        with lock:
+            in_flight.remove(data["users"])
+        return {"ok": True}
+
+    with MockSlackServer({"conversations.invite": slow_invite}) as server:
+
+        async def _test():
+            async with AsyncSlackClient(
+                "test-token", base_url=server.url, connection_pool_size=5
+            ) as c:
+                return await gather_with_concurrency(
+                    [c.invite_user_to_channel(f"U{i}", "C123") for i in range(20)],
+                    concurrency=5,
+                )
+
+        start = time.monotonic()
+        results = run(_test())
+        elapsed = time.monotonic() - start
+
+        assert results == [{"ok": True}] * 20
+        assert max(max_in_flight) == 5
+        assert server.connections <= 5
+        # 20 calls at 0.1s each, 5 at a time, rather than 2s serially
+        assert elapsed < 1.5
+
+
+def test_gather_with_concurrency_preserves_order_and_exceptions():
+    async def _job(i):
+        await asyncio.sleep(0.01 * (5 - i))
+        if i == 2:
+            raise ValueError(i)
+        return i
+
+    results = run(
+        gather_with_concurrency(
+            [_job(i) for i in range(5)], concurrency=2, return_exceptions=True
+        )
+    )
+
+    assert results[:2] == [0, 1]
+    assert isinstance(results[2], ValueError)
+    assert results[3:] == [3, 4]
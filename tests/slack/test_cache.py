@@ -1,11 +1,19 @@
+from unittest import mock
+
 import pytest
+from django.apps import apps
 
 from response.core.models import ExternalUser
 from response.slack.cache import (
+    get_bot_id,
+    get_user_id,
     get_user_profile,
     get_user_profile_by_email,
+    get_user_profiles,
     update_user_cache,
+    user_profile_cache,
 )
+from response.slack.client import SlackError
 from tests.slack.slack_payloads import (
     users_list_new,
     users_list_page_1,
@@ -80,6 +88,57 @@ def test_update_cache_pagination(mock_slack):
     assert users == ["spengler", "Glinda the Fairly Good"]
 
 
+@pytest.mark.django_db
+def test_update_cache_reports_changes(mock_slack):
+    mock_slack.get_paginated_users.return_value = users_list_response
+
+    stats = update_user_cache()
+    assert stats["inserted"] == 2
+    assert stats["updated"] == 0
+    assert stats["unchanged"] == 0
+    assert stats["seconds"] >= 0
+
+    ExternalUser.objects.filter(external_id="U12345678").update(full_name="Glinda")
+
+    stats = update_user_cache()
+    assert stats["inserted"] == 0
+    assert stats["updated"] == 1
+    assert stats["unchanged"] == 1
+    assert (
+        ExternalUser.objects.get(external_id="U12345678").full_name
+        == "Glinda Southgood"
+    )
+
+
+@pytest.mark.django_db
+def test_update_cache_queries_per_page(mock_slack, django_assert_max_num_queries):
+    members = [
+        {
+            "id": f"U{i:06d}",
+            "name": f"user{i}",
+            "profile": {"display_name_normalized": "", "real_name": ""},
+            "deleted": False,
+            "is_bot": False,
+        }
+        for i in range(200)
+    ]
+    mock_slack.get_paginated_users.return_value = {
+        "ok": True,
+        "members": members,
+        "response_metadata": {"next_cursor": ""},
+    }
+
+    with django_assert_max_num_queries(5):
+        stats = update_user_cache()
+    assert stats["inserted"] == 200
+
+    members[0]["deleted"] = True
+    with django_assert_max_num_queries(5):
+        stats = update_user_cache()
+    assert stats["updated"] == 1
+    assert stats["unchanged"] == 199
+
+
 @pytest.mark.django_db
 def test_get_user_profile_not_in_cache(mock_slack):
     mock_slack.get_user_profile.return_value = {
@@ -196,3 +255,176 @@ def test_get_user_profile_by_email_in_cache(mock_slack):
 
     # check cache is unchanged
     assert len(ExternalUser.objects.all()) == 1
+
+
+@pytest.mark.django_db
+def test_get_user_id_from_db(mock_slack):
+    ExternalUser.objects.create(
+        app_id="slack", external_id="U123", display_name="Opsy", username="opsy"
+    )
+
+    assert get_user_id("opsy") == "U123"
+    mock_slack.find_user.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_get_user_id_matches_usernames_not_display_names(mock_slack):
+    # someone whose display name is another user's username
+    ExternalUser.objects.create(
+        app_id="slack", external_id="U999", display_name="glinda", username="imposter"
+    )
+    mock_slack.find_user.return_value = users_list_response["members"][1]
+
+    assert get_user_id("glinda") == "U12345678"
+    mock_slack.find_user.assert_called_once_with("glinda")
+
+
+@pytest.mark.django_db
+def test_get_user_id_from_slack_is_cached(mock_slack):
+    mock_slack.find_user.return_value = users_list_response["members"][1]
+
+    assert get_user_id("glinda") == "U12345678"
+    user = ExternalUser.objects.get(external_id="U12345678")
+    assert user.username == "glinda"
+    assert user.display_name == "Glinda the Fairly Good"
+
+    mock_slack.find_user.reset_mock()
+    assert get_user_id("glinda") == "U12345678"
+    mock_slack.find_user.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_update_cache_stores_usernames(mock_slack):
+    mock_slack.get_paginated_users.return_value = users_list_response
+    update_user_cache()
+
+    assert get_user_id("glinda") == "U12345678"
+    mock_slack.find_user.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_get_user_profile_served_from_memory(mock_slack, django_assert_num_queries):
+    ExternalUser.objects.create(
+        app_id="slack", external_id="U12345678", display_name="spengler"
+    )
+
+    with django_assert_num_queries(1):
+        get_user_profile("U12345678")
+        user = get_user_profile("U12345678")
+
+    assert user["name"] == "spengler"
+    assert user_profile_cache.stats()["hits"] == 1
+    assert user_profile_cache.stats()["misses"] == 1
+
+
+@pytest.mark.django_db
+def test_saving_user_invalidates_cached_profile(mock_slack):
+    user = ExternalUser.objects.create(
+        app_id="slack", external_id="U12345678", display_name="spengler"
+    )
+    assert get_user_profile("U12345678")["name"] == "spengler"
+
+    user.display_name = "egon"
+    user.save()
+    assert get_user_profile("U12345678")["name"] == "egon"
+
+    user.delete()
+    mock_slack.get_user_profile.return_value = {
+        "id": "U12345678",
+        "name": "deleted",
+        "fullname": "",
+        "email": None,
+        "deleted": True,
+    }
+    assert get_user_profile("U12345678")["name"] == "deleted"
+
+
+@pytest.mark.django_db
+def test_update_cache_invalidates_cached_profile(mock_slack):
+    mock_slack.get_paginated_users.return_value = users_list_response
+    update_user_cache()
+    assert get_user_profile("U12345678")["fullname"] == "Glinda Southgood"
+
+    ExternalUser.objects.filter(external_id="U12345678").update(full_name="Glinda")
+    user_profile_cache.clear()
+    assert get_user_profile("U12345678")["fullname"] == "Glinda"
+
+    update_user_cache()
+    assert get_user_profile("U12345678")["fullname"] == "Glinda Southgood"
+
+
+@pytest.mark.django_db
+def test_get_user_profiles_in_batch(mock_slack, django_assert_num_queries):
+    ExternalUser.objects.create(
+        app_id="slack", external_id="U00000001", display_name="in-memory"
+    )
+    ExternalUser.objects.create(
+        app_id="slack", external_id="U00000002", display_name="in-db"
+    )
+    get_user_profile("U00000001")
+
+    def get_from_slack(user_id):
+        if user_id == "U00000004":
+            raise SlackError("user_not_found")
+        return {
+            "id": user_id,
+            "name": f"from-slack-{user_id}",
+            "fullname": "",
+            "email": None,
+            "deleted": False,
+        }
+
+    mock_slack.get_user_profile.side_effect = get_from_slack
+
+    # one lookup for the batch, then one lookup and one insert to store the
+    # users fetched from Slack
+    with django_assert_num_queries(3):
+        profiles = get_user_profiles(
+            ["U00000001", "U00000002", "U00000003", "U00000004", None]
+        )
+
+    assert {k: v["name"] for k, v in profiles.items()} == {
+        "U00000001": "in-memory",
+        "U00000002": "in-db",
+        "U00000003": "from-slack-U00000003",
+    }
+    assert mock_slack.get_user_profile.call_count == 2
+
+    # users fetched from Slack are now in the DB cache
+    assert ExternalUser.objects.get(external_id="U00000003").display_name == (
+        "from-slack-U00000003"
+    )
+
+
+def test_bot_id_from_settings(mock_slack, settings):
+    settings.INCIDENT_BOT_ID = "UBOT"
+
+    assert get_bot_id() == "UBOT"
+    mock_slack.find_user.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_bot_id_not_looked_up_at_startup(mock_slack, settings):
+    settings.INCIDENT_BOT_ID = None
+
+    with mock.patch("response.slack.cache.get_user_id") as get_user_id:
+        apps.get_app_config("response").ready()
+
+    get_user_id.assert_not_called()
+    assert settings.INCIDENT_BOT_ID is None
+
+
+@pytest.mark.django_db
+def test_bot_id_looked_up_from_cache_on_first_use(mock_slack, settings):
+    settings.INCIDENT_BOT_ID = None
+    ExternalUser.objects.create(
+        app_id="slack",
+        external_id="UBOT",
+        display_name="Incident Bot",
+        username=settings.INCIDENT_BOT_NAME,
+    )
+
+    assert get_bot_id() == "UBOT"
+    ExternalUser.objects.all().delete()
+    assert get_bot_id() == "UBOT"
+    mock_slack.find_user.assert_not_called()
@@ -0,0 +1,76 @@
+import pytest
+
+from response.slack.decorators.event_handler import EVENT_MAPPINGS, handle_event
+from response.slack.models import CommsChannel
+from tests.factories import IncidentFactory
+
+EVENT_TYPE = "test_routing_event"
+
+
+@pytest.fixture
+def incident():
+    incident = IncidentFactory.create()
+    comms_channel = CommsChannel.objects.get(incident=incident)
+    comms_channel.channel_id = "C1"
+    comms_channel.save()
+    return incident
+
+
+@pytest.fixture
+def routed_incidents():
+    routed = []
+    EVENT_MAPPINGS[EVENT_TYPE].append(lambda incident, event: routed.append(incident))
+    yield routed
+    EVENT_MAPPINGS.pop(EVENT_TYPE)
+
+
+def event_in(channel_id):
+    return {"event": {"type": EVENT_TYPE, "channel": channel_id}}
+
+
+@pytest.mark.django_db
+def test_routing_events_is_cached(
+    incident, routed_incidents, django_assert_num_queries
+):
+    with django_assert_num_queries(1):
+        handle_event(event_in("C1"))
+    with django_assert_num_queries(0):
+        handle_event(event_in("C1"))
+
+    assert len(routed_incidents) == 2
+    # the incident is loaded when the handler uses it
+    with django_assert_num_queries(1):
+        assert routed_incidents[0].pk == incident.pk
+        assert routed_incidents[0].report == incident.report
+
+
+@pytest.mark.django_db
+def test_channels_without_incidents_are_cached(
+    routed_incidents, django_assert_num_queries
+):
+    with django_assert_num_queries(1):
+        handle_event(event_in("C404"))
+    with django_assert_num_queries(0):
+        handle_event(event_in("C404"))
+
+    assert routed_incidents == []
+
+
+@pytest.mark.django_db
+def test_new_comms_channel_invalidates_cache(incident, routed_incidents):
+    assert CommsChannel.objects.incident_id_for_channel("C2") is None
+
+    comms_channel = CommsChannel.objects.get(incident=incident)
+    comms_channel.channel_id = "C2"
+    comms_channel.save()
+
+    assert CommsChannel.objects.incident_id_for_channel("C2") == incident.pk
+
+
+@pytest.mark.django_db
+def test_deleted_comms_channel_invalidates_cache(incident):
+    assert CommsChannel.objects.incident_id_for_channel("C1") == incident.pk
+
+    CommsChannel.objects.get(incident=incident).delete()
+
+    assert CommsChannel.objects.incident_id_for_channel("C1") is None
@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from response.slack.client import SlackError
+from response.slack.decorators import handle_event
+from response.slack.models import SlackChannel
+
+
+def channel(id_, name, is_archived=False):
+    return {"id": id_, "name": name, "is_archived": is_archived}
+
+
+PAGES = [
+    [channel("C1", "general"), channel("C2", "random")],
+    [channel("C3", "incidents"), channel("C4", "old-stuff", is_archived=True)],
+    [channel("C5", "never-reached")],
+]
+
+
+@pytest.fixture
+def pages_fetched(mock_slack):
+    fetched = []
+
+    def iter_channels(exclude_archived=True):
+        for page in PAGES:
+            fetched.append(page)
+            yield [c for c in page if not (exclude_archived and c["is_archived"])]
+
+    mock_slack.iter_channels.side_effect = iter_channels
+    return fetched
+
+
+@pytest.mark.django_db
+def test_get_channel_id_scans_until_found_and_indexes(pages_fetched):
+    assert SlackChannel.objects.get_channel_id("incidents") == "C3"
+
+    # stopped paging as soon as it was found
+    assert len(pages_fetched) == 2
+    assert set(SlackChannel.objects.values_list("channel_id", flat=True)) == {
+        "C1",
+        "C2",
+        "C3",
+    }
+
+
+@pytest.mark.django_db
+def test_get_channel_id_from_index(mock_slack, pages_fetched):
+    SlackChannel.objects.index_channel("C3", "incidents")
+
+    assert SlackChannel.objects.get_channel_id("incidents") == "C3"
+    assert pages_fetched == []
+
+
+@pytest.mark.django_db
+def test_get_channel_id_ignores_stale_entries(pages_fetched, settings):
+    SlackChannel.objects.index_channel("C99", "incidents")
+    SlackChannel.objects.update(last_seen=datetime.now() - timedelta(days=2))
+
+    assert SlackChannel.objects.get_channel_id("incidents") == "C3"
+    assert len(pages_fetched) == 2
+    assert not SlackChannel.objects.filter(channel_id="C99").exists()
+
+
+@pytest.mark.django_db
+def test_get_channel_id_not_found(pages_fetched):
+    with pytest.raises(SlackError):
+        SlackChannel.objects.get_channel_id("nope")
+
+    assert len(pages_fetched) == 3
+
+
+@pytest.mark.django_db
+def test_get_channel_id_archived(mock_slack, pages_fetched):
+    assert SlackChannel.objects.get_channel_id("old-stuff", auto_unarchive=True) == "C4"
+    mock_slack.unarchive_channel.assert_called_once_with("C4")
+    assert not SlackChannel.objects.get(channel_id="C4").is_archived
+
+
+@pytest.mark.django_db
+def test_get_channel_id_archived_in_index(mock_slack, pages_fetched):
+    SlackChannel.objects.index_channel("C4", "old-stuff", is_archived=True)
+
+    with pytest.raises(SlackError):
+        SlackChannel.objects.get_channel_id("old-stuff")
+
+    assert SlackChannel.objects.get_channel_id("old-stuff", auto_unarchive=True) == "C4"
+    mock_slack.unarchive_channel.assert_called_with("C4")
+
+
+@pytest.mark.django_db
+def test_get_or_create_channel_indexes_new_channel(mock_slack):
+    mock_slack.create_channel.return_value = "C10"
+
+    assert SlackChannel.objects.get_or_create_channel("inc-new") == "C10"
+    assert SlackChannel.objects.get(name="inc-new").channel_id == "C10"
+
+
+@pytest.mark.django_db
+def test_get_or_create_channel_name_taken(mock_slack):
+    mock_slack.create_channel.side_effect = SlackError("taken", "name_taken")
+    SlackChannel.objects.index_channel("C3", "incidents")
+
+    assert SlackChannel.objects.get_or_create_channel("incidents") == "C3"
+    mock_slack.iter_channels.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_channel_events_keep_index_fresh():
+    handle_event(
+        {"event": {"type": "channel_created", "channel": channel("C1", "new-one")}}
+    )
+    assert SlackChannel.objects.get(channel_id="C1").name == "new-one"
+
+    handle_event(
+        {"event": {"type": "channel_rename", "channel": channel("C1", "renamed")}}
+    )
+    assert SlackChannel.objects.get(channel_id="C1").name == "renamed"
+
+    handle_event({"event": {"type": "channel_archive", "channel": "C1"}})
+    assert SlackChannel.objects.get(channel_id="C1").is_archived
+
+    handle_event({"event": {"type": "channel_unarchive", "channel": "C1"}})
+    assert not SlackChannel.objects.get(channel_id="C1").is_archived
+
+    handle_event({"event": {"type": "channel_deleted", "channel": "C1"}})
+    assert not SlackChannel.objects.filter(channel_id="C1").exists()
+
+
+@pytest.mark.django_db
+def test_rename_frees_up_old_name():
+    SlackChannel.objects.index_channel("C1", "incidents")
+    SlackChannel.objects.index_channel("C2", "incidents")
+
+    assert list(
+        SlackChannel.objects.filter(name="incidents").values_list(
+            "channel_id", flat=True
+        )
+    ) == ["C2"]
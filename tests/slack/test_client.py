@@ -1,10 +1,13 @@
+import threading
 from unittest import mock
 
 import pytest
+import requests
 import slackclient
 from django.conf import settings
 
 from response.slack import client
+from tests.slack.mock_slack_server import MockSlackServer
 from tests.slack.slack_payloads import user_by_email
 
 
@@ -82,3 +85,103 @@ def test_get_user_profile_by_email(slack_client, slack_api_mock):
     assert user["name"] == "spengler"
     assert user["fullname"] == "Egon Spengler"
     assert user["email"] == "spengler@ghostbusters.example.com"
+
+
+@pytest.fixture
+def slack_api_server(monkeypatch):
+    # Redirect Slack API requests to a local mock server, the same way
+    # SLACK_API_MOCK does
+    with MockSlackServer() as server:
+        old_request = requests.Session.request
+
+        def fake_request(self, method, url, *args, **kwargs):
+            url = server.url + url.rsplit("/", 1)[-1]
+            return old_request(self, method, url, *args, **kwargs)
+
+        monkeypatch.setattr(requests.Session, "request", fake_request)
+        yield server
+
+
+def test_unpooled_client_opens_connection_per_call(slack_api_server):
+    c = client.SlackClient("test-token")
+
+    for _ in range(5):
+        c.join_channel("C123")
+
+    assert len(slack_api_server.calls) == 5
+    assert slack_api_server.connections == 5
+
+
+def test_pooled_client_reuses_connections(slack_api_server):
+    c = client.SlackClient("test-token", connection_pool_size=2)
+    assert isinstance(c.client.server.api_requester, client.PooledSlackRequest)
+
+    for _ in range(5):
+        c.join_channel("C123")
+
+    assert len(slack_api_server.calls) == 5
+    assert slack_api_server.connections == 1
+
+
+def test_pooled_client_is_bounded_across_threads(slack_api_server):
+    c = client.SlackClient("test-token", connection_pool_size=2)
+
+    threads = [
+        threading.Thread(target=lambda: [c.join_channel("C1") for _ in range(5)])
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(slack_api_server.calls) == 40
+    assert slack_api_server.connections <= 2
+
+
+def test_pooled_client_sends_token_and_data(slack_api_server):
+    c = client.SlackClient("test-token", connection_pool_size=1)
+
+    c.invite_user_to_channel("U123", "C123")
+
+    assert slack_api_server.calls == [
+        ("conversations.invite", {"users": "U123", "channel": "C123"})
+    ]
+
+
+def synthetic_users_list(n_members):
+    "Mimics paginated users.list responses for a workspace with n_members"
+    members = [
+        {"id": f"U{i:06d}", "name": f"user{i}", "profile": {}, "deleted": False}
+        for i in range(n_members)
+    ]
+
+    def _users_list(endpoint, limit=0, cursor=None):
+        start = int(cursor or 0)
+        end = start + limit if limit else n_members
+        return {
+            "ok": True,
+            "members": members[start:end],
+            "response_metadata": {"next_cursor": str(end) if end < n_members else ""},
+        }
+
+    return _users_list
+
+
+def test_get_user_id_stops_paging_when_found(slack_client, slack_api_mock):
+    slack_api_mock.api_call.side_effect = synthetic_users_list(20000)
+
+    assert slack_client.get_user_id("user450") == "U000450"
+
+    # 200 users per page, so found on the third page
+    assert slack_api_mock.api_call.call_count == 3
+    slack_api_mock.api_call.assert_called_with("users.list", limit=200, cursor="400")
+
+
+def test_get_user_id_not_found(slack_client, slack_api_mock):
+    slack_api_mock.api_call.side_effect = synthetic_users_list(20000)
+
+    with pytest.raises(client.SlackError):
+        slack_client.get_user_id("nobody")
+
+    assert slack_api_mock.api_call.call_count == 100
@@ -0,0 +1,124 @@
+import queue
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from response.slack.decorators import EventDispatcher
+
+
+def pin_event(channel_id, n):
+    return {"event": {"type": "pin_added", "channel_id": channel_id, "n": n}}
+
+
+def wait_for_queue_depths(dispatcher, expected, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not expected(dispatcher.queue_depths()):
+        if time.monotonic() > deadline:
+            pytest.fail(
+                f"Timed out waiting for queue depths, got {dispatcher.queue_depths()}"
+            )
+        time.sleep(0.001)
+
+
+def channels_on_different_shards(dispatcher):
+    shards = {}
+    for i in range(100):
+        shards.setdefault(dispatcher.shard_for(f"C{i}"), f"C{i}")
+        if len(shards) == 2:
+            return shards.values()
+
+
+@pytest.fixture
+def recording_dispatcher():
+    handled = []
+    unblock = threading.Event()
+
+    def handler(payload):
+        event = payload["event"]
+        if event.get("block"):
+            unblock.wait(5)
+        handled.append((event["channel_id"], event["n"]))
+
+    dispatcher = EventDispatcher(workers=4, queue_size=100, handler=handler)
+    dispatcher.handled = handled
+    dispatcher.unblock = unblock
+    yield dispatcher
+    unblock.set()
+    dispatcher.stop()
+
+
+def test_events_for_a_channel_are_handled_in_order(recording_dispatcher):
+    for n in range(200):
+        recording_dispatcher.dispatch(pin_event(f"C{n % 7}", n))
+    recording_dispatcher.join()
+
+    assert len(recording_dispatcher.handled) == 200
+    for channel in range(7):
+        ns = [n for c, n in recording_dispatcher.handled if c == f"C{channel}"]
+        assert ns == sorted(ns)
+
+
+def test_busy_channel_does_not_block_other_channels(recording_dispatcher):
+    busy, quiet = channels_on_different_shards(recording_dispatcher)
+
+    blocking = pin_event(busy, 0)
+    blocking["event"]["block"] = True
+    recording_dispatcher.dispatch(blocking)
+    recording_dispatcher.dispatch(pin_event(busy, 1))
+    for n in range(10):
+        recording_dispatcher.dispatch(pin_event(quiet, n))
+
+    busy_shard = recording_dispatcher.shard_for(busy)
+    quiet_shard = recording_dispatcher.shard_for(quiet)
+    recording_dispatcher._queues[quiet_shard].join()
+    # wait for the busy worker to pick up the blocking event
+    wait_for_queue_depths(recording_dispatcher, lambda depths: depths[busy_shard] == 1)
+
+    assert recording_dispatcher.handled == [(quiet, n) for n in range(10)]
+
+    recording_dispatcher.unblock.set()
+    recording_dispatcher.join()
+    assert recording_dispatcher.handled[-2:] == [(busy, 0), (busy, 1)]
+    assert sum(recording_dispatcher.stats()["processed"]) == 12
+
+
+def test_full_queue_pushes_back():
+    unblock = threading.Event()
+    dispatcher = EventDispatcher(
+        workers=1,
+        queue_size=1,
+        put_timeout=0.1,
+        handler=lambda payload: unblock.wait(5),
+    )
+    try:
+        dispatcher.dispatch(pin_event("C1", 0))
+        # wait for the worker to pick up the first event
+        wait_for_queue_depths(dispatcher, lambda depths: depths == [0])
+        dispatcher.dispatch(pin_event("C1", 1))
+
+        with pytest.raises(queue.Full):
+            dispatcher.dispatch(pin_event("C1", 2))
+        assert dispatcher.queue_depths() == [1]
+    finally:
+        unblock.set()
+        dispatcher.stop()
+
+
+def test_event_view_asks_slack_to_retry_when_queue_is_full(post_event_from_slack_api):
+    dispatcher = mock.Mock()
+    dispatcher.dispatch.side_effect = queue.Full
+    payload = {"type": "event_callback", "event_id": "Ev1", "event": {}}
+
+    with mock.patch(
+        "response.slack.views.get_event_dispatcher", return_value=dispatcher
+    ):
+        r = post_event_from_slack_api(payload)
+        assert r.status_code == 503
+
+        dispatcher.dispatch.side_effect = None
+        r = post_event_from_slack_api(payload, retry_num=1)
+        assert r.status_code == 200
+
+    assert dispatcher.dispatch.call_count == 2
@@ -0,0 +1,121 @@
+import json
+from unittest import mock
+
+import pytest
+
+from response.slack.event_filter import (
+    DROPPED_BOT_MESSAGE,
+    DROPPED_MESSAGE_EDIT,
+    DROPPED_UNKNOWN_CHANNEL,
+    PROCESSED,
+    drop_reason,
+    event_filter_stats,
+    reset_event_filter_stats,
+)
+from response.slack.models import CommsChannel
+from tests.factories import IncidentFactory
+
+
+@pytest.fixture
+def comms_channel():
+    incident = IncidentFactory.create()
+    comms_channel = CommsChannel.objects.get(incident=incident)
+    comms_channel.channel_id = "CCOMMS"
+    comms_channel.save()
+    return comms_channel
+
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+    reset_event_filter_stats()
+
+
+def body(event):
+    return json.dumps(
+        {"type": "event_callback", "event_id": "Ev1", "event": event}
+    ).encode()
+
+
+def message(channel="CCOMMS", **kwargs):
+    return body(
+        {
+            "client_msg_id": "abc",
+            "type": "message",
+            "text": "hello",
+            "user": "U1",
+            "ts": "1.2",
+            "channel": channel,
+            "blocks": [{"type": "rich_text", "elements": []}],
+            **kwargs,
+        }
+    )
+
+
+@pytest.mark.django_db
+def test_messages_in_comms_channels_are_kept(comms_channel):
+    assert drop_reason(message()) is None
+
+
+@pytest.mark.django_db
+def test_messages_in_other_channels_are_dropped(comms_channel):
+    assert drop_reason(message(channel="COTHER")) == DROPPED_UNKNOWN_CHANNEL
+
+
+@pytest.mark.django_db
+def test_new_comms_channels_are_picked_up(comms_channel):
+    assert drop_reason(message(channel="CNEW")) == DROPPED_UNKNOWN_CHANNEL
+
+    comms_channel.channel_id = "CNEW"
+    comms_channel.save()
+
+    assert drop_reason(message(channel="CNEW")) is None
+
+
+def test_bot_messages_are_dropped():
+    assert drop_reason(message(bot_id="B1")) == DROPPED_BOT_MESSAGE
+    assert drop_reason(message(subtype="bot_message")) == DROPPED_BOT_MESSAGE
+
+
+def test_message_edits_are_dropped():
+    assert drop_reason(message(subtype="message_changed")) == DROPPED_MESSAGE_EDIT
+    assert drop_reason(message(subtype="message_deleted")) == DROPPED_MESSAGE_EDIT
+
+
+def test_other_events_are_kept():
+    # a pin of a bot's message, in a channel we don't know
+    pin = body(
+        {
+            "type": "pin_added",
+            "user": "U1",
+            "channel_id": "COTHER",
+            "item": {
+                "type": "message",
+                "channel": "COTHER",
+                "message": {"type": "message", "bot_id": "B1", "text": "hi"},
+            },
+        }
+    )
+    assert drop_reason(pin) is None
+
+    created = body({"type": "channel_created", "channel": {"id": "COTHER"}})
+    assert drop_reason(created) is None
+
+    verification = json.dumps({"type": "url_verification", "challenge": "x"})
+    assert drop_reason(verification.encode()) is None
+
+
+@pytest.mark.django_db
+def test_event_view_counts_dropped_events(comms_channel, post_event_from_slack_api):
+    with mock.patch("response.slack.views.handle_event") as handle_event, mock.patch(
+        "response.slack.views.get_event_dispatcher", return_value=None
+    ):
+        for event in (message(), message(channel="COTHER"), message(bot_id="B1")):
+            r = post_event_from_slack_api(json.loads(event))
+            assert r.status_code == 200
+
+    assert handle_event.call_count == 1
+    assert event_filter_stats() == {
+        PROCESSED: 1,
+        DROPPED_UNKNOWN_CHANNEL: 1,
+        DROPPED_BOT_MESSAGE: 1,
+    }
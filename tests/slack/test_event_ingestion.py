@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from response.core.jobs import Worker
+from response.core.models import Job
+from response.slack.decorators.event_handler import WORKSPACE_EVENT_MAPPINGS
+from response.slack.views import seen_events
+
+EVENT_TYPE = "test_ingestion_event"
+
+
+@pytest.fixture
+def handled_events():
+    handled = Counter()
+    lock = threading.Lock()
+
+    def handler(event):
+        with lock:
+            handled[event["n"]] += 1
+
+    WORKSPACE_EVENT_MAPPINGS[EVENT_TYPE].append(handler)
+    yield handled
+    WORKSPACE_EVENT_MAPPINGS.pop(EVENT_TYPE)
+
+
+def event_callback(n):
+    return {
+        "type": "event_callback",
+        "event_id": f"Ev{n:08d}",
+        "event": {"type": EVENT_TYPE, "n": n},
+    }
+
+
+def wait_for(condition, timeout_secs=10):
+    deadline = time.monotonic() + timeout_secs
+    while not condition():
+        if time.monotonic() > deadline:
+            pytest.fail(f"waited {timeout_secs}s for condition")
+        time.sleep(0.05)
+
+
+def test_event_is_acked_before_it_is_handled(post_event_from_slack_api):
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_handler(event):
+        started.set()
+        release.wait(5)
+
+    WORKSPACE_EVENT_MAPPINGS[EVENT_TYPE].append(slow_handler)
+    try:
+        start = time.monotonic()
+        r = post_event_from_slack_api(event_callback(1))
+        assert r.status_code == 200
+        assert time.monotonic() - start < 1
+        assert started.wait(5)
+    finally:
+        release.set()
+        WORKSPACE_EVENT_MAPPINGS.pop(EVENT_TYPE)
+
+
+def test_slack_retries_are_ignored(post_event_from_slack_api, handled_events):
+    for retry_num in (None, 1, 2):
+        r = post_event_from_slack_api(event_callback(1), retry_num=retry_num)
+        assert r.status_code == 200
+
+    wait_for(lambda: handled_events[1] == 1)
+    time.sleep(0.2)
+    assert handled_events[1] == 1
+
+
+def test_load_events_handled_exactly_once(post_event_from_slack_api, handled_events):
+    n_events = 2000
+
+    for n in range(n_events):
+        post_event_from_slack_api(event_callback(n))
+        # Slack retries some events, e.g. when we've been slow to respond
+        if n % 4 == 0:
+            post_event_from_slack_api(event_callback(n), retry_num=1)
+
+    wait_for(lambda: sum(handled_events.values()) >= n_events)
+    time.sleep(0.2)
+    assert len(handled_events) == n_events
+    assert set(handled_events.values()) == {1}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_load_events_handled_exactly_once_with_job_queue(
+    settings, post_event_from_slack_api, handled_events
+):
+    settings.RESPONSE_USE_JOB_QUEUE = True
+    n_events = 1000
+
+    for n in range(n_events):
+        post_event_from_slack_api(event_callback(n))
+        if n % 4 == 0:
+            post_event_from_slack_api(event_callback(n), retry_num=1)
+
+    # a retry that reaches another web process, which hasn't seen the event
+    seen_elsewhere = event_callback(0)
+    seen_events.clear()
+    post_event_from_slack_api(seen_elsewhere, retry_num=2)
+
+    assert Job.objects.count() == n_events
+    assert not handled_events
+    assert set(Job.objects.values_list("shard_key", flat=True)) == {None}
+
+    Worker(concurrency=4, poll_interval=0).run(burst=True)
+
+    assert len(handled_events) == n_events
+    assert set(handled_events.values()) == {1}
+
+
+@pytest.mark.django_db
+def test_queued_events_are_sharded_by_channel(settings, post_event_from_slack_api):
+    settings.RESPONSE_USE_JOB_QUEUE = True
+    for n, channel in enumerate(("C1", {"id": "C2"}, None), start=1):
+        callback = event_callback(n)
+        if channel:
+            callback["event"]["channel"] = channel
+        post_event_from_slack_api(callback)
+
+    assert list(Job.objects.order_by("pk").values_list("shard_key", flat=True)) == [
+        "slack_channel:C1",
+        "slack_channel:C2",
+        None,
+    ]
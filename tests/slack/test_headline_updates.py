@@ -0,0 +1,165 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from response.core.models import ExternalUser, Incident
+from response.slack.block_kit import Message, Section, Text
+from response.slack.models import HeadlinePost
+from response.slack.models.headline_post import (
+    SENT,
+    SKIPPED,
+    headline_update_stats,
+    headline_updates,
+    reset_headline_update_stats,
+)
+from tests.factories import IncidentFactory
+
+
+@pytest.fixture
+def debounce(settings):
+    settings.RESPONSE_HEADLINE_DEBOUNCE_SECONDS = 0.2
+    yield
+    headline_updates.flush()
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            pytest.fail(f"waited {timeout}s for condition")
+        time.sleep(0.01)
+
+
+def severity_posted(call):
+    (severity,) = [b for b in call[1]["blocks"] if b.get("block_id") == "severity"]
+    return severity["text"]["text"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_updates_are_coalesced(debounce, mock_slack):
+    incident = IncidentFactory.create(severity="4", end_time=None)
+    HeadlinePost.objects.create(incident=incident, message_ts="123")
+
+    for severity in ("3", "2", "1"):
+        incident.severity = severity
+        incident.save()
+
+    assert headline_updates.pending() == {incident.pk}
+    assert not mock_slack.send_or_update_message_block.called
+
+    wait_for(lambda: mock_slack.send_or_update_message_block.called)
+    time.sleep(0.3)
+
+    (call,) = mock_slack.send_or_update_message_block.call_args_list
+    assert "Critical" in severity_posted(call)
+    assert call[1]["ts"] == "123"
+    assert headline_updates.pending() == set()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_updates_for_different_incidents_are_sent_separately(debounce, mock_slack):
+    incidents = [IncidentFactory.create(end_time=None) for _ in range(2)]
+    for incident in incidents:
+        HeadlinePost.objects.create(incident=incident, message_ts="123")
+
+    assert headline_updates.pending() == {i.pk for i in incidents}
+    wait_for(lambda: mock_slack.send_or_update_message_block.call_count == 2)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_flush_sends_pending_updates(debounce, mock_slack):
+    incident = IncidentFactory.create(end_time=None)
+    HeadlinePost.objects.create(incident=incident, message_ts="123")
+
+    headline_updates.flush()
+
+    assert mock_slack.send_or_update_message_block.call_count == 1
+    assert headline_updates.pending() == set()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_headline_is_only_posted_once(mock_slack):
+    incident = IncidentFactory.create(end_time=None)
+    headline_post = HeadlinePost.objects.create(incident=incident)
+    mock_slack.reset_mock()
+    HeadlinePost.objects.filter(pk=headline_post.pk).update(message_ts=None)
+
+    def slow_send(*args, **kwargs):
+        time.sleep(0.1)
+        return {"ts": "456"}
+
+    mock_slack.send_or_update_message_block.side_effect = slow_send
+
+    threads = [
+        threading.Thread(target=headline_updates.update, args=(incident.pk,))
+        for _ in range(2)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # the second update sees the ts from the first, and has nothing to change
+    ts = [c[1]["ts"] for c in mock_slack.send_or_update_message_block.call_args_list]
+    assert ts == [None]
+    assert HeadlinePost.objects.get(pk=headline_post.pk).message_ts == "456"
+
+
+def message(text, fallback_text="fallback"):
+    msg = Message()
+    msg.set_fallback_text(fallback_text)
+    msg.add_block(Section(block_id="text", text=Text(text)))
+    return msg
+
+
+def test_message_fingerprint():
+    assert message("hello").fingerprint() == message("hello").fingerprint()
+    assert message("hello").fingerprint() != message("goodbye").fingerprint()
+    assert (
+        message("hello").fingerprint()
+        != message("hello", fallback_text="other").fingerprint()
+    )
+
+
+@pytest.mark.django_db
+def test_unchanged_headline_posts_are_not_sent(mock_slack):
+    reset_headline_update_stats()
+    user = ExternalUser.objects.create(
+        app_id="slack", external_id="U1", display_name="Opsy McOpsface"
+    )
+    other_user = ExternalUser.objects.create(
+        app_id="slack", external_id="U2", display_name="Nopsy McNopsface"
+    )
+
+    # a typical incident lifecycle, as seen by the headline post
+    incident = Incident.objects.create_incident(
+        report="Something happened",
+        reporter=user,
+        report_time=datetime.now(),
+        report_only=False,
+        summary="Not sure what's going on",
+        impact="",
+        lead=None,
+        severity=None,
+    )
+    incident.summary = "Database is down"  # not shown in the headline post
+    incident.save()
+    incident.impact = "Payments are failing"  # not shown either
+    incident.save()
+    incident.lead = other_user
+    incident.save()
+    incident.severity = "2"
+    incident.save()
+    incident.severity = "2"  # no change
+    incident.save()
+    incident.end_time = datetime.now()
+    incident.save()
+    incident.end_time = datetime.now()  # closed again, e.g. a second close click
+    incident.save()
+    incident.summary = "Database ran out of connections"
+    incident.save()
+
+    assert headline_update_stats() == {SENT: 4, SKIPPED: 5}
+    assert mock_slack.send_or_update_message_block.call_count == 4
@@ -0,0 +1,136 @@
+import random
+import string
+
+import pytest
+
+from response.slack.decorators.keyword_handler import (
+    KEYWORD_HANDLERS,
+    KEYWORD_OPTIONS,
+    KeywordMatcher,
+    handle_keywords,
+    keyword_handler,
+)
+from tests.factories import IncidentFactory
+
+
+def matcher(*keywords, case_sensitive=False, word_boundary=False):
+    return KeywordMatcher({k: (case_sensitive, word_boundary) for k in keywords})
+
+
+def test_finds_keywords_in_any_case():
+    assert matcher("runbook", "run book").find("Where's the Run Book?") == ["run book"]
+    assert matcher("runbook").find("RUNBOOK") == ["runbook"]
+
+
+def test_finds_overlapping_keywords():
+    m = matcher("deploy", "deployment", "shutdown", "down", "own")
+    assert m.find("the deployment shutdown") == [
+        "deploy",
+        "deployment",
+        "shutdown",
+        "down",
+        "own",
+    ]
+
+
+def test_returns_keywords_in_registration_order():
+    assert matcher("b", "a").find("a b") == ["b", "a"]
+
+
+def test_no_match():
+    m = matcher("runbook")
+    assert m.find("nothing to see here") == []
+    assert m.find("") == []
+    assert KeywordMatcher({}).find("runbook") == []
+
+
+def test_escapes_regex_characters():
+    assert matcher("c++", "a.b").find("c++ and axb") == ["c++"]
+
+
+def test_case_sensitive():
+    m = matcher("DB", case_sensitive=True)
+    assert m.find("the DB is down") == ["DB"]
+    assert m.find("the db is down") == []
+
+
+def test_word_boundary():
+    m = matcher("deploy", "run book", word_boundary=True)
+    assert m.find("deploy failed") == ["deploy"]
+    assert m.find("the deployment failed") == []
+    assert m.find("redeploy") == []
+    assert m.find("(deploy)") == ["deploy"]
+    assert m.find("deploy_1") == []
+    assert m.find("check the run book.") == ["run book"]
+
+
+def test_word_boundary_checks_every_occurrence():
+    m = matcher("deploy", word_boundary=True)
+    assert m.find("deployment, then deploy") == ["deploy"]
+
+
+def test_mixed_options():
+    m = KeywordMatcher({"DB": (True, True), "db": (False, False)})
+    assert m.find("mydb") == ["db"]
+    assert m.find("the DB") == ["DB", "db"]
+
+
+def test_text_whose_length_changes_when_lowercased():
+    # 'İ' lowercases to two characters
+    assert matcher("runbook").find("İİ RunBook") == ["runbook"]
+
+
+@pytest.fixture
+def handled():
+    handled = []
+
+    @keyword_handler(["runbook"], word_boundary=True)
+    def handler(comms_channel, user, keyword, text, ts):
+        handled.append((comms_channel.incident_id, user, keyword, text, ts))
+
+    yield handled
+
+    KEYWORD_HANDLERS.pop("runbook")
+    KEYWORD_OPTIONS.pop("runbook")
+
+
+@pytest.mark.django_db
+def test_handle_keywords(handled):
+    incident = IncidentFactory.create()
+    payload = {"text": "where's the runbook?", "user": "U1", "ts": "123.45"}
+
+    handle_keywords(incident, payload)
+
+    assert handled == [(incident.pk, "U1", "runbook", payload["text"], "123.45")]
+
+
+@pytest.mark.django_db
+def test_handle_keywords_without_a_match_doesnt_query(
+    handled, django_assert_num_queries
+):
+    incident = IncidentFactory.create()
+
+    with django_assert_num_queries(0):
+        handle_keywords(incident, {"text": "the runbooks are here", "user": "U1"})
+
+    assert handled == []
+
+
+def naive_find(keywords, text):
+    return [k for k in keywords if k.lower() in text.lower()]
+
+
+@pytest.mark.parametrize("density", ["sparse", "dense"])
+def test_matches_naive_search(density):
+    rnd = random.Random(1)
+    keywords = {
+        "".join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(4, 12)))
+        for _ in range(500)
+    }
+    keywords = sorted(keywords)
+    filler = "the server is down again and we are looking into it".split()
+    words = filler + (keywords if density == "dense" else keywords[:3])
+    text = " ".join(rnd.choice(words) for _ in range(4000))[:20000]
+
+    m = KeywordMatcher({k: (False, False) for k in keywords})
+    assert m.find(text) == naive_find(keywords, text)
@@ -0,0 +1,352 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from django.db import OperationalError, connection
+
+from response.slack.decorators import incident_notification
+from response.slack.decorators.incident_notification import (
+    FAILED,
+    NOTIFICATION_HANDLERS,
+    SENT,
+    SKIPPED,
+    TIMED_OUT,
+    NotificationHandler,
+    handle_notifications,
+    notification_stats,
+    recurring_notification,
+    reset_notification_stats,
+    run_callbacks,
+    schedule_notifications,
+    single_notification,
+)
+from response.slack.models import CommsChannel, Notification
+from tests.factories import IncidentFactory
+
+
+@pytest.fixture
+def notified():
+    "Replaces the registered notification handlers with ones that record calls"
+    registered = list(NOTIFICATION_HANDLERS)
+    NOTIFICATION_HANDLERS.clear()
+    incident_notification._scheduled_keys = None
+    notified = []
+
+    @single_notification(initial_delay_mins=10)
+    def once(incident):
+        notified.append(("once", incident.pk))
+
+    @recurring_notification(interval_mins=5, max_notifications=3)
+    def repeated(incident):
+        notified.append(("repeated", incident.pk))
+
+    reset_notification_stats()
+    yield notified
+
+    NOTIFICATION_HANDLERS[:] = registered
+    incident_notification._scheduled_keys = None
+
+
+def open_incident(started_mins_ago):
+    return IncidentFactory.create(
+        start_time=datetime.now() - timedelta(minutes=started_mins_ago),
+        end_time=None,
+    )
+
+
+def rewind(minutes):
+    "Moves every notification back in time, as if `minutes` had passed"
+    for notification in Notification.objects.all():
+        if notification.time:
+            notification.time -= timedelta(minutes=minutes)
+        if notification.next_due:
+            notification.next_due -= timedelta(minutes=minutes)
+        notification.save()
+
+
+@pytest.mark.django_db
+def test_schedule_notifications(notified):
+    incident = open_incident(started_mins_ago=1)
+
+    schedule_notifications()
+
+    next_due = {
+        n.key: n.next_due for n in Notification.objects.filter(incident=incident)
+    }
+    assert next_due == {
+        "once": incident.start_time + timedelta(minutes=10),
+        "repeated": incident.start_time + timedelta(minutes=5),
+    }
+
+
+@pytest.mark.django_db
+def test_schedule_notifications_is_idempotent(notified):
+    open_incident(started_mins_ago=1)
+
+    schedule_notifications()
+    schedule_notifications()
+
+    assert Notification.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_notifications_wait_for_their_interval(notified):
+    incident = open_incident(started_mins_ago=6)
+
+    handle_notifications()
+    assert notified == [("repeated", incident.pk)]
+
+    handle_notifications()
+    assert notified == [("repeated", incident.pk)]
+
+
+@pytest.mark.django_db
+def test_single_and_recurring_notifications(notified):
+    incident = open_incident(started_mins_ago=11)
+
+    handle_notifications()
+    for _ in range(5):
+        rewind(minutes=5)
+        handle_notifications()
+
+    assert notified.count(("once", incident.pk)) == 1
+    assert notified.count(("repeated", incident.pk)) == 3
+    assert Notification.objects.filter(completed=True).count() == 2
+    assert Notification.objects.due().count() == 0
+
+
+@pytest.mark.django_db
+def test_closed_incidents_are_not_notified(notified):
+    incident = open_incident(started_mins_ago=1)
+    schedule_notifications()
+    incident.end_time = datetime.now()
+    incident.save()
+
+    rewind(minutes=60)
+    handle_notifications()
+
+    assert notified == []
+    assert Notification.objects.filter(next_due__isnull=False).count() == 0
+
+
+@pytest.mark.django_db
+def test_reopened_incidents_are_notified_again(notified):
+    incident = open_incident(started_mins_ago=1)
+    schedule_notifications()
+    incident.end_time = datetime.now()
+    incident.save()
+    rewind(minutes=60)
+    handle_notifications()
+
+    incident.end_time = None
+    incident.save()
+    rewind(minutes=60)
+    handle_notifications()
+
+    assert sorted(notified) == [("once", incident.pk), ("repeated", incident.pk)]
+
+
+@pytest.mark.django_db
+def test_new_comms_channels_are_scheduled(notified):
+    incident = IncidentFactory.create(end_time=None)
+    CommsChannel.objects.filter(incident=incident).delete()
+
+    CommsChannel.objects.create(
+        incident=incident, channel_id="C123", channel_name="inc-123"
+    )
+
+    assert Notification.objects.filter(incident=incident).count() == 2
+
+
+@pytest.mark.django_db
+def test_handle_notifications_only_queries_due_notifications(
+    notified, django_assert_num_queries
+):
+    for _ in range(20):
+        open_incident(started_mins_ago=1)
+    handle_notifications()
+
+    with django_assert_num_queries(1):
+        handle_notifications()
+
+    rewind(minutes=5)
+    # one query to claim the due notifications, one to fetch them, and one to
+    # update them
+    with django_assert_num_queries(3):
+        handle_notifications()
+    assert len(notified) == 20
+
+
+@pytest.mark.django_db
+def test_claimed_notifications_are_not_claimed_again(notified):
+    open_incident(started_mins_ago=6)
+    schedule_notifications()
+
+    (claimed,) = Notification.objects.claim("worker-1", keys=["repeated"])
+    assert claimed.claimed_by.startswith("worker-1:")
+    assert Notification.objects.claim("worker-2", keys=["repeated"]) == []
+
+    handle_notifications(worker="worker-2")
+    assert notified == []
+
+
+@pytest.mark.django_db
+def test_expired_claims_can_be_reclaimed(settings, notified):
+    settings.RESPONSE_NOTIFICATION_LEASE_SECONDS = 0
+    incident = open_incident(started_mins_ago=6)
+    schedule_notifications()
+    Notification.objects.claim("worker-1", keys=["repeated"])
+
+    handle_notifications(worker="worker-2")
+
+    assert notified == [("repeated", incident.pk)]
+    assert Notification.objects.filter(claimed_by__isnull=False).count() == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_runners_dont_send_twice(settings, notified):
+    settings.RESPONSE_NOTIFICATION_LEASE_SECONDS = 2
+    incidents = [open_incident(started_mins_ago=11) for _ in range(10)]
+    handle_notifications(worker="setup")
+    notified.clear()
+    Notification.objects.update(next_due=datetime.now())
+    start = threading.Barrier(2)
+
+    def run(worker):
+        start.wait()
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            try:
+                handle_notifications(worker=worker)
+                if not Notification.objects.due().exists():
+                    break
+            except OperationalError:
+                # the in-memory SQLite test database raises when a table is
+                # locked rather than waiting, so treat it as a failed tick
+                pass
+        connection.close()
+
+    runners = [threading.Thread(target=run, args=(f"node-{i}",)) for i in range(2)]
+    for t in runners:
+        t.start()
+    for t in runners:
+        t.join()
+
+    assert sorted(notified) == [("repeated", i.pk) for i in incidents]
+
+
+def sleeper(seconds, timeout_secs=None, calls=None):
+    def callback(incident):
+        time.sleep(seconds)
+        if calls is not None:
+            calls.append(incident)
+
+    return NotificationHandler(
+        key=f"sleep_{seconds}",
+        callback=callback,
+        interval_mins=1,
+        max_notifications=1,
+        timeout_secs=timeout_secs,
+    )
+
+
+def test_callbacks_run_in_parallel(settings):
+    settings.RESPONSE_NOTIFICATION_CONCURRENCY = 10
+    handler = sleeper(0.2)
+
+    start = time.monotonic()
+    outcomes = run_callbacks([(handler, i) for i in range(10)])
+
+    assert time.monotonic() - start < 1
+    assert outcomes == [SENT] * 10
+
+
+def test_concurrency_is_bounded(settings):
+    settings.RESPONSE_NOTIFICATION_CONCURRENCY = 2
+    running = []
+    most_running = []
+    lock = threading.Lock()
+
+    def callback(incident):
+        with lock:
+            running.append(incident)
+            most_running.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.remove(incident)
+
+    handler = NotificationHandler("bounded", callback, 1, 1)
+    assert run_callbacks([(handler, i) for i in range(10)]) == [SENT] * 10
+    assert max(most_running) == 2
+
+
+def test_slow_callbacks_time_out_without_delaying_others(settings):
+    settings.RESPONSE_NOTIFICATION_CONCURRENCY = 1
+    reset_notification_stats()
+    calls = []
+    slow = sleeper(5, timeout_secs=0.1)
+    fast = sleeper(0, calls=calls)
+
+    start = time.monotonic()
+    outcomes = run_callbacks([(slow, 1), (fast, 2), (fast, 3)])
+
+    assert time.monotonic() - start < 1
+    assert outcomes == [TIMED_OUT, SENT, SENT]
+    assert calls == [2, 3]
+    stats = notification_stats()
+    assert stats[slow.key][TIMED_OUT] == 1
+    assert stats[fast.key][SENT] == 2
+
+
+def test_failed_callbacks_are_recorded():
+    reset_notification_stats()
+
+    def callback(incident):
+        raise Exception("oops")
+
+    handler = NotificationHandler("failing", callback, 1, 1)
+    assert run_callbacks([(handler, 1), (sleeper(0), 2)]) == [FAILED, SENT]
+    assert notification_stats()["failing"][FAILED] == 1
+
+
+def test_handlers_still_running_are_skipped(settings):
+    reset_notification_stats()
+    release = threading.Event()
+    calls = []
+
+    def hang(incident):
+        calls.append(incident)
+        release.wait(5)
+
+    handler = NotificationHandler("hangs", hang, 1, 1, timeout_secs=0.05)
+    try:
+        assert run_callbacks([(handler, 1)]) == [TIMED_OUT]
+        # the first call is still running for incident 1, but not for 2
+        assert run_callbacks([(handler, 1), (handler, 2)]) == [SKIPPED, TIMED_OUT]
+        assert calls == [1, 2]
+        assert notification_stats()["hangs"][SKIPPED] == 1
+    finally:
+        release.set()
+
+    deadline = time.monotonic() + 5
+    while run_callbacks([(handler, 1)]) == [SKIPPED]:
+        assert time.monotonic() < deadline, "Hung call never finished"
+        time.sleep(0.01)
+    assert calls[-1] == 1
+
+
+@pytest.mark.django_db
+def test_timed_out_notifications_are_not_resent(settings, notified):
+    settings.RESPONSE_NOTIFICATION_TIMEOUT_SECONDS = 0.1
+
+    @single_notification(initial_delay_mins=0)
+    def slow(incident):
+        time.sleep(1)
+
+    open_incident(started_mins_ago=1)
+    handle_notifications()
+
+    notification = Notification.objects.get(key="slow")
+    assert notification.completed
+    assert notification_stats()["slow"][TIMED_OUT] == 1
@@ -0,0 +1,133 @@
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from response.slack import client, ratelimit
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(client.time, "sleep", slept.append)
+    return slept
+
+
+def test_backoff_with_jitter_is_bounded():
+    for attempt in range(1, 10):
+        delay = ratelimit.backoff_with_jitter(attempt, 0.2, 5)
+        assert 0 <= delay <= min(5, 0.2 * 2 ** attempt)
+
+
+def test_token_bucket_allows_burst_then_paces():
+    bucket = ratelimit.TokenBucket(rate_per_minute=60, burst=2)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    # Bucket is empty: callers queue up one second apart
+    assert bucket.reserve() == pytest.approx(1, abs=0.05)
+    assert bucket.reserve() == pytest.approx(2, abs=0.05)
+
+
+def test_token_bucket_pause():
+    bucket = ratelimit.TokenBucket(rate_per_minute=600, burst=10)
+    bucket.pause(5)
+
+    assert bucket.reserve() == pytest.approx(5, abs=0.05)
+
+
+def test_rate_limiter_buckets_by_tier_and_channel():
+    limiter = ratelimit.RateLimiter()
+
+    assert limiter.tier_for("users.list") == ratelimit.TIER_2
+    assert limiter.tier_for("conversations.history") == ratelimit.TIER_3
+    assert limiter.tier_for("something.new") == ratelimit.DEFAULT_TIER
+
+    assert limiter.bucket_key("chat.postMessage", "C1") == "chat.postMessage:C1"
+    assert limiter.bucket("chat.postMessage", "C1") is not limiter.bucket(
+        "chat.postMessage", "C2"
+    )
+    assert limiter.bucket("users.info", "C1") is limiter.bucket("users.info", "C2")
+
+
+def test_rate_limiter_method_tier_overrides():
+    limiter = ratelimit.RateLimiter(method_tiers={"users.list": ratelimit.TIER_1})
+    assert limiter.tier_for("users.list") == ratelimit.TIER_1
+
+
+def test_rate_limiter_reports_queue_depths():
+    limiter = ratelimit.RateLimiter(method_tiers={"test.method": 300}, burst_seconds=0)
+    limiter.acquire("test.method")
+
+    threads = [
+        threading.Thread(target=limiter.acquire, args=("test.method",))
+        for _ in range(3)
+    ]
+    for t in threads:
+        t.start()
+
+    # The first waiter is released after 0.2s
+    deadline = time.monotonic() + 0.15
+    while limiter.queue_depths() != {"test.method": 3}:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    for t in threads:
+        t.join()
+    assert limiter.queue_depths() == {}
+
+
+def test_client_paces_calls_through_rate_limiter():
+    limiter = mock.Mock(spec=ratelimit.RateLimiter)
+    c = client.SlackClient("test-token", rate_limiter=limiter)
+    c.client = mock.Mock()
+    c.client.api_call.return_value = {"ok": True}
+
+    c.send_message("C123", "hello")
+
+    limiter.acquire.assert_called_once_with("chat.postMessage", "C123")
+
+
+def test_client_honours_retry_after(sleeps):
+    limiter = mock.Mock(spec=ratelimit.RateLimiter)
+    c = client.SlackClient(
+        "test-token", retry_base_backoff_seconds=0.0000001, rate_limiter=limiter
+    )
+    c.client = mock.Mock()
+    c.client.api_call.side_effect = [
+        {"ok": False, "error": "ratelimited", "headers": {"Retry-After": "7"}},
+        {"ok": True},
+    ]
+
+    assert c.join_channel("C123") == {"ok": True}
+    assert sleeps == [7]
+    limiter.retry_after.assert_called_once_with("conversations.join", 7, "C123")
+
+
+def test_client_backs_off_exponentially_without_retry_after(sleeps):
+    c = client.SlackClient(
+        "test-token", retry_base_backoff_seconds=1, max_backoff_seconds=100
+    )
+    c.client = mock.Mock()
+    c.client.api_call.side_effect = [{"ok": False, "error": "ratelimited"}] * 4 + [
+        {"ok": True}
+    ]
+
+    with mock.patch.object(ratelimit.random, "uniform", lambda lo, hi: hi):
+        c.join_channel("C123")
+
+    assert sleeps == [2, 4, 8, 16]
+
+
+def test_client_does_not_retry_other_errors(sleeps):
+    c = client.SlackClient("test-token")
+    c.client = mock.Mock()
+    c.client.api_call.return_value = {"ok": False, "error": "channel_not_found"}
+
+    with pytest.raises(client.SlackError) as e:
+        c.join_channel("C123")
+
+    assert e.value.slack_error == "channel_not_found"
+    assert c.client.api_call.call_count == 1
+    assert sleeps == []
@@ -0,0 +1,52 @@
+import pytest
+
+from response.core.models import ExternalUser
+from response.slack.reference_utils import (
+    slack_to_human_readable,
+    slack_to_human_readable_many,
+    user_ids_in,
+)
+
+
+def test_user_ids_in():
+    assert user_ids_in("hi <@U1> and <@U2>", None, "<@U1>, see <#C1|general>") == {
+        "U1",
+        "U2",
+    }
+
+
+@pytest.mark.django_db
+def test_slack_to_human_readable(mock_slack):
+    ExternalUser.objects.create(
+        app_id="slack", external_id="U1", display_name="spengler"
+    )
+    mock_slack.get_user_profile.return_value = {
+        "id": "U2",
+        "name": "glinda",
+        "fullname": "",
+        "email": None,
+        "deleted": False,
+    }
+
+    assert (
+        slack_to_human_readable("<@U1> and <@U2> in <#C123|inc-test>")
+        == "@spengler and @glinda in #inc-test"
+    )
+
+
+@pytest.mark.django_db
+def test_slack_to_human_readable_many_resolves_users_once(
+    mock_slack, django_assert_num_queries
+):
+    for i in range(10):
+        ExternalUser.objects.create(
+            app_id="slack", external_id=f"U{i}", display_name=f"user{i}"
+        )
+
+    texts = [f"<@U{i}> pinged <@U{(i + 1) % 10}>" for i in range(10)]
+    with django_assert_num_queries(1):
+        readable = slack_to_human_readable_many(texts)
+
+    assert readable[0] == "@user0 pinged @user1"
+    assert readable[9] == "@user9 pinged @user0"
+    mock_slack.get_user_profile.assert_not_called()
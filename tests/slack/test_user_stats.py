@@ -0,0 +1,125 @@
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from response.slack.models import UserStats
+from response.slack.models.user_stats import MessageCountBuffer, message_counts
+from tests.factories import ExternalUserFactory, IncidentFactory
+
+
+@pytest.fixture
+def users():
+    return [ExternalUserFactory.create(app_id="slack") for _ in range(3)]
+
+
+@pytest.fixture
+def incidents():
+    return [IncidentFactory.create() for _ in range(2)]
+
+
+def message_count(incident, user):
+    return UserStats.objects.get(incident=incident, user=user).message_count
+
+
+@pytest.mark.django_db
+def test_message_counts_are_buffered(settings, users, incidents):
+    settings.RESPONSE_USER_STATS_FLUSH_INTERVAL_SECONDS = 60
+    incident = incidents[0]
+
+    for _ in range(5):
+        UserStats.increment_message_count(incident, users[0].external_id)
+    UserStats.increment_message_count(incident, users[1].external_id)
+
+    assert not UserStats.objects.exists()
+    assert message_counts.pending() == {
+        (incident.pk, users[0].external_id): 5,
+        (incident.pk, users[1].external_id): 1,
+    }
+
+    message_counts.flush()
+
+    assert message_count(incident, users[0]) == 5
+    assert message_count(incident, users[1]) == 1
+    assert UserStats.objects.get(incident=incident, user=users[0]).join_time
+    assert message_counts.pending() == {}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_idle_counts_are_flushed_on_a_timer(settings, users, incidents):
+    settings.RESPONSE_USER_STATS_FLUSH_INTERVAL_SECONDS = 0.05
+    buffer = MessageCountBuffer()
+
+    # no more messages arrive, and nothing else flushes the buffer
+    buffer.add(incidents[0].pk, users[0].external_id)
+
+    deadline = time.monotonic() + 5
+    while not UserStats.objects.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert message_count(incidents[0], users[0]) == 1
+    assert buffer.pending() == {}
+
+
+@pytest.mark.django_db
+def test_flush_adds_to_existing_counts(
+    settings, users, incidents, django_assert_max_num_queries
+):
+    settings.RESPONSE_USER_STATS_FLUSH_INTERVAL_SECONDS = 60
+    incident = incidents[0]
+    UserStats.objects.create(incident=incident, user=users[0], message_count=10)
+
+    for _ in range(100):
+        for user in users:
+            UserStats.increment_message_count(incident, user.external_id)
+
+    # a few queries per flush, not per message
+    with django_assert_max_num_queries(12):
+        message_counts.flush()
+
+    assert message_count(incident, users[0]) == 110
+    assert message_count(incident, users[1]) == 100
+
+
+@pytest.mark.django_db
+def test_failed_flush_keeps_counts(settings, users, incidents):
+    settings.RESPONSE_USER_STATS_FLUSH_INTERVAL_SECONDS = 60
+    UserStats.increment_message_count(incidents[0], users[0].external_id)
+
+    with mock.patch.object(
+        UserStats.objects, "add_message_counts", side_effect=RuntimeError("DB down")
+    ):
+        message_counts.flush()
+
+    assert message_counts.pending() == {(incidents[0].pk, users[0].external_id): 1}
+    message_counts.flush()
+    assert message_count(incidents[0], users[0]) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_increments_are_not_lost(settings, users, incidents):
+    settings.RESPONSE_USER_STATS_FLUSH_INTERVAL_SECONDS = 0.01
+    # each buffer stands in for a separate web/worker process
+    buffers = [MessageCountBuffer() for _ in range(2)]
+    n_threads = 8
+    n_messages = 200
+
+    def send_messages(i):
+        buffer = buffers[i % len(buffers)]
+        for n in range(n_messages):
+            buffer.add(incidents[n % 2].pk, users[(i + n) % 3].external_id)
+
+    threads = [
+        threading.Thread(target=send_messages, args=(i,)) for i in range(n_threads)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for buffer in buffers:
+        buffer.flush()
+
+    assert sum(UserStats.objects.values_list("message_count", flat=True)) == (
+        n_threads * n_messages
+    )
+    assert UserStats.objects.count() == 6
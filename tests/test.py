@@ -84,9 +84,9 @@ def test_submit_dialog_creates_incident(post_from_slack_api, mock_slack):
             if q.exists():
                 break
 
-        # Check that headline post got created
-        mock_slack.send_or_update_message_block.assert_called_with(
-            "incident-channel-id", blocks=ANY, fallback_text=ANY, ts="123"
+        # Check that headline post got created, with a single Slack call
+        mock_slack.send_or_update_message_block.assert_called_once_with(
+            "incident-channel-id", blocks=ANY, fallback_text=ANY, ts=None
         )
 
         # Check that we sent an ephemeral message to the reporting user
@@ -145,9 +145,9 @@ def test_submit_dialog_without_incident_type(post_from_slack_api, mock_slack):
             if q.exists():
                 break
 
-        # Check that headline post got created
-        mock_slack.send_or_update_message_block.assert_called_with(
-            "incident-channel-id", blocks=ANY, fallback_text=ANY, ts="123"
+        # Check that headline post got created, with a single Slack call
+        mock_slack.send_or_update_message_block.assert_called_once_with(
+            "incident-channel-id", blocks=ANY, fallback_text=ANY, ts=None
         )
 
         # Check that we sent an ephemeral message to the reporting user